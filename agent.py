@@ -7,190 +7,227 @@ from langchain.agents import Tool, AgentExecutor, create_openai_functions_agent
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.schema import SystemMessage
-from sheets_manager import SheetsManager
+from langchain.callbacks.base import BaseCallbackHandler
+from sheets_manager import SheetsManager, SheetsPool
+from migraine_analytics import MigraineLog, parse_intensity, resolve_period
+from contact_dedup import DuplicateFinder, merge_contacts
+from contact_format import render_contacts
+from contact_prefetch import ContactPrefetcher, search_by_name
+from tenancy import TenantRegistry, current_sheets_manager
+from prompts import ALL_INTENTS, CONTACTS, build_system_prompt, route_intents, tool_names
+from model_tiers import LARGE, SMALL, ModelPolicy
+from turn_budget import TurnPolicy, budgeted, current_turn
+import date_context
+import tracing
+import contextlib
 import json
 import os
-from datetime import datetime
-from zoneinfo import ZoneInfo
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+
+class LLMTracingCallback(BaseCallbackHandler):
+    """Records one 'llm.call' span per model call, with its token usage"""
+    
+    def __init__(self, tier: Optional[str] = None, policy: Optional[ModelPolicy] = None):
+        """
+        Args:
+            tier: Model tier the calls belong to (added to the span)
+            policy: ModelPolicy that accumulates the tier's tokens and cost
+        """
+        self._starts = {}
+        self.tier = tier
+        self.policy = policy
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is None:
+            return
+        usage = (response.llm_output or {}).get('token_usage', {}) or {}
+        details = usage.get('prompt_tokens_details') or {}
+        attributes = {}
+        if self.tier:
+            attributes['tier'] = self.tier
+        cost = 0.0
+        if self.policy is not None and self.tier:
+            cost = self.policy.record_usage(
+                self.tier,
+                usage.get('prompt_tokens') or 0,
+                details.get('cached_tokens') or 0,
+                usage.get('completion_tokens') or 0
+            )
+            attributes['cost_usd'] = round(cost, 6)
+        turn = current_turn.get()
+        if turn is not None:
+            turn.record_llm(usage.get('prompt_tokens') or 0, details.get('cached_tokens') or 0,
+                            usage.get('completion_tokens') or 0, cost)
+        tracing.record_span(
+            'llm.call',
+            (time.perf_counter() - start) * 1000,
+            prompt_tokens=usage.get('prompt_tokens'),
+            cached_tokens=details.get('cached_tokens'),
+            completion_tokens=usage.get('completion_tokens'),
+            **attributes
+        )
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            tracing.record_span('llm.call', (time.perf_counter() - start) * 1000, tier=self.tier, error=str(error))
+
+
+# Free-text field of each write tool where relative dates ("hoy", "ayer") are resolved
+RELATIVE_DATE_FIELDS = {
+    'update_bio': 1,
+    'add_to_log': 1,
+    'add_new_contact': 6,
+}
+
+
+def resolve_dates_in_field(func, index: int):
+    """Wrap a 'a|b|c' tool so the field at index has its relative dates replaced before running"""
+    def wrapper(input_str: str = "") -> str:
+        parts = input_str.split('|')
+        if len(parts) > index:
+            parts[index] = date_context.resolve_relative_dates(parts[index])
+        return func('|'.join(parts))
+    return wrapper
+
+
+class BudgetedAgentExecutor(AgentExecutor):
+    """AgentExecutor that stops when the current turn's budget says so (see turn_budget)"""
+    
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        turn = current_turn.get()
+        if turn is None:
+            return super()._should_continue(iterations, time_elapsed)
+        return turn.should_continue(iterations)
 
 
 class LeadsAgent:
     """AI Agent that can search and modify leads/contacts in Google Sheets"""
     
-    def __init__(self, sheets_manager: SheetsManager, openai_api_key: str, credentials_file: str = None):
+    def __init__(self, sheets_manager: SheetsManager, openai_api_key: str, credentials_file: str = None,
+                 llm=None, migraine_manager: SheetsManager = None, tenants: Optional[TenantRegistry] = None,
+                 small_llm=None, model_policy: Optional[ModelPolicy] = None,
+                 turn_policy: Optional[TurnPolicy] = None, prefetcher: Optional[ContactPrefetcher] = None):
         """
         Initialize the agent
         
         Args:
             sheets_manager: Instance of SheetsManager for leads/contacts
             openai_api_key: OpenAI API key
-            credentials_file: Path to Google credentials file (for migraine sheet)
+            credentials_file: Path to Google credentials file (for migraine sheet, opened on first use)
+            llm: Optional chat model to use instead of the large model (e.g. a recorded model for benchmarks)
+            migraine_manager: Optional SheetsManager for the migraine sheet (skips opening it)
+            tenants: Optional registry of per-chat sheets (see process_query's chat_id)
+            small_llm: Optional chat model for simple turns; when llm is given without it, every turn uses llm
+            model_policy: Optional model tier policy (default: ModelPolicy.from_env())
+            turn_policy: Optional per-turn limits and metrics (default: TurnPolicy.from_env())
+            prefetcher: Optional speculative contact reads (default: ContactPrefetcher.from_env())
         """
-        self.sheets_manager = sheets_manager
+        self._sheets_manager = sheets_manager
+        self.tenants = tenants
         self.credentials_file = credentials_file
         
-        # Initialize migraine sheets manager
-        self.migraine_sheet_id = "1Kp9c47qgiQQgDTdRq9vwkWIZsX7zfeVSTEtVJuy8qmA"
-        self.migraine_manager = None
-        if credentials_file:
-            try:
-                self.migraine_manager = SheetsManager(credentials_file, self.migraine_sheet_id)
-            except Exception as e:
-                print(f"Warning: Could not initialize migraine manager: {e}")
+        # The migraine sheet is opened lazily through the shared pool (see migraine_manager)
+        self.migraine_sheet_id = os.getenv('MIGRAINE_SPREADSHEET_ID', "1Kp9c47qgiQQgDTdRq9vwkWIZsX7zfeVSTEtVJuy8qmA")
+        self._migraine_manager = migraine_manager
         
-        self.llm = ChatOpenAI(
+        # Simple turns use the small model and escalate to the large one (see model_tiers)
+        self.model_policy = model_policy or ModelPolicy.from_env()
+        # Iterations, time and repeated tool calls allowed per turn (see turn_budget)
+        self.turn_policy = turn_policy or TurnPolicy.from_env()
+        # Contacts named in the message are read while the model plans (see contact_prefetch)
+        self.prefetcher = prefetcher or ContactPrefetcher.from_env()
+        self.llm = llm or ChatOpenAI(
             temperature=0,
-            model="gpt-4o",
+            model=self.model_policy.models[LARGE],
             openai_api_key=openai_api_key
         )
+        if small_llm is None and llm is None and self.model_policy.enabled:
+            small_llm = ChatOpenAI(
+                temperature=0,
+                model=self.model_policy.models[SMALL],
+                openai_api_key=openai_api_key
+            )
+        self.small_llm = small_llm
+        self._llms = {LARGE: self.llm, SMALL: self.small_llm}
+        # Passed per invocation, so injected models are traced and costed too
+        self._llm_callbacks = {tier: LLMTracingCallback(tier, self.model_policy) for tier in self._llms}
         
         # Create tools
         self.tools = self._create_tools()
         
-        # Create the agent
-        self.agent = self._create_agent()
+        # Create the agent (all tools, large model); other executors are built on demand
+        self._executors: Dict[Tuple[str, FrozenSet[str]], BudgetedAgentExecutor] = {}
+        self.agent = self._executor_for(ALL_INTENTS)
         
+    @property
+    def sheets_manager(self) -> SheetsManager:
+        """SheetsManager of the chat being served, or the default contacts sheet"""
+        return current_sheets_manager.get() or self._sheets_manager
+    
+    @sheets_manager.setter
+    def sheets_manager(self, manager: SheetsManager):
+        self._sheets_manager = manager
+    
+    @property
+    def migraine_manager(self) -> Optional[SheetsManager]:
+        """SheetsManager for the migraine sheet, opened on first use with the shared client"""
+        if self._migraine_manager is None and self.credentials_file:
+            try:
+                self._migraine_manager = SheetsPool.shared(self.credentials_file).manager(
+                    self.migraine_sheet_id, columns=SheetsManager.MIGRAINE_COLUMNS
+                )
+            except Exception as e:
+                print(f"Warning: Could not initialize migraine manager: {e}")
+        return self._migraine_manager
+    
     def _create_tools(self) -> list:
         """Create the tools for the agent"""
         
         def search_by_name_tool(name: str) -> str:
             """Search for contacts by name. Use this when you need to find a person."""
-            results = self.sheets_manager.search_by_name(name)
+            results = search_by_name(self.sheets_manager, name)
             if not results:
                 return f"No se encontraron contactos con el nombre '{name}'"
-            
-            # Format results for better readability
-            formatted_results = []
-            for contact in results:
-                formatted = {
-                    'Nombre': contact.get('Nombre', ''),
-                    'Teléfono': contact.get('Teléfono', '') or contact.get('Telefono', '') or 'No registrado',
-                    'Email': contact.get('Email', '') or 'No registrado',
-                    'Telegram': contact.get('Telegram', '') or 'No registrado',
-                    'Empresa': contact.get('Empresa', '') or 'No registrada',
-                    'Rol': contact.get('Rol', '') or 'No registrado',
-                    'bio': contact.get('bio', '') or 'Sin información',
-                    'bitácora': contact.get('bitácora', '') or contact.get('bitacora', '') or 'Sin entradas'
-                }
-                formatted_results.append(formatted)
-            
-            return json.dumps(formatted_results, ensure_ascii=False, indent=2)
+            return render_contacts(results)
         
         def search_by_company_tool(company: str) -> str:
             """Search for contacts by company. Use this when you need to find people from a specific company."""
             results = self.sheets_manager.search_by_field('Empresa', company)
             if not results:
                 return f"No se encontraron contactos de la empresa '{company}'"
-            
-            # Format results for better readability
-            formatted_results = []
-            for contact in results:
-                formatted = {
-                    'Nombre': contact.get('Nombre', ''),
-                    'Teléfono': contact.get('Teléfono', '') or contact.get('Telefono', '') or 'No registrado',
-                    'Email': contact.get('Email', '') or 'No registrado',
-                    'Telegram': contact.get('Telegram', '') or 'No registrado',
-                    'Empresa': contact.get('Empresa', '') or 'No registrada',
-                    'Rol': contact.get('Rol', '') or 'No registrado',
-                    'bio': contact.get('bio', '') or 'Sin información',
-                    'bitácora': contact.get('bitácora', '') or contact.get('bitacora', '') or 'Sin entradas'
-                }
-                formatted_results.append(formatted)
-            
-            return json.dumps(formatted_results, ensure_ascii=False, indent=2)
+            return render_contacts(results)
         
         def search_by_role_tool(role: str) -> str:
             """Search for contacts by role/position. Use this when you need to find people with a specific role."""
             results = self.sheets_manager.search_by_field('Rol', role)
             if not results:
                 return f"No se encontraron contactos con el rol '{role}'"
-            
-            # Format results for better readability
-            formatted_results = []
-            for contact in results:
-                formatted = {
-                    'Nombre': contact.get('Nombre', ''),
-                    'Teléfono': contact.get('Teléfono', '') or contact.get('Telefono', '') or 'No registrado',
-                    'Email': contact.get('Email', '') or 'No registrado',
-                    'Telegram': contact.get('Telegram', '') or 'No registrado',
-                    'Empresa': contact.get('Empresa', '') or 'No registrada',
-                    'Rol': contact.get('Rol', '') or 'No registrado',
-                    'bio': contact.get('bio', '') or 'Sin información',
-                    'bitácora': contact.get('bitácora', '') or contact.get('bitacora', '') or 'Sin entradas'
-                }
-                formatted_results.append(formatted)
-            
-            return json.dumps(formatted_results, ensure_ascii=False, indent=2)
+            return render_contacts(results)
         
         def get_all_contacts_tool(dummy: str = "") -> str:
             """Get all contacts in the database. Use this when you need to see all available contacts."""
             results = self.sheets_manager.get_all_records()
             if not results:
                 return "No hay contactos en la base de datos"
-            
-            # Format results for better readability
-            formatted_results = []
-            for contact in results:
-                formatted = {
-                    'Nombre': contact.get('Nombre', ''),
-                    'Teléfono': contact.get('Teléfono', '') or contact.get('Telefono', '') or 'No registrado',
-                    'Email': contact.get('Email', '') or 'No registrado',
-                    'Telegram': contact.get('Telegram', '') or 'No registrado',
-                    'Empresa': contact.get('Empresa', '') or 'No registrada',
-                    'Rol': contact.get('Rol', '') or 'No registrado',
-                    'bio': contact.get('bio', '') or 'Sin información',
-                    'bitácora': contact.get('bitácora', '') or contact.get('bitacora', '') or 'Sin entradas'
-                }
-                formatted_results.append(formatted)
-            
-            return json.dumps(formatted_results, ensure_ascii=False, indent=2)
+            return render_contacts(results)
         
         def get_current_datetime_tool(dummy: str = "") -> str:
             """
-            Get the current date and time. Use this when you need to know what day it is today,
-            or when the user mentions 'today', 'hoy', 'now', 'ahora', or any time-related query.
-            Returns the current date and time in Buenos Aires timezone.
+            Get the current date and time in Buenos Aires timezone.
+            The date is already in the prompt; this is only needed for the exact time.
             """
-            # Get current time in Buenos Aires timezone (Argentina)
-            # Using zoneinfo (Python 3.9+) - no external dependencies needed
-            argentina_tz = ZoneInfo('America/Argentina/Buenos_Aires')
-            now = datetime.now(argentina_tz)
-            
-            # Format in Spanish
-            day_name = now.strftime('%A')
-            day_names_spanish = {
-                'Monday': 'Lunes',
-                'Tuesday': 'Martes',
-                'Wednesday': 'Miércoles',
-                'Thursday': 'Jueves',
-                'Friday': 'Viernes',
-                'Saturday': 'Sábado',
-                'Sunday': 'Domingo'
-            }
-            day_name_es = day_names_spanish.get(day_name, day_name)
-            
-            month_name = now.strftime('%B')
-            month_names_spanish = {
-                'January': 'Enero',
-                'February': 'Febrero',
-                'March': 'Marzo',
-                'April': 'Abril',
-                'May': 'Mayo',
-                'June': 'Junio',
-                'July': 'Julio',
-                'August': 'Agosto',
-                'September': 'Septiembre',
-                'October': 'Octubre',
-                'November': 'Noviembre',
-                'December': 'Diciembre'
-            }
-            month_name_es = month_names_spanish.get(month_name, month_name)
-            
-            formatted_date = f"{day_name_es}, {now.day} de {month_name_es} de {now.year}"
-            formatted_time = now.strftime('%H:%M:%S')
-            formatted_short = now.strftime('%d/%m/%Y')
-            
-            return f"Fecha actual: {formatted_date}\nHora: {formatted_time}\nFecha formato corto: {formatted_short}"
+            now = date_context.now()
+            return f"Fecha actual: {date_context.describe(now)}\nHora: {now.strftime('%H:%M:%S')}\nFecha formato corto: {date_context.format_date(now.date())}"
         
         def update_bio_tool(input_str: str) -> str:
             """
@@ -407,16 +444,22 @@ class LeadsAgent:
                 if not record['Nombre']:
                     return "Error: El nombre es obligatorio para crear un nuevo contacto"
                 
-                # Check if contact already exists
-                existing = self.sheets_manager.search_by_name(record['Nombre'])
+                # Check if the contact (or a variant spelling of it) already exists;
+                # sharing only an email or phone with someone else doesn't block it
+                existing, shared = DuplicateFinder.from_sheet(self.sheets_manager).check_new(record, threshold=0.9)
                 if existing:
-                    return f"Ya existe un contacto con el nombre '{record['Nombre']}'. Usa las herramientas de actualización si quieres modificarlo."
+                    names = ', '.join(f"'{m['nombre']}' ({', '.join(m['motivos'])})" for m in existing[:3])
+                    return f"Ya existe un contacto similar a '{record['Nombre']}': {names}. Usa las herramientas de actualización si quieres modificarlo."
                 
                 # Add the new contact
                 success = self.sheets_manager.add_record(record)
                 
                 if success:
-                    return f"✅ Nuevo contacto '{record['Nombre']}' agregado exitosamente a la base de datos"
+                    message = f"✅ Nuevo contacto '{record['Nombre']}' agregado exitosamente a la base de datos"
+                    if shared:
+                        names = ', '.join(f"'{m['nombre']}' ({', '.join(m['motivos'])})" for m in shared[:3])
+                        message += f"\n⚠️ Comparte datos de contacto con: {names}"
+                    return message
                 else:
                     return f"No se pudo agregar el contacto '{record['Nombre']}'"
             except Exception as e:
@@ -426,13 +469,11 @@ class LeadsAgent:
             """
             Register a migraine episode to the migraine tracking sheet.
             Input format: 'fecha|intensidad|posible_causa'
-            - fecha: Date in DD/MM/YYYY format (use today's date if user says 'hoy' or 'today')
+            - fecha: Date in DD/MM/YYYY format ('hoy', 'ayer', 'el lunes' are resolved here)
             - intensidad: Intensity level (e.g., Baja, Media, Alta)
             - posible_causa: Possible cause or trigger of the migraine
             
             Example: '03/01/2026|Alta|Estrés laboral'
-            
-            IMPORTANT: Always use get_current_datetime tool first if user mentions 'today' or 'hoy'
             """
             try:
                 if not self.migraine_manager:
@@ -442,7 +483,7 @@ class LeadsAgent:
                 if len(parts) < 3:
                     return "Error: Formato incorrecto. Usa: 'fecha|intensidad|posible_causa'"
                 
-                fecha = parts[0].strip()
+                fecha = date_context.resolve_date_field(parts[0])
                 intensidad = parts[1].strip()
                 posible_causa = parts[2].strip()
                 
@@ -467,6 +508,75 @@ class LeadsAgent:
             except Exception as e:
                 return f"Error al registrar migraña: {str(e)}"
         
+        def migraine_stats_tool(input_str: str = "") -> str:
+            """
+            Get aggregated statistics of the migraine log.
+            Input format: 'periodo|intensidad_minima'
+            - periodo: hoy, esta_semana, este_mes, mes_pasado, ultimos_30_dias, este_año, todo,
+              or a range 'DD/MM/YYYY-DD/MM/YYYY' (default: todo)
+            - intensidad_minima: Baja, Media or Alta (optional)
+            
+            Example: 'este_mes|Alta'
+            """
+            try:
+                if not self.migraine_manager:
+                    return "Error: El gestor de migrañas no está disponible. Verifica las credenciales."
+                
+                parts = input_str.split('|')
+                period = parts[0].strip() if parts else ''
+                min_intensity = parse_intensity(parts[1]) if len(parts) > 1 else 0
+                
+                today = date_context.today()
+                start, end = resolve_period(period, today)
+                # Open-ended periods ('todo') end today, so the rolling windows
+                # count back from today and not from the last logged episode
+                if end is None:
+                    end = today
+                
+                log = MigraineLog.from_sheet(self.migraine_manager)
+                with tracing.span('migraine.summarize', episodes=len(log)):
+                    summary = log.summarize(start=start, end=end, min_intensity=min_intensity)
+                
+                return json.dumps(summary, ensure_ascii=False)
+            except ValueError as e:
+                return f"Error: {str(e)}. Usa: 'periodo|intensidad_minima'"
+            except Exception as e:
+                return f"Error al calcular estadísticas de migrañas: {str(e)}"
+        
+        def find_duplicates_tool(name: str = "") -> str:
+            """
+            Find contacts that are probably duplicates of each other.
+            Input: a name to restrict the search to, or empty for the whole database
+            """
+            try:
+                finder = DuplicateFinder.from_sheet(self.sheets_manager)
+                candidates = finder.candidates(name.strip() or None)
+                if not candidates:
+                    return "No se encontraron posibles contactos duplicados"
+                return json.dumps(candidates[:10], ensure_ascii=False)
+            except Exception as e:
+                return f"Error al buscar duplicados: {str(e)}"
+        
+        def merge_contacts_tool(input_str: str) -> str:
+            """
+            Merge a duplicate contact into another one and delete the duplicate.
+            Input format: 'nombre_a_conservar|nombre_duplicado'
+            
+            Example: 'Pablo Salomón|Pablo Salomon'
+            """
+            try:
+                parts = input_str.split('|')
+                if len(parts) < 2 or not parts[0].strip() or not parts[1].strip():
+                    return "Error: Formato incorrecto. Usa: 'nombre_a_conservar|nombre_duplicado'"
+                
+                result = merge_contacts(self.sheets_manager, parts[0].strip(), parts[1].strip())
+                if not result['ok']:
+                    return f"No se pudo fusionar: {result['mensaje']}"
+                fields = ', '.join(result['campos']) or 'ninguno'
+                return f"✅ {result['mensaje']}. Campos actualizados: {fields}"
+            except Exception as e:
+                return f"Error al fusionar contactos: {str(e)}"
+        
         # Create Tool objects
         tools = [
             Tool(
@@ -492,7 +602,7 @@ class LeadsAgent:
             Tool(
                 name="get_current_datetime",
                 func=get_current_datetime_tool,
-                description="Obtiene la fecha y hora actual. SIEMPRE usa esta herramienta cuando el usuario mencione 'hoy', 'today', 'ahora', 'now' o cualquier referencia temporal. OBLIGATORIO usarla antes de guardar fechas en la bitácora o bio."
+                description="Obtiene la hora exacta actual. La fecha de hoy ya está en el contexto: usa esta herramienta solo si necesitas la hora."
             ),
             Tool(
                 name="update_bio",
@@ -537,108 +647,169 @@ class LeadsAgent:
             Tool(
                 name="register_migraine",
                 func=register_migraine_tool,
-                description="Registra un episodio de migraña en la hoja de seguimiento. Formato: 'fecha|intensidad|posible_causa'. SIEMPRE usa get_current_datetime primero si el usuario menciona 'hoy' o 'today'. Ejemplo: '03/01/2026|Alta|Estrés laboral'"
+                description="Registra un episodio de migraña en la hoja de seguimiento. Formato: 'fecha|intensidad|posible_causa'. La fecha puede ser DD/MM/YYYY, 'hoy' o 'ayer'. Ejemplo: '03/01/2026|Alta|Estrés laboral'"
+            ),
+            Tool(
+                name="migraine_stats",
+                func=migraine_stats_tool,
+                description="Estadísticas de migrañas: cantidad de episodios, frecuencia, intensidad, ventanas de 7/30 días y causas principales. Formato: 'periodo|intensidad_minima'. Periodo: hoy, esta_semana, este_mes, mes_pasado, ultimos_30_dias, este_año, todo o 'DD/MM/YYYY-DD/MM/YYYY'. Ejemplo: 'este_mes|Alta'. No leas la hoja completa para responder preguntas sobre migrañas, usa esta herramienta."
+            ),
+            Tool(
+                name="find_duplicates",
+                func=find_duplicates_tool,
+                description="Busca contactos posiblemente duplicados (nombres parecidos, mismo email, teléfono o Telegram). Entrada: un nombre para limitar la búsqueda, o vacío para revisar toda la base."
+            ),
+            Tool(
+                name="merge_contacts",
+                func=merge_contacts_tool,
+                description="Fusiona un contacto duplicado en otro: combina bio y bitácora, completa campos vacíos y elimina el duplicado. Formato: 'nombre_a_conservar|nombre_duplicado'. SOLO úsala después de que el usuario confirme la fusión."
             )
         ]
         
+        # Resolve relative dates with the request's date before writing
+        for tool in tools:
+            if tool.name in RELATIVE_DATE_FIELDS:
+                tool.func = resolve_dates_in_field(tool.func, RELATIVE_DATE_FIELDS[tool.name])
+        
+        # Time every tool call as its own phase
+        for tool in tools:
+            tool.func = tracing.traced(f"tool.{tool.name}")(tool.func)
+        
+        # Repeated identical calls within a turn reuse the earlier result
+        for tool in tools:
+            tool.func = budgeted(tool.name, tool.func)
+        
         return tools
     
-    def _create_agent(self):
-        """Create the agent with tools"""
+    def _create_agent(self, intents: Iterable[str] = ALL_INTENTS, tier: str = LARGE):
+        """
+        Create the agent with the tools and prompt sections of some intents
+        
+        Args:
+            intents: Intents from prompts.INTENTS (default: all)
+            tier: Model tier (model_tiers.SMALL or LARGE)
+        """
+        
+        # System message: static core plus the intents' sections, in fixed order
+        system_message = build_system_prompt(intents)
+        names = set(tool_names(intents))
+        tools = [tool for tool in self.tools if tool.name in names]
         
-        # System message
-        system_message = """Eres un asistente inteligente que gestiona una base de datos de Leads y Contactos, y también ayuda a registrar episodios de migraña.
-
-Tu trabajo es ayudar al usuario a:
-1. Buscar información sobre contactos (por nombre, empresa, rol, etc.)
-2. Crear nuevos contactos en la base de datos
-3. Actualizar información de contactos existentes (bio, teléfono, email, telegram, empresa, rol, etc.)
-4. Añadir entradas a la bitácora de contactos
-5. Registrar episodios de migraña con fecha, intensidad y posible causa
-
-La base de datos de contactos tiene los siguientes campos:
-- Nombre: Nombre completo del contacto (obligatorio)
-- Teléfono: Número de teléfono (puede estar vacío o decir "No registrado")
-- Email: Dirección de correo electrónico (puede estar vacío o decir "No registrado")
-- Telegram: Usuario de Telegram (puede estar vacío o decir "No registrado")
-- Empresa: Empresa donde trabaja (puede estar vacío o decir "No registrada")
-- Rol: Su rol o posición (puede estar vacío o decir "No registrado")
-- bio: Biografía e información personal (puede estar vacío o decir "Sin información")
-- bitácora: Registro de interacciones y notas (puede estar vacío o decir "Sin entradas")
-
-La hoja de migrañas tiene los siguientes campos:
-- Fecha: Fecha del episodio en formato DD/MM/YYYY (obligatorio)
-- Intensidad: Nivel de intensidad (Baja, Media, Alta, o numérica) (obligatorio)
-- Posible causa: Causa o disparador de la migraña (obligatorio)
-
-IMPORTANTE - Presentación de información de contacto:
-- Si un campo dice "No registrado", "No registrada" o "Sin información", menciónalo naturalmente
-- NO digas "no hay información de contacto" si hay al menos UN campo con datos (teléfono, email o telegram)
-- Presenta la información disponible aunque algunos campos estén vacíos
-- Ejemplo: Si solo hay email, di "Email: juan@ejemplo.com. El teléfono y Telegram no están registrados"
-
-IMPORTANTE - Manejo de fechas y tiempo:
-- SIEMPRE que el usuario mencione "hoy", "today", "ahora", "esta semana" o cualquier referencia temporal, DEBES usar primero la herramienta get_current_datetime
-- Cuando guardes información con referencias temporales (ej: "reunión hoy", "llamada de hoy"), REEMPLAZA "hoy" con la fecha real en formato DD/MM/YYYY
-- Ejemplo: Si el usuario dice "añade a la bitácora de Juan: reunión hoy", primero obtén la fecha actual y luego guarda "reunión el 01/12/2025"
-- NUNCA guardes la palabra "hoy" o "today" sin convertirla a la fecha real
-
-IMPORTANTE - Registro de migrañas:
-- Cuando el usuario mencione palabras como "migraña", "dolor de cabeza", "jaqueca", "cefalea" y pida registrar, usa la herramienta register_migraine
-- SIEMPRE usa get_current_datetime primero si el usuario menciona "hoy", "today" o no especifica fecha
-- Extrae del mensaje del usuario: la intensidad (baja/media/alta o numérica) y la posible causa
-- Si falta alguna información, pregunta al usuario por ella antes de registrar
-- Confirma al usuario que el episodio fue registrado exitosamente
-
-Cuando el usuario te pida agregar información de contactos:
-1. Si menciona referencias temporales: primero usa get_current_datetime para obtener la fecha
-2. Busca al contacto por nombre para verificar si existe
-3. Si NO existe y el usuario quiere agregar información: usa add_new_contact para crearlo
-4. Si ya existe: usa las herramientas de actualización apropiadas (update_phone, update_email, update_telegram, etc.)
-5. Al guardar, reemplaza referencias temporales con fechas reales
-6. Confirma al usuario que la operación fue exitosa
-
-Responde siempre en español, de manera sucinta, sin repreguntar ni agregar información no solicitada."""
-
         # Create prompt
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_message),
             MessagesPlaceholder(variable_name="chat_history", optional=True),
+            # Per-request context (current date) goes after the static prefix
+            ("system", "{context}"),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad")
         ])
         
         # Create the agent
         agent = create_openai_functions_agent(
-            llm=self.llm,
-            tools=self.tools,
+            llm=self._llms[tier],
+            tools=tools,
             prompt=prompt
         )
         
         # Create agent executor
-        agent_executor = AgentExecutor(
+        agent_executor = BudgetedAgentExecutor(
             agent=agent,
-            tools=self.tools,
+            tools=tools,
             verbose=True,
-            max_iterations=5,
-            handle_parsing_errors=True
+            max_iterations=self.turn_policy.max_iterations,
+            handle_parsing_errors=True,
+            # Tool results are checked to decide whether to escalate
+            return_intermediate_steps=True
         )
         
         return agent_executor
     
-    def process_query(self, query: str) -> str:
+    def _executor_for(self, intents: FrozenSet[str], tier: str = LARGE) -> BudgetedAgentExecutor:
+        """Get the cached executor for a tier and set of intents, creating it on first use"""
+        executor = self._executors.get((tier, intents))
+        if executor is None:
+            executor = self._executors[(tier, intents)] = self._create_agent(intents, tier)
+        return executor
+    
+    def _run_tier(self, tier: str, intents: FrozenSet[str], inputs: Dict) -> Dict:
+        """Run one turn with a tier's model, timing it per tier"""
+        executor = self._executor_for(intents, tier)
+        turn = current_turn.get()
+        if turn is not None:
+            turn.begin_run()
+        start = time.perf_counter()
+        try:
+            with tracing.span(f'agent.tier.{tier}', model=self.model_policy.models[tier]):
+                return executor.invoke(inputs, config={'callbacks': [self._llm_callbacks[tier]]})
+        finally:
+            self.model_policy.record_turn(tier, (time.perf_counter() - start) * 1000)
+    
+    def process_query(self, query: str, chat_id: Optional[int] = None) -> str:
         """
         Process a user query
         
         Args:
             query: The user's question or command
+            chat_id: Telegram chat id, used to pick the chat's own sheet when tenants are configured
             
         Returns:
             The agent's response
         """
-        try:
-            response = self.agent.invoke({"input": query})
-            return response.get("output", "Lo siento, no pude procesar tu solicitud.")
-        except Exception as e:
-            return f"Error al procesar la consulta: {str(e)}"
-
+        return self.process_turn(query, chat_id)[0]
+    
+    def process_turn(self, query: str, chat_id: Optional[int] = None) -> Tuple[str, Dict]:
+        """
+        Process a user query and report the turn's metrics
+        
+        Simple turns are answered by the small model; if it hits a tool error
+        or doesn't finish, the turn is answered again by the large model.
+        The whole turn runs under turn_policy: its metrics are returned with
+        the response (each call gets its own, so concurrent chats don't mix
+        them up) and recorded in the 'agent.process_query' span.
+        
+        Args:
+            query: The user's question or command
+            chat_id: Telegram chat id, used to pick the chat's own sheet when tenants are configured
+            
+        Returns:
+            Tuple (the agent's response, turn summary from turn_budget.Turn.summary)
+        """
+        with tracing.span('agent.process_query') as s, self.turn_policy.turn() as turn:
+            try:
+                intents = route_intents(query)
+                tier, confidence, reason = LARGE, 1.0, 'sin modelo chico'
+                if self.small_llm is not None:
+                    tier, confidence, reason = self.model_policy.select(query, intents)
+                names = tool_names(intents)
+                s.set(intents=sorted(intents), tools=len(names), tier=tier,
+                      tier_confidence=confidence, tier_reason=reason)
+                with date_context.request_time() as now:
+                    inputs = {"input": query, "context": date_context.prompt_context(now)}
+                    tenant = self.tenants.activate(chat_id) if self.tenants is not None else contextlib.nullcontext()
+                    with tenant, self.prefetcher.speculate(self.sheets_manager, query, enabled=CONTACTS in intents):
+                        if tier == SMALL:
+                            try:
+                                response = self._run_tier(SMALL, intents, inputs)
+                                escalation = self.model_policy.escalation_reason(response, names)
+                            except Exception as e:
+                                escalation = f"excepción: {e}"
+                            # Out of time: answer with what we have instead of starting over
+                            if escalation and turn.stop_reason != 'tiempo':
+                                print(f"⤴️ Escalando al modelo grande: {escalation}")
+                                self.model_policy.record_escalation()
+                                s.set(escalated=escalation)
+                                response = self._run_tier(LARGE, intents, inputs)
+                        else:
+                            response = self._run_tier(LARGE, intents, inputs)
+                if turn.stop_reason:
+                    print(f"⛔ Turno cortado: {turn.stop_reason}")
+                    answer = turn.stop_message()
+                else:
+                    answer = response.get("output", "Lo siento, no pude procesar tu solicitud.")
+            except Exception as e:
+                s.set(error=str(e))
+                answer = f"Error al procesar la consulta: {str(e)}"
+            summary = turn.summary()
+            s.set(turn=summary)
+            return answer, summary
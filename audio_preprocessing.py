@@ -0,0 +1,159 @@
+"""
+Audio preprocessing before transcription
+Downmixes to mono, resamples to 16 kHz, trims leading and trailing silence and
+splits long audio into chunks, so Whisper uploads are smaller, stay under the
+25 MB limit and long files can be transcribed in parallel. The duration is read
+from the file's metadata (ffprobe or mediainfo) and every chunk is transcoded by
+ffmpeg as a stream, so the audio is never decoded into memory as a whole. If
+the tools are missing or fail, the original file is uploaded as is
+"""
+
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import List, Optional
+
+
+class AudioPreprocessor:
+    """Shrinks audio files with ffmpeg before they are sent to Whisper"""
+
+    def __init__(self, enabled: bool = True, sample_rate: int = 16000, chunk_seconds: int = 600,
+                 min_bytes: int = 1_000_000, export_format: str = 'mp3', bitrate: str = '32k',
+                 silence_threshold_db: float = -40.0, keep_silence_ms: int = 250, timeout_seconds: float = 300):
+        """
+        Args:
+            enabled: False uploads every file unchanged
+            sample_rate: Output sample rate (Whisper works at 16 kHz)
+            chunk_seconds: Longest piece sent in one transcription request
+            min_bytes: Smaller files are uploaded unchanged (short voice notes are already
+                small Opus files; transcoding them costs more than it saves)
+            export_format: Container of the processed audio ('mp3', 'ogg', 'wav', ...)
+            bitrate: Bitrate of the processed audio
+            silence_threshold_db: Audio quieter than this (dBFS) at the ends is silence
+            keep_silence_ms: Silence kept at each end so the first and last words aren't cut
+            timeout_seconds: Longest an ffmpeg/ffprobe run may take
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.chunk_seconds = chunk_seconds
+        self.min_bytes = min_bytes
+        self.export_format = export_format
+        self.bitrate = bitrate
+        self.silence_threshold_db = silence_threshold_db
+        self.keep_silence_ms = keep_silence_ms
+        self.timeout_seconds = timeout_seconds
+
+    @classmethod
+    def from_env(cls) -> 'AudioPreprocessor':
+        """
+        Build the preprocessor from environment variables
+
+        AUDIO_PREPROCESSING: 'false' to upload audio unchanged (default true)
+        AUDIO_SAMPLE_RATE: output sample rate (default 16000)
+        AUDIO_CHUNK_SECONDS: longest chunk per transcription request (default 600)
+        AUDIO_PREPROCESS_MIN_BYTES: smaller files are uploaded unchanged (default 1000000)
+        """
+        return cls(
+            enabled=os.getenv('AUDIO_PREPROCESSING', 'true').lower() != 'false',
+            sample_rate=int(os.getenv('AUDIO_SAMPLE_RATE', '16000')),
+            chunk_seconds=int(os.getenv('AUDIO_CHUNK_SECONDS', '600')),
+            min_bytes=int(os.getenv('AUDIO_PREPROCESS_MIN_BYTES', '1000000')),
+        )
+
+    def _run(self, args: List[str]) -> str:
+        """Run a command line tool and return its output"""
+        result = subprocess.run(args, capture_output=True, text=True, timeout=self.timeout_seconds, check=True)
+        return result.stdout
+
+    def probe_duration(self, path: str) -> Optional[float]:
+        """
+        Duration of an audio file, read from its metadata without decoding it
+
+        Uses ffprobe, or mediainfo when ffprobe is not installed.
+
+        Args:
+            path: Audio file
+
+        Returns:
+            Duration in seconds, or None if no tool is available or the file has no duration
+        """
+        if shutil.which('ffprobe'):
+            output = self._run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+                                '-of', 'default=noprint_wrappers=1:nokey=1', path])
+            scale = 1
+        elif shutil.which('mediainfo'):
+            # mediainfo reports milliseconds
+            output = self._run(['mediainfo', '--Inform=General;%Duration%', path])
+            scale = 1000
+        else:
+            return None
+        try:
+            seconds = float(output.strip()) / scale
+        except ValueError:
+            return None
+        return seconds if seconds > 0 else None
+
+    def _silence_filters(self, first: bool, last: bool) -> List[str]:
+        trim = (f"silenceremove=start_periods=1:start_silence={self.keep_silence_ms / 1000}"
+                f":start_threshold={self.silence_threshold_db}dB")
+        filters = [trim] if first else []
+        if last:
+            # Trailing silence is trimmed from the reversed chunk: only the last chunk is buffered
+            filters += ['areverse', trim, 'areverse']
+        return filters
+
+    def _transcode(self, path: str, offset: float, filters: List[str], output: str):
+        """Transcode one chunk of the file with ffmpeg, reading only that stretch of it"""
+        args = ['ffmpeg', '-v', 'error', '-nostdin', '-y', '-ss', str(offset), '-t', str(self.chunk_seconds),
+                '-i', path, '-vn', '-ac', '1', '-ar', str(self.sample_rate)]
+        if filters:
+            args += ['-af', ','.join(filters)]
+        self._run(args + ['-b:a', self.bitrate, output])
+
+    def prepare(self, path: str) -> List[str]:
+        """
+        Preprocess an audio file (blocking; run it off the event loop)
+
+        Args:
+            path: Downloaded audio file
+
+        Returns:
+            Files to transcribe, in order: [path] when the file is small or can't
+            be processed, otherwise new temporary files (remove them with cleanup)
+        """
+        if not self.enabled or os.path.getsize(path) < self.min_bytes:
+            return [path]
+        try:
+            if not shutil.which('ffmpeg'):
+                raise RuntimeError("ffmpeg is not installed")
+            duration = self.probe_duration(path)
+            if duration is None:
+                raise RuntimeError("could not read the audio duration")
+
+            offsets = list(range(0, math.ceil(duration), self.chunk_seconds))
+            paths = []
+            try:
+                for index, offset in enumerate(offsets):
+                    with tempfile.NamedTemporaryFile(suffix=f'.{self.export_format}', delete=False) as out:
+                        paths.append(out.name)
+                    last = index == len(offsets) - 1
+                    self._transcode(path, offset, self._silence_filters(index == 0, last), paths[-1])
+                # A last chunk that was only silence would be rejected by Whisper as too short
+                if len(paths) > 1 and (self.probe_duration(paths[-1]) or 0) < 0.1:
+                    os.unlink(paths.pop())
+            except Exception:
+                self.cleanup(paths, path)
+                raise
+            return paths or [path]
+        except Exception as e:
+            print(f"Warning: audio preprocessing failed, uploading the original file: {e}")
+            return [path]
+
+    @staticmethod
+    def cleanup(paths: List[str], original: str):
+        """Remove the temporary files made by prepare (the original is left alone)"""
+        for path in paths:
+            if path != original and os.path.exists(path):
+                os.unlink(path)
@@ -0,0 +1,346 @@
+"""
+In-memory fake of the gspread Worksheet/Spreadsheet/Client API
+Used by the benchmarks to drive SheetsManager without network access
+"""
+
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import a1_range_to_grid_range
+
+
+CONTACT_HEADERS = ['Nombre', 'Teléfono', 'Email', 'Telegram', 'Empresa', 'Rol', 'bio', 'bitácora']
+MIGRAINE_HEADERS = ['Fecha', 'Intensidad', 'Posible causa']
+
+FIRST_NAMES = ['Pablo', 'María', 'Juan', 'Lucía', 'Martín', 'Sofía', 'Diego', 'Valentina', 'Tomás', 'Camila',
+               'Nicolás', 'Agustina', 'Joaquín', 'Florencia', 'Santiago', 'Julieta', 'Matías', 'Rocío']
+LAST_NAMES = ['Salomón', 'García', 'Pérez', 'González', 'Rodríguez', 'Fernández', 'López', 'Martínez',
+              'Gómez', 'Díaz', 'Álvarez', 'Romero', 'Sosa', 'Benítez', 'Herrera', 'Acosta']
+COMPANIES = ['Tech Corp', 'Globant', 'Mercado Libre', 'Ualá', 'Despegar', 'Naranja X', 'Auth0', 'Satellogic']
+ROLES = ['CEO', 'CTO', 'Product Manager', 'Desarrollador', 'Diseñadora', 'Inversor', 'Fundador', 'Ventas']
+
+
+class FakeCell:
+    """Minimal stand-in for gspread.Cell"""
+
+    def __init__(self, row: int, col: int, value: str):
+        self.row = row
+        self.col = col
+        self.value = value
+
+
+class FakeValueRange(list):
+    """Minimal stand-in for gspread ValueRange (a list of rows with a range name)"""
+
+    def __init__(self, values, range_name: str = ''):
+        super().__init__(values)
+        self.range = range_name
+
+
+class FakeWorksheet:
+    """
+    In-memory worksheet implementing the subset of the gspread Worksheet API used by the bot
+
+    Every API method counts as one request in `calls` and sleeps `latency_ms` to
+    emulate the Google Sheets round trip.
+    """
+
+    def __init__(self, rows: List[List[str]], title: str = 'Sheet1', latency_ms: float = 0.0,
+                 spreadsheet: Optional['FakeSpreadsheet'] = None):
+        """
+        Args:
+            rows: Sheet contents including the header row
+            title: Worksheet title
+            latency_ms: Simulated latency per API call
+            spreadsheet: Parent spreadsheet, if any
+        """
+        self._rows = [list(r) for r in rows]
+        self.title = title
+        self.latency_ms = latency_ms
+        self.spreadsheet = spreadsheet
+        self.id = random.randint(0, 2 ** 31)
+        self.calls: Counter = Counter()
+
+    # ---- helpers -----------------------------------------------------------
+
+    def _request(self, method: str, write: bool = False):
+        self.calls[method] += 1
+        if write and self.spreadsheet is not None:
+            self.spreadsheet.touch()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def _width(self) -> int:
+        return max((len(r) for r in self._rows), default=0)
+
+    def _padded(self, row: List[str], width: int) -> List[str]:
+        return row + [''] * (width - len(row))
+
+    def _ensure_size(self, row: int, col: int):
+        while len(self._rows) < row:
+            self._rows.append([])
+        target = self._rows[row - 1]
+        if len(target) < col:
+            target.extend([''] * (col - len(target)))
+
+    @property
+    def row_count(self) -> int:
+        return len(self._rows)
+
+    @property
+    def api_calls(self) -> int:
+        """Total number of API requests served"""
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    # ---- read API ----------------------------------------------------------
+
+    def get_all_values(self, **kwargs) -> List[List[str]]:
+        self._request('get_all_values')
+        width = self._width()
+        # Copy like a JSON round trip would
+        return [self._padded(list(r), width) for r in self._rows]
+
+    def get_all_records(self, **kwargs) -> List[Dict]:
+        self._request('get_all_records')
+        if not self._rows:
+            return []
+        width = self._width()
+        headers = self._padded(list(self._rows[0]), width)
+        return [dict(zip(headers, self._padded(list(r), width))) for r in self._rows[1:]]
+
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        self._request('row_values')
+        if row > len(self._rows):
+            return []
+        values = list(self._rows[row - 1])
+        while values and values[-1] == '':
+            values.pop()
+        return values
+
+    def col_values(self, col: int, **kwargs) -> List[str]:
+        self._request('col_values')
+        values = [r[col - 1] if col - 1 < len(r) else '' for r in self._rows]
+        while values and values[-1] == '':
+            values.pop()
+        return values
+
+    def cell(self, row: int, col: int, **kwargs) -> FakeCell:
+        self._request('cell')
+        value = ''
+        if row <= len(self._rows) and col <= len(self._rows[row - 1]):
+            value = self._rows[row - 1][col - 1]
+        return FakeCell(row, col, value or None)
+
+    def _read_range(self, range_name: str) -> FakeValueRange:
+        grid = a1_range_to_grid_range(range_name.split('!')[-1])
+        start_row = grid.get('startRowIndex', 0)
+        end_row = grid.get('endRowIndex', len(self._rows))
+        start_col = grid.get('startColumnIndex', 0)
+        end_col = grid['endColumnIndex'] if 'endColumnIndex' in grid else self._width()
+        values = []
+        for r in self._rows[start_row:end_row]:
+            values.append(list(r[start_col:end_col]))
+        # The API drops trailing empty rows and cells
+        for v in values:
+            while v and v[-1] == '':
+                v.pop()
+        while values and not values[-1]:
+            values.pop()
+        return FakeValueRange(values, range_name)
+
+    def get(self, range_name: str = None, **kwargs) -> FakeValueRange:
+        self._request('get')
+        return self._read_range(range_name) if range_name else FakeValueRange(self.get_all_values())
+
+    def batch_get(self, ranges: List[str], **kwargs) -> List[FakeValueRange]:
+        self._request('batch_get')
+        return [self._read_range(r) for r in ranges]
+
+    # ---- write API ---------------------------------------------------------
+
+    def update_cell(self, row: int, col: int, value):
+        self._request('update_cell', write=True)
+        self._ensure_size(row, col)
+        self._rows[row - 1][col - 1] = str(value)
+
+    def _write_range(self, range_name: str, values: List[List]):
+        grid = a1_range_to_grid_range(range_name.split('!')[-1])
+        start_row = grid.get('startRowIndex', 0)
+        start_col = grid.get('startColumnIndex', 0)
+        for i, row_values in enumerate(values):
+            for j, value in enumerate(row_values):
+                self._ensure_size(start_row + i + 1, start_col + j + 1)
+                self._rows[start_row + i][start_col + j] = str(value)
+
+    def update(self, range_name, values=None, **kwargs):
+        self._request('update', write=True)
+        self._write_range(range_name, values or [])
+
+    def batch_update(self, data: List[Dict], **kwargs):
+        self._request('batch_update', write=True)
+        for item in data:
+            self._write_range(item['range'], item['values'])
+
+    def append_row(self, values: List, **kwargs):
+        self._request('append_row', write=True)
+        self._rows.append([str(v) for v in values])
+
+    def append_rows(self, values: List[List], **kwargs):
+        self._request('append_rows', write=True)
+        for row in values:
+            self._rows.append([str(v) for v in row])
+
+    def delete_rows(self, start_index: int, end_index: int = None):
+        self._request('delete_rows', write=True)
+        end_index = end_index or start_index
+        del self._rows[start_index - 1:end_index]
+
+
+class FakeSpreadsheet:
+    """
+    Minimal stand-in for gspread.Spreadsheet
+
+    Every write on any of its worksheets bumps `version`, like Drive does;
+    `client` answers the Drive metadata request used for change detection.
+    """
+
+    def __init__(self, spreadsheet_id: str, worksheets: Dict[str, List[List[str]]], latency_ms: float = 0.0):
+        self.id = spreadsheet_id
+        self.latency_ms = latency_ms
+        self.version = 1
+        self.modified_time = time.time()
+        self.calls: Counter = Counter()
+        self._worksheets = {
+            title: FakeWorksheet(rows, title=title, latency_ms=latency_ms, spreadsheet=self)
+            for title, rows in worksheets.items()
+        }
+        self.client = FakeClient({spreadsheet_id: self})
+
+    def touch(self):
+        """Mark the file as modified (used by writes on any worksheet)"""
+        self.version += 1
+        self.modified_time = time.time()
+
+    def drive_metadata(self) -> Dict:
+        """Drive files.get response for this file"""
+        self.calls['drive.files.get'] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        modified = datetime.fromtimestamp(self.modified_time, tz=timezone.utc)
+        return {
+            'id': self.id,
+            'version': str(self.version),
+            'modifiedTime': modified.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        }
+
+    @property
+    def api_calls(self) -> int:
+        """Drive requests served (worksheet requests are counted by each worksheet)"""
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    @property
+    def sheet1(self) -> FakeWorksheet:
+        return next(iter(self._worksheets.values()))
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._worksheets[title]
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        return list(self._worksheets.values())
+
+
+class FakeResponse:
+    """Minimal stand-in for a requests.Response"""
+
+    def __init__(self, payload: Dict):
+        self._payload = payload
+
+    def json(self) -> Dict:
+        return self._payload
+
+
+class FakeClient:
+    """Minimal stand-in for an authorized gspread.Client, including the Drive files.get endpoint"""
+
+    def __init__(self, spreadsheets: Dict[str, FakeSpreadsheet]):
+        self._spreadsheets = spreadsheets
+        self.opened: Counter = Counter()
+        for spreadsheet in spreadsheets.values():
+            spreadsheet.client = self
+
+    def request(self, method: str, endpoint: str, params: Optional[Dict] = None, **kwargs) -> FakeResponse:
+        prefix = DRIVE_FILES_API_V3_URL + '/'
+        if method.lower() != 'get' or not endpoint.startswith(prefix):
+            raise NotImplementedError(f"FakeClient does not serve {method} {endpoint}")
+        return FakeResponse(self._spreadsheets[endpoint[len(prefix):]].drive_metadata())
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        self.opened[key] += 1
+        spreadsheet = self._spreadsheets[key]
+        if spreadsheet.latency_ms:
+            time.sleep(spreadsheet.latency_ms / 1000)
+        return spreadsheet
+
+
+def make_contact_rows(count: int, seed: int = 42, log_entries: int = 3) -> List[List[str]]:
+    """
+    Generate a realistic contacts sheet (header + `count` rows)
+
+    Args:
+        count: Number of contacts
+        seed: Random seed so runs are comparable
+        log_entries: Number of bitácora lines per contact (drives payload size)
+
+    Returns:
+        Rows including the header row
+    """
+    rng = random.Random(seed)
+    rows = [list(CONTACT_HEADERS)]
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        # Suffix keeps names unique at large row counts
+        name = f"{first} {last}" if i < len(FIRST_NAMES) * len(LAST_NAMES) else f"{first} {last} {i}"
+        handle = f"@{first.lower()}{i}"
+        log = '\n'.join(
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025 - Reunión sobre proyecto {rng.randint(1, 99)}"
+            for _ in range(log_entries)
+        )
+        rows.append([
+            name,
+            f"+54 9 11 {rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}" if rng.random() < 0.7 else '',
+            f"{first.lower()}.{i}@example.com" if rng.random() < 0.8 else '',
+            handle if rng.random() < 0.5 else '',
+            rng.choice(COMPANIES),
+            rng.choice(ROLES),
+            f"Conocido en evento {rng.randint(1, 50)}. Le interesa {rng.choice(COMPANIES)}.",
+            log,
+        ])
+    # Make sure the names used by the recordings always exist
+    rows[1][0] = 'Pablo Salomón'
+    return rows
+
+
+def make_migraine_rows(count: int, seed: int = 7) -> List[List[str]]:
+    """Generate a migraine tracking sheet (header + `count` rows)"""
+    rng = random.Random(seed)
+    rows = [list(MIGRAINE_HEADERS)]
+    for _ in range(count):
+        rows.append([
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+            rng.choice(['Baja', 'Media', 'Alta']),
+            rng.choice(['Estrés laboral', 'Falta de sueño', 'Cambio de clima', 'Alcohol', 'Pantallas']),
+        ])
+    return rows
@@ -0,0 +1,599 @@
+"""
+Load generator for the Lambda webhook handler
+Synthesizes Telegram updates (text, voice, audio, commands) and fires them at
+lambda_handler, process_update or the webhook server with Telegram, OpenAI and Sheets stubbed out.
+
+Reports throughput, tail latency, cold vs warm cost and memory growth.
+
+Usage:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --requests 5000 --rate 20 --concurrency 4
+    python -m benchmarks.load_test --target process_update --rate 50 --burst 25
+    python -m benchmarks.load_test --target webhook_server --workers 8 --llm-latency-ms 500
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import itertools
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from telegram.ext import Application
+from telegram.request import BaseRequest
+
+from benchmarks.fake_sheets import FakeSpreadsheet, make_contact_rows, make_migraine_rows
+from benchmarks.recorded_llm import RecordedChatModel
+from benchmarks.run import RECORDINGS
+
+
+FAKE_TOKEN = '123456:LOADTEST'
+
+
+class FakeTelegramRequest(BaseRequest):
+    """Answers Bot API calls locally so no request leaves the process"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls: Dict[str, int] = {}
+        self._message_ids = itertools.count(1000)
+        self._lock = threading.Lock()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None) -> Tuple[int, bytes]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        if '/file/bot' in url:
+            # File download: a few KB of fake audio
+            return 200, b'\x00' * 4096
+
+        endpoint = url.rsplit('/', 1)[-1]
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        params = request_data.parameters if request_data else {}
+
+        if endpoint == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'LoadTest', 'username': 'loadtest_bot'}
+        elif endpoint in ('sendMessage', 'editMessageText'):
+            result = {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': params.get('chat_id', 0), 'type': 'private'},
+                'text': params.get('text', ''),
+            }
+        elif endpoint == 'getFile':
+            file_id = params.get('file_id', 'file')
+            extension = 'mp3' if file_id.startswith('audio') else 'oga'
+            result = {'file_id': file_id, 'file_unique_id': file_id, 'file_size': 4096,
+                      'file_path': f'files/{file_id}.{extension}'}
+        else:
+            result = True
+
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+class FakeTranscriptions:
+    """Stand-in for openai_client.audio.transcriptions"""
+
+    def __init__(self, texts: List[str], latency_ms: float):
+        self.texts = texts
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self._rng = random.Random(3)
+
+    def create(self, model: str, file, language: str = None, **kwargs):
+        self.calls += 1
+        file.read()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return SimpleNamespace(text=self._rng.choice(self.texts))
+
+
+class FakeOpenAI:
+    """Stand-in for openai.OpenAI exposing only audio transcriptions"""
+
+    def __init__(self, texts: List[str], latency_ms: float):
+        self.audio = SimpleNamespace(transcriptions=FakeTranscriptions(texts, latency_ms))
+
+
+class UpdateFactory:
+    """Builds realistic Telegram Update payloads"""
+
+    COMMANDS = ['/start', '/help']
+
+    def __init__(self, queries: List[str], chats: int, mix: Dict[str, float], seed: int = 1):
+        self.queries = queries
+        self.chat_ids = [100000 + i for i in range(chats)]
+        self.kinds = list(mix)
+        self.weights = [mix[k] for k in self.kinds]
+        self._rng = random.Random(seed)
+        self._update_ids = itertools.count(500000000)
+
+    def _message(self, update_id: int, chat_id: int) -> Dict:
+        return {
+            'message_id': update_id % 100000,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Carga'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Carga', 'language_code': 'es'},
+        }
+
+    def make(self, kind: Optional[str] = None) -> Tuple[str, Dict]:
+        """
+        Build one update
+
+        Returns:
+            Tuple of (kind, update payload)
+        """
+        kind = kind or self._rng.choices(self.kinds, self.weights)[0]
+        update_id = next(self._update_ids)
+        message = self._message(update_id, self._rng.choice(self.chat_ids))
+
+        if kind == 'text':
+            message['text'] = self._rng.choice(self.queries)
+        elif kind == 'command':
+            command = self._rng.choice(self.COMMANDS)
+            message['text'] = command
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+        elif kind == 'voice':
+            message['voice'] = {'file_id': f'voice{update_id}', 'file_unique_id': f'v{update_id}',
+                                'duration': self._rng.randint(2, 40), 'mime_type': 'audio/ogg',
+                                'file_size': 4096}
+        elif kind == 'audio':
+            message['audio'] = {'file_id': f'audio{update_id}', 'file_unique_id': f'a{update_id}',
+                                'duration': self._rng.randint(30, 300), 'mime_type': 'audio/mpeg',
+                                'file_name': 'nota.mp3', 'file_size': 4096}
+        else:
+            raise ValueError(f"Unknown update kind: {kind}")
+
+        return kind, {'update_id': update_id, 'message': message}
+
+
+class StubbedLambda:
+    """
+    Wires lambda_function to in-process fakes
+
+    The real initialize_components runs, but SheetsManager, LeadsAgent, OpenAI
+    and the Telegram Application builder are swapped for stubbed versions.
+    """
+
+    def __init__(self, rows: int, sheets_latency_ms: float, llm_latency_ms: float,
+                 whisper_latency_ms: float, telegram_latency_ms: float):
+        import lambda_function
+        from agent import LeadsAgent
+
+        self.module = lambda_function
+        with open(RECORDINGS, encoding='utf-8') as f:
+            self.recordings = json.load(f)['turns']
+
+        contacts = FakeSpreadsheet('contacts', {'Contactos': make_contact_rows(rows)}, latency_ms=sheets_latency_ms)
+        migraines = FakeSpreadsheet('migraines', {'Migrañas': make_migraine_rows(200)}, latency_ms=sheets_latency_ms)
+        self.worksheets = [contacts.sheet1, migraines.sheet1, contacts, migraines]
+        self.telegram_request = FakeTelegramRequest(telegram_latency_ms)
+        self.openai = FakeOpenAI(list(self.recordings), whisper_latency_ms)
+        self.llm = RecordedChatModel(recordings=self.recordings, latency_ms=llm_latency_ms)
+
+        stub = self
+
+        def sheets_manager_factory(credentials_file, spreadsheet_id):
+            return lambda_function.SheetsManager.from_worksheet(contacts.sheet1)
+
+        def agent_factory(sheets_manager, openai_api_key, credentials_file=None, **kwargs):
+            from sheets_manager import SheetsManager
+            migraine_manager = SheetsManager.from_worksheet(migraines.sheet1)
+            return LeadsAgent(sheets_manager, openai_api_key, llm=stub.llm, migraine_manager=migraine_manager)
+
+        class StubApplication:
+            @staticmethod
+            def builder():
+                return Application.builder().request(stub.telegram_request).get_updates_request(FakeTelegramRequest())
+
+        lambda_function.SheetsManager = _CallableNamespace(sheets_manager_factory)
+        lambda_function.LeadsAgent = agent_factory
+        lambda_function.OpenAI = lambda api_key=None: stub.openai
+        lambda_function.Application = StubApplication
+
+        os.environ.setdefault('TELEGRAM_API', FAKE_TOKEN)
+        os.environ.setdefault('SPREADSHEET_ID', 'contacts')
+        os.environ.setdefault('OPENAI_API_KEY', 'load-test')
+
+    def reset(self):
+        """Drop the warm globals so the next invocation takes the cold path"""
+        self.module.sheets_manager = None
+        self.module.agent = None
+        self.module.openai_client = None
+        self.module.transcriber = None
+        self.module.application = None
+        self.module.application_initialized = False
+        # A new container starts with no pending Telegram send slots
+        self.module.outbox = self.module.TelegramOutbox.from_env()
+
+    def api_calls(self) -> int:
+        return sum(ws.api_calls for ws in self.worksheets)
+
+
+class _CallableNamespace:
+    """Callable replacement for SheetsManager that keeps its static helpers"""
+
+    def __init__(self, factory):
+        from sheets_manager import SheetsManager
+        self._factory = factory
+        self._cls = SheetsManager
+
+    def __call__(self, *args, **kwargs):
+        return self._factory(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cls, name)
+
+
+def rss_kib() -> float:
+    """Current resident set size in KiB"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024
+    except (OSError, ValueError):
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50), 2),
+        'p95_ms': round(percentile(values, 95), 2),
+        'p99_ms': round(percentile(values, 99), 2),
+        'max_ms': round(max(values), 2) if values else 0.0,
+        'mean_ms': round(statistics.fmean(values), 2) if values else 0.0,
+    }
+
+
+def arrival_offsets(count: int, rate: float, burst: int) -> List[float]:
+    """
+    Open-loop arrival schedule (seconds from start)
+
+    With burst > 1, updates arrive in groups of `burst` at the same instant,
+    keeping the same average rate.
+    """
+    if rate <= 0:
+        return [0.0] * count
+    offsets = []
+    for i in range(count):
+        group = i // max(1, burst)
+        offsets.append(group * max(1, burst) / rate)
+    return offsets
+
+
+def build_updates(factory: UpdateFactory, requests: int, duplicates: float) -> List[Tuple[str, Dict]]:
+    """
+    Build the update sequence, re-sending a fraction of them like Telegram retries do
+
+    Args:
+        factory: Update factory
+        requests: Total number of deliveries
+        duplicates: Fraction of deliveries that are redeliveries of an earlier update
+    """
+    rng = random.Random(11)
+    updates, originals = [], []
+    for _ in range(requests):
+        if originals and rng.random() < duplicates:
+            kind, payload = rng.choice(originals[-50:])
+            updates.append((f"{kind} (retry)", payload))
+        else:
+            original = factory.make()
+            originals.append(original)
+            updates.append(original)
+    return updates
+
+
+def invoke_lambda(stub: StubbedLambda, payload: Dict) -> int:
+    event = {'body': json.dumps(payload), 'isBase64Encoded': False}
+    result = stub.module.lambda_handler(event, SimpleNamespace(function_name='load-test'))
+    return result.get('statusCode', 0)
+
+
+def run_lambda_load(stub: StubbedLambda, factory: UpdateFactory, requests: int, rate: float,
+                    burst: int, concurrency: int, memory_every: int, duplicates: float = 0.0) -> Dict:
+    """Fire updates at lambda_handler from a thread pool on an open-loop schedule"""
+    offsets = arrival_offsets(requests, rate, burst)
+    updates = build_updates(factory, requests, duplicates)
+    service, response, errors = {}, [], 0
+    memory = []
+    lock = threading.Lock()
+    completed = itertools.count(1)
+
+    def worker(index: int):
+        nonlocal errors
+        kind, payload = updates[index]
+        scheduled = start + offsets[index]
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = time.perf_counter()
+        status = invoke_lambda(stub, payload)
+        t1 = time.perf_counter()
+        done = next(completed)
+        with lock:
+            service.setdefault(kind, []).append((t1 - t0) * 1000)
+            response.append((t1 - scheduled) * 1000)
+            if status != 200:
+                errors += 1
+            if memory_every and done % memory_every == 0:
+                gc.collect()
+                memory.append((done, rss_kib()))
+
+    memory.append((0, rss_kib()))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(requests)))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    memory.append((requests, rss_kib()))
+    return _load_report(service, response, errors, elapsed, memory)
+
+
+def run_process_update_load(stub: StubbedLambda, factory: UpdateFactory, requests: int, rate: float,
+                            burst: int, memory_every: int, duplicates: float = 0.0) -> Dict:
+    """Fire updates at process_update as concurrent tasks on a single event loop"""
+    offsets = arrival_offsets(requests, rate, burst)
+    updates = build_updates(factory, requests, duplicates)
+    service, response, errors = {}, [], 0
+    memory = [(0, rss_kib())]
+
+    async def one(index: int, kind: str, payload: Dict, start: float):
+        nonlocal errors
+        scheduled = start + offsets[index]
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        t0 = time.perf_counter()
+        result = await stub.module.process_update(payload)
+        t1 = time.perf_counter()
+        service.setdefault(kind, []).append((t1 - t0) * 1000)
+        response.append((t1 - scheduled) * 1000)
+        if result.get('statusCode') != 200:
+            errors += 1
+        if memory_every and len(response) % memory_every == 0:
+            gc.collect()
+            memory.append((len(response), rss_kib()))
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i, *updates[i], start) for i in range(requests)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(main())
+    gc.collect()
+    memory.append((requests, rss_kib()))
+    return _load_report(service, response, errors, elapsed, memory)
+
+
+def run_webhook_load(stub: StubbedLambda, factory: UpdateFactory, requests: int, rate: float,
+                     burst: int, workers: int, memory_every: int, duplicates: float = 0.0) -> Tuple[Dict, Dict]:
+    """
+    POST updates over HTTP to a local WebhookServer
+
+    The service time is the time to the HTTP ack; the worker section covers
+    the time until every queued update was processed.
+    """
+    from webhook_server import WebhookServer
+
+    offsets = arrival_offsets(requests, rate, burst)
+    updates = build_updates(factory, requests, duplicates)
+    service, response, errors = {}, [], 0
+    memory = [(0, rss_kib())]
+
+    async def post(port: int, payload: Dict) -> int:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = json.dumps(payload).encode()
+        writer.write(f"POST /webhook HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        writer.close()
+        return int(status_line.split()[1])
+
+    async def one(port: int, index: int, kind: str, payload: Dict, start: float):
+        nonlocal errors
+        scheduled = start + offsets[index]
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        t0 = time.perf_counter()
+        status = await post(port, payload)
+        t1 = time.perf_counter()
+        service.setdefault(kind, []).append((t1 - t0) * 1000)
+        response.append((t1 - scheduled) * 1000)
+        if status != 200:
+            errors += 1
+        if memory_every and len(response) % memory_every == 0:
+            memory.append((len(response), rss_kib()))
+
+    async def main():
+        server = WebhookServer(host='127.0.0.1', port=0, workers=workers)
+        await server.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(one(server.port, i, *updates[i], start) for i in range(requests)))
+        acked = time.perf_counter() - start
+        await server.join()
+        drained = time.perf_counter() - start
+        await server.stop()
+        return acked, drained, server
+
+    acked, drained, server = asyncio.run(main())
+    gc.collect()
+    memory.append((requests, rss_kib()))
+    processed = server.processed + server.failed
+    worker = {
+        'updates': processed,
+        'failures': server.failed,
+        'elapsed_s': round(drained, 2),
+        'throughput_rps': round(processed / drained, 2) if drained else 0.0,
+    }
+    return _load_report(service, response, errors, acked, memory), worker
+
+
+def _load_report(service: Dict[str, List[float]], response: List[float], errors: int,
+                 elapsed: float, memory: List[Tuple[int, float]]) -> Dict:
+    all_service = [v for values in service.values() for v in values]
+    first_kib, last_kib = memory[0][1], memory[-1][1]
+    return {
+        'requests': len(response),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(len(response) / elapsed, 2) if elapsed else 0.0,
+        'service_time': latency_summary(all_service),
+        'response_time': latency_summary(response),
+        'by_kind': {kind: latency_summary(values) for kind, values in service.items()},
+        'memory_kib': [{'after': n, 'rss_kib': round(kib, 1)} for n, kib in memory],
+        'memory_growth_kib_per_1000': round((last_kib - first_kib) / max(1, len(response)) * 1000, 1),
+    }
+
+
+def measure_cold_start(stub: StubbedLambda, factory: UpdateFactory, samples: int) -> Dict:
+    """Time cold invocations (fresh globals) against the following warm one"""
+    cold, warm = [], []
+    for _ in range(samples):
+        stub.reset()
+        _, payload = factory.make('text')
+        t0 = time.perf_counter()
+        invoke_lambda(stub, payload)
+        cold.append((time.perf_counter() - t0) * 1000)
+        # Same message again, so the only difference is the warm globals
+        _, warm_payload = factory.make('text')
+        warm_payload['message']['text'] = payload['message']['text']
+        t0 = time.perf_counter()
+        invoke_lambda(stub, warm_payload)
+        warm.append((time.perf_counter() - t0) * 1000)
+    return {'cold': latency_summary(cold), 'warm': latency_summary(warm)}
+
+
+def print_report(report: Dict):
+    load = report['load']
+    print(f"\n=== Carga contra {report['target']} ===")
+    print(f"Solicitudes: {load['requests']}  Errores: {load['errors']}  "
+          f"Duración: {load['elapsed_s']}s  Throughput: {load['throughput_rps']} req/s")
+    row = "{:<18} {:>7} {:>9} {:>9} {:>9} {:>9}"
+    print(row.format('', 'n', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'))
+    for label, s in [('servicio', load['service_time']), ('respuesta', load['response_time'])] + \
+            [(f"  {k}", v) for k, v in load['by_kind'].items()]:
+        print(row.format(label, s['count'], s['p50_ms'], s['p95_ms'], s['p99_ms'], s['max_ms']))
+
+    if 'worker' in report:
+        worker = report['worker']
+        print(f"\nWorker: {worker['updates']} updates en {worker['elapsed_s']}s "
+              f"({worker['throughput_rps']} req/s), fallidos: {worker['failures']}")
+
+    if 'cold_start' in report:
+        cold, warm = report['cold_start']['cold'], report['cold_start']['warm']
+        print(f"\nCold start p50: {cold['p50_ms']} ms  |  Warm p50: {warm['p50_ms']} ms  "
+              f"|  Costo del cold path: {round(cold['p50_ms'] - warm['p50_ms'], 2)} ms")
+
+    print(f"\nMemoria RSS: {load['memory_kib'][0]['rss_kib']} KiB -> {load['memory_kib'][-1]['rss_kib']} KiB "
+          f"({load['memory_growth_kib_per_1000']} KiB cada 1000 invocaciones)")
+    print(f"Llamadas a Sheets: {report['sheets_api_calls']}  |  Transcripciones: {report['transcriptions']}  "
+          f"|  Llamadas al LLM: {report['llm_calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para lambda_handler")
+    parser.add_argument('--target', choices=['lambda_handler', 'process_update', 'webhook_server'],
+                        default='lambda_handler')
+    parser.add_argument('--requests', type=int, default=1000, help="Cantidad de updates a enviar")
+    parser.add_argument('--rate', type=float, default=0, help="Updates por segundo (0 = sin límite)")
+    parser.add_argument('--burst', type=int, default=1, help="Updates que llegan juntos en cada ráfaga")
+    parser.add_argument('--concurrency', type=int, default=1, help="Invocaciones simultáneas (lambda_handler)")
+    parser.add_argument('--workers', type=int, default=8, help="Workers del servidor webhook (webhook_server)")
+    parser.add_argument('--chats', type=int, default=20, help="Cantidad de chats distintos")
+    parser.add_argument('--mix', default='text=0.6,voice=0.2,audio=0.1,command=0.1',
+                        help="Proporción de tipos de update")
+    parser.add_argument('--webhook-mode', choices=['sync', 'async'], default='sync',
+                        help="async: el webhook solo encola y luego worker_handler procesa la cola")
+    parser.add_argument('--duplicates', type=float, default=0.0,
+                        help="Fracción de updates reenviados como reintentos de Telegram")
+    parser.add_argument('--rows', type=int, default=1000, help="Filas en la hoja de contactos simulada")
+    parser.add_argument('--sheets-latency-ms', type=float, default=0.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0)
+    parser.add_argument('--whisper-latency-ms', type=float, default=0.0)
+    parser.add_argument('--telegram-latency-ms', type=float, default=0.0)
+    parser.add_argument('--cold-samples', type=int, default=5, help="Mediciones de cold start (0 = omitir)")
+    parser.add_argument('--memory-every', type=int, default=500, help="Medir memoria cada N invocaciones")
+    parser.add_argument('--json', help="Guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    mix = {}
+    for item in args.mix.split(','):
+        kind, weight = item.split('=')
+        mix[kind.strip()] = float(weight)
+
+    stub = StubbedLambda(args.rows, args.sheets_latency_ms, args.llm_latency_ms,
+                         args.whisper_latency_ms, args.telegram_latency_ms)
+    factory = UpdateFactory(list(stub.recordings), args.chats, mix)
+
+    report = {'target': args.target}
+    print("🚀 Ejecutando carga...", file=sys.stderr)
+    # Discard the handler's logs; buffering them would show up as memory growth
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if args.cold_samples and args.target == 'lambda_handler':
+            report['cold_start'] = measure_cold_start(stub, factory, args.cold_samples)
+        # Warm the container before the measured run
+        invoke_lambda(stub, factory.make('text')[1])
+        stub.module.WEBHOOK_MODE = args.webhook_mode
+        if args.target == 'lambda_handler':
+            report['load'] = run_lambda_load(stub, factory, args.requests, args.rate, args.burst,
+                                             args.concurrency, args.memory_every, args.duplicates)
+        elif args.target == 'webhook_server':
+            report['load'], report['worker'] = run_webhook_load(stub, factory, args.requests, args.rate, args.burst,
+                                                                args.workers, args.memory_every, args.duplicates)
+        else:
+            report['load'] = run_process_update_load(stub, factory, args.requests, args.rate, args.burst,
+                                                     args.memory_every, args.duplicates)
+        if args.webhook_mode == 'async':
+            queued = len(stub.module.get_update_queue())
+            t0 = time.perf_counter()
+            result = stub.module.worker_handler({}, SimpleNamespace(function_name='load-test-worker'))
+            elapsed = time.perf_counter() - t0
+            report['worker'] = {
+                'updates': queued,
+                'failures': len(result['batchItemFailures']),
+                'elapsed_s': round(elapsed, 2),
+                'throughput_rps': round(queued / elapsed, 2) if elapsed else 0.0,
+            }
+
+    report['sheets_api_calls'] = stub.api_calls()
+    report['transcriptions'] = stub.openai.audio.transcriptions.calls
+    report['llm_calls'] = stub.llm.calls
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Chat model that replays recorded OpenAI function-call responses
+Lets the benchmarks run LeadsAgent end to end without calling the API
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, FunctionMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with tiktoken's cl100k_base encoding
+
+    tiktoken downloads the encoding on first use; offline (and without a cached
+    copy) this falls back to an estimate of 4 characters per token.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encoding = None
+    if _encoding is None:
+        return (len(text) + 3) // 4
+    return len(_encoding.encode(text))
+
+
+class RecordedChatModel(BaseChatModel):
+    """
+    Replays recorded responses keyed by the user query
+
+    A recording maps each query to the sequence of model responses for that turn.
+    The step within the turn is the number of tool results already in the
+    scratchpad, so replay does not depend on call order across turns.
+
+    Each response is either {"function_call": {"name": ..., "arguments": {...}}}
+    or {"content": "final answer"}, optionally with "usage" token counts.
+
+    With count_prompt_tokens, prompt_tokens is measured on the actual request
+    (messages plus function schemas) instead of taken from the recording, so
+    prompt changes show up in the benchmarks.
+    """
+
+    recordings: Dict[str, List[Dict[str, Any]]]
+    latency_ms: float = 0.0
+    calls: int = 0
+    count_prompt_tokens: bool = True
+    prompt_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded-chat-model"
+
+    @classmethod
+    def from_file(cls, path: str, latency_ms: float = 0.0) -> 'RecordedChatModel':
+        """Load a recording file ({"turns": {query: [responses]}})"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(recordings=data['turns'], latency_ms=latency_ms)
+
+    def _find_turn(self, messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+        human = [m for m in messages if isinstance(m, HumanMessage)]
+        if not human:
+            raise ValueError("No human message to replay")
+        content = human[-1].content
+        for query, responses in self.recordings.items():
+            # Contains-match so prompt decorations around the query don't break replay
+            if query in content:
+                return responses
+        raise KeyError(f"No recording for query: {content[:80]!r}")
+
+    @staticmethod
+    def _count_tokens(messages: List[BaseMessage], functions: Optional[List[Dict]]) -> int:
+        text = ''.join(str(m.content) + json.dumps(m.additional_kwargs, ensure_ascii=False) for m in messages)
+        if functions:
+            text += json.dumps(functions, ensure_ascii=False)
+        # ~4 tokens of chat framing per message
+        return count_tokens(text) + 4 * len(messages)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        responses = self._find_turn(messages)
+        step = sum(1 for m in messages if isinstance(m, FunctionMessage))
+        response = responses[min(step, len(responses) - 1)]
+
+        if 'function_call' in response:
+            call = response['function_call']
+            message = AIMessage(content='', additional_kwargs={
+                'function_call': {
+                    'name': call['name'],
+                    'arguments': json.dumps(call['arguments'], ensure_ascii=False),
+                }
+            })
+        else:
+            message = AIMessage(content=response['content'])
+
+        usage = dict(response.get('usage', {}))
+        if self.count_prompt_tokens:
+            usage['prompt_tokens'] = self._count_tokens(messages, kwargs.get('functions'))
+        self.prompt_tokens += usage.get('prompt_tokens', 0) or 0
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={'token_usage': usage, 'model_name': 'recorded'},
+        )
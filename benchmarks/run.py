@@ -0,0 +1,245 @@
+"""
+Offline benchmark for SheetsManager and LeadsAgent
+Runs against an in-memory fake of the Sheets API and replays recorded LLM responses,
+so no network or API keys are needed.
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --rows 100,1000,10000,100000 --latency-ms 80
+    python -m benchmarks.run --llm-latency-ms 900 --small-llm-latency-ms 350
+    python -m benchmarks.run --json bench.json
+    python -m benchmarks.run --baseline bench.json --tolerance 0.25   # exit 1 on regression
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fake_sheets import FakeSpreadsheet, make_contact_rows, make_migraine_rows
+from benchmarks.recorded_llm import RecordedChatModel, count_tokens
+from contact_format import CONTACT_FIELDS, contact_values, render_contacts
+from migraine_analytics import MigraineLog
+from sheets_manager import SheetsManager
+
+
+RECORDINGS = os.path.join(os.path.dirname(__file__), 'recordings', 'agent_turns.json')
+
+
+def sheets_operations(manager: SheetsManager) -> Dict[str, Callable]:
+    """SheetsManager operations to measure"""
+    return {
+        'sheets.get_all_records': lambda: manager.get_all_records(),
+        'sheets.search_by_name': lambda: manager.search_by_name('Pablo Salomón'),
+        'sheets.search_by_field': lambda: manager.search_by_field('Empresa', 'Tech Corp'),
+        'sheets.get_record_by_name': lambda: manager.get_record_by_name('Pablo Salomón'),
+        'sheets.update_field': lambda: manager.update_field('Pablo Salomón', 'bitácora', 'Nota de benchmark', append=True),
+        'sheets.add_record': lambda: manager.add_record({'Nombre': 'Contacto Benchmark', 'Empresa': 'Bench SA'}),
+    }
+
+
+def legacy_render(contacts) -> str:
+    """Contact tool output as it was before contact_format (indented JSON, keys repeated per contact)"""
+    names = [field for field, _, _ in CONTACT_FIELDS]
+    return json.dumps([dict(zip(names, contact_values(c))) for c in contacts], ensure_ascii=False, indent=2)
+
+
+def format_operations(manager: SheetsManager) -> Dict[str, Callable]:
+    """Rendering of every contact for the agent, previous format vs current one"""
+    return {
+        'format.contactos (json indent=2)': lambda: legacy_render(manager.get_all_records()),
+        'format.contactos (compacto)': lambda: render_contacts(manager.get_all_records()),
+    }
+
+
+def agent_operations(agent, recordings: Dict[str, List]) -> Dict[str, Callable]:
+    """One operation per recorded agent turn"""
+    return {
+        f"agent: {query}": (lambda q=query: agent.process_query(q))
+        for query in recordings
+    }
+
+
+def measure(operation: Callable, worksheets: List, iterations: int) -> Dict:
+    """
+    Measure latency, API calls and allocations of one operation
+
+    Latency is measured without tracemalloc (it slows allocation-heavy code);
+    allocations come from one extra traced run.
+    """
+    for ws in worksheets:
+        ws.reset_calls()
+
+    durations = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(iterations):
+            start = time.perf_counter()
+            operation()
+            durations.append((time.perf_counter() - start) * 1000)
+
+    api_calls = sum(ws.api_calls for ws in worksheets) / iterations
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        output = operation()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ordered = sorted(durations)
+    return {
+        'iterations': iterations,
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'api_calls': round(api_calls, 2),
+        'peak_alloc_kib': round(peak / 1024, 1),
+        'retained_kib': round(current / 1024, 1),
+        'output': output,
+    }
+
+
+def run_benchmarks(row_counts: List[int], latency_ms: float, llm_latency_ms: float,
+                   iterations: int, include_agent: bool, small_llm_latency_ms: Optional[float] = None) -> Dict:
+    """
+    Run every operation for every sheet size
+
+    The agent gets two recorded models, one per tier, so the report shows
+    which tier answered each turn (small_llm_latency_ms defaults to llm_latency_ms).
+    """
+    with open(RECORDINGS, encoding='utf-8') as f:
+        recordings = json.load(f)['turns']
+
+    results = {}
+    for rows in row_counts:
+        print(f"📊 {rows} filas...", file=sys.stderr)
+        spreadsheet = FakeSpreadsheet('contacts', {'Contactos': make_contact_rows(rows)}, latency_ms=latency_ms)
+        migraines = FakeSpreadsheet('migraines', {'Migrañas': make_migraine_rows(200)}, latency_ms=latency_ms)
+        manager = SheetsManager.from_worksheet(spreadsheet.sheet1)
+        migraine_manager = SheetsManager.from_worksheet(migraines.sheet1, columns=SheetsManager.MIGRAINE_COLUMNS)
+        # Spreadsheets count their Drive metadata requests (change detection)
+        worksheets = [spreadsheet.sheet1, migraines.sheet1, spreadsheet, migraines]
+
+        operations = sheets_operations(manager)
+        # Without the Drive read cache searches only download the searched column and the matches
+        uncached = SheetsManager.from_worksheet(spreadsheet.sheet1, change_detection=False)
+        operations['sheets.search_by_name (sin caché)'] = lambda: uncached.search_by_name('Pablo Salomón')
+        operations['sheets.search_by_field (sin caché)'] = lambda: uncached.search_by_field('Email', '.42@example')
+        operations.update(format_operations(manager))
+        operations['migraine.stats'] = lambda: MigraineLog.from_sheet(migraine_manager).summarize()
+        llm = small_llm = agent = None
+        if include_agent:
+            from agent import LeadsAgent
+            from model_tiers import ModelPolicy
+            llm = RecordedChatModel(recordings=recordings, latency_ms=llm_latency_ms)
+            small_llm = RecordedChatModel(
+                recordings=recordings,
+                latency_ms=llm_latency_ms if small_llm_latency_ms is None else small_llm_latency_ms
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent = LeadsAgent(manager, openai_api_key='benchmark', llm=llm, small_llm=small_llm,
+                                   migraine_manager=migraine_manager, model_policy=ModelPolicy.from_env())
+            operations.update(agent_operations(agent, recordings))
+
+        # Large sheets are slow to scan; fewer iterations keep the run short
+        op_iterations = max(1, iterations if rows <= 10000 else iterations // 5)
+        results[str(rows)] = {}
+        for name, op in operations.items():
+            if llm is not None:
+                llm.prompt_tokens = small_llm.prompt_tokens = 0
+                small_turns = agent.model_policy.stats['small']['turns']
+            result = measure(op, worksheets, op_iterations)
+            output = result.pop('output')
+            if name.startswith('format.'):
+                # Size of the tool result the model would read
+                result['prompt_tokens'] = count_tokens(output)
+                result['output_kib'] = round(len(output.encode('utf-8')) / 1024, 1)
+            if llm is not None and name.startswith('agent:'):
+                # measure() runs the operation once more for allocations
+                result['prompt_tokens'] = round((llm.prompt_tokens + small_llm.prompt_tokens) / (op_iterations + 1))
+                result['tier'] = 'small' if agent.model_policy.stats['small']['turns'] > small_turns else 'large'
+            results[str(rows)][name] = result
+    return results
+
+
+def print_report(results: Dict):
+    """Print the results as one table per sheet size"""
+    header = f"{'operación':<72} {'p50 ms':>9} {'p95 ms':>9} {'API':>6} {'peak KiB':>10} {'tokens':>7} {'tier':>6}"
+    for rows, operations in results.items():
+        print(f"\n=== {rows} filas ===")
+        print(header)
+        print('-' * len(header))
+        for name, r in operations.items():
+            tokens = r.get('prompt_tokens', '')
+            print(f"{name[:72]:<72} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['api_calls']:>6g} {r['peak_alloc_kib']:>10.1f} {tokens:>7} {r.get('tier', ''):>6}")
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare against a previous --json run
+
+    A regression is more API calls or prompt tokens than before, or a p50
+    latency above baseline * (1 + tolerance).
+
+    Returns:
+        List of human readable regressions (empty if none)
+    """
+    regressions = []
+    for rows, operations in results.items():
+        for name, r in operations.items():
+            base = baseline.get(rows, {}).get(name)
+            if not base:
+                continue
+            if r['api_calls'] > base['api_calls']:
+                regressions.append(f"[{rows}] {name}: API calls {base['api_calls']} -> {r['api_calls']}")
+            if r.get('prompt_tokens', 0) > base.get('prompt_tokens', float('inf')):
+                regressions.append(f"[{rows}] {name}: prompt tokens {base['prompt_tokens']} -> {r['prompt_tokens']}")
+            if r['p50_ms'] > base['p50_ms'] * (1 + tolerance) and r['p50_ms'] - base['p50_ms'] > 1.0:
+                regressions.append(f"[{rows}] {name}: p50 {base['p50_ms']}ms -> {r['p50_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de SheetsManager y LeadsAgent")
+    parser.add_argument('--rows', default='100,1000,10000',
+                        help="Cantidades de filas separadas por coma (ej: 100,1000,10000,100000)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Latencia simulada por llamada a Sheets")
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0, help="Latencia simulada por llamada al LLM")
+    parser.add_argument('--small-llm-latency-ms', type=float,
+                        help="Latencia simulada por llamada al modelo chico (por defecto, la de --llm-latency-ms)")
+    parser.add_argument('--iterations', type=int, default=10, help="Repeticiones por operación")
+    parser.add_argument('--no-agent', action='store_true', help="Medir solo SheetsManager")
+    parser.add_argument('--json', help="Guardar resultados en este archivo")
+    parser.add_argument('--baseline', help="Comparar contra un archivo --json anterior")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Tolerancia de latencia para --baseline")
+    args = parser.parse_args()
+
+    row_counts = [int(r) for r in args.rows.split(',') if r.strip()]
+    results = run_benchmarks(row_counts, args.latency_ms, args.llm_latency_ms,
+                             args.iterations, not args.no_agent, args.small_llm_latency_ms)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regresiones detectadas:")
+            for r in regressions:
+                print(f"   {r}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones respecto al baseline")
+
+
+if __name__ == "__main__":
+    main()
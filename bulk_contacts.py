@@ -0,0 +1,361 @@
+"""
+Bulk import/export of contacts
+Streams large CSV/vCard files into the contacts sheet in chunked append_rows
+batches, skipping names that already exist, and streams the sheet back out
+
+Uso:
+    python bulk_contacts.py import contactos.csv [--chunk-size 200] [--dry-run]
+    python bulk_contacts.py import contactos.vcf
+    python bulk_contacts.py export contactos.csv
+    python bulk_contacts.py export contactos.vcf
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from gspread.utils import rowcol_to_a1
+
+from sheets_manager import SheetsManager
+import tracing
+
+
+CONTACT_FIELDS = ['Nombre', 'Teléfono', 'Email', 'Telegram', 'Empresa', 'Rol', 'bio', 'bitácora']
+
+# Column names used by common exports (Google Contacts, Outlook, our own sheet), normalized
+HEADER_ALIASES = {
+    'Nombre': ['nombre', 'name', 'full name', 'display name', 'nombre completo'],
+    'Teléfono': ['telefono', 'phone', 'mobile phone', 'phone 1 - value', 'celular', 'movil'],
+    'Email': ['email', 'e-mail', 'e-mail address', 'e-mail 1 - value', 'correo'],
+    'Telegram': ['telegram', 'usuario de telegram'],
+    'Empresa': ['empresa', 'company', 'organization', 'organization 1 - name', 'organizacion'],
+    'Rol': ['rol', 'role', 'title', 'job title', 'organization 1 - title', 'cargo', 'puesto'],
+    'bio': ['bio', 'notes', 'notas', 'nota'],
+    'bitácora': ['bitacora', 'log'],
+}
+
+ProgressCallback = Callable[[Dict[str, int]], None]
+
+
+def _map_headers(fieldnames: List[str]) -> Dict[str, str]:
+    """Map the file's column names to sheet fields"""
+    lookup = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+    mapping = {}
+    for name in fieldnames:
+        field = lookup.get(SheetsManager.normalize_text(name or ''))
+        if field and field not in mapping.values():
+            mapping[name] = field
+    return mapping
+
+
+def iter_csv_contacts(stream: TextIO) -> Iterator[Dict[str, str]]:
+    """
+    Parse contacts from a CSV file, one row at a time
+
+    Args:
+        stream: Open text file
+
+    Yields:
+        Contact dictionaries keyed by sheet field
+    """
+    reader = csv.DictReader(stream)
+    mapping = _map_headers(reader.fieldnames or [])
+    normalized = {SheetsManager.normalize_text(f or ''): f for f in reader.fieldnames or []}
+    first, last = normalized.get('first name') or normalized.get('given name'), \
+        normalized.get('last name') or normalized.get('family name')
+
+    for row in reader:
+        contact = {field: (row.get(column) or '').strip() for column, field in mapping.items()}
+        if not contact.get('Nombre') and (first or last):
+            contact['Nombre'] = ' '.join(p for p in ((row.get(first) or '').strip(),
+                                                     (row.get(last) or '').strip()) if p)
+        yield contact
+
+
+def _unescape_vcard(value: str) -> str:
+    return value.replace('\\n', '\n').replace('\\N', '\n').replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\')
+
+
+def _iter_unfolded_lines(stream: TextIO) -> Iterator[str]:
+    """Yield vCard content lines, joining folded continuation lines"""
+    current = None
+    for raw in stream:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def iter_vcard_contacts(stream: TextIO) -> Iterator[Dict[str, str]]:
+    """
+    Parse contacts from a vCard (.vcf) file, one card at a time
+
+    Args:
+        stream: Open text file
+
+    Yields:
+        Contact dictionaries keyed by sheet field
+    """
+    card: Optional[Dict[str, str]] = None
+    for line in _iter_unfolded_lines(stream):
+        if ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        prop = key.split(';', 1)[0].split('.')[-1].upper()
+
+        if prop == 'BEGIN':
+            card = {}
+            continue
+        if card is None:
+            continue
+        if prop == 'END':
+            if not card.get('Nombre') and card.get('_n'):
+                card['Nombre'] = card['_n']
+            card.pop('_n', None)
+            yield card
+            card = None
+            continue
+
+        value = _unescape_vcard(value.strip())
+        if prop == 'FN':
+            card['Nombre'] = value
+        elif prop == 'N':
+            parts = value.split(';')
+            card['_n'] = ' '.join(p for p in (parts[1] if len(parts) > 1 else '', parts[0]) if p)
+        elif prop == 'TEL':
+            card.setdefault('Teléfono', value)
+        elif prop == 'EMAIL':
+            card.setdefault('Email', value)
+        elif prop == 'ORG':
+            card.setdefault('Empresa', value.split(';')[0])
+        elif prop == 'TITLE':
+            card.setdefault('Rol', value)
+        elif prop == 'NOTE':
+            card.setdefault('bio', value)
+        elif prop in ('X-TELEGRAM', 'IMPP', 'URL', 'X-SOCIALPROFILE'):
+            match = re.search(r'(?:t\.me/|telegram:)@?(\w{5,})', value, re.IGNORECASE)
+            if match:
+                card.setdefault('Telegram', f"@{match.group(1)}")
+            elif prop == 'X-TELEGRAM':
+                card.setdefault('Telegram', value if value.startswith('@') else f"@{value}")
+
+
+def iter_contacts_from_file(path: str) -> Iterator[Dict[str, str]]:
+    """Pick the parser from the file extension and stream the contacts"""
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        if path.lower().endswith(('.vcf', '.vcard')):
+            yield from iter_vcard_contacts(stream)
+        else:
+            yield from iter_csv_contacts(stream)
+
+
+def import_contacts(manager: SheetsManager, contacts: Iterable[Dict[str, str]], chunk_size: int = 200,
+                    progress: Optional[ProgressCallback] = None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Import contacts into the sheet in chunks
+
+    Reads the name column once, skips contacts whose
+    normalized name already exists (in the sheet or earlier in the file) and
+    writes the rest with one append_rows call per chunk.
+
+    Args:
+        manager: SheetsManager of the contacts sheet
+        contacts: Iterable of contact dictionaries (e.g. iter_contacts_from_file)
+        chunk_size: Rows per append_rows call
+        progress: Called after every chunk with the running totals
+        dry_run: Count what would be imported without writing
+
+    Returns:
+        Totals: read, added, duplicates, invalid, failed
+    """
+    # Read once for the whole import: rows are appended in this column order
+    headers = manager.refresh_schema()
+    known_names = set(manager.get_name_index())
+    stats = {'read': 0, 'added': 0, 'duplicates': 0, 'invalid': 0, 'failed': 0}
+    chunk: List[Dict[str, str]] = []
+
+    def flush():
+        if not chunk:
+            return
+        if dry_run or manager.add_records(chunk, headers=headers):
+            stats['added'] += len(chunk)
+        else:
+            stats['failed'] += len(chunk)
+        chunk.clear()
+        if progress:
+            progress(dict(stats))
+
+    for contact in contacts:
+        stats['read'] += 1
+        name = (contact.get('Nombre') or '').strip()
+        if not name:
+            stats['invalid'] += 1
+            continue
+        key = manager.normalize_text(name)
+        if key in known_names:
+            stats['duplicates'] += 1
+            continue
+        known_names.add(key)
+        chunk.append({field: contact.get(field, '') for field in CONTACT_FIELDS})
+        if len(chunk) >= chunk_size:
+            flush()
+
+    flush()
+    return stats
+
+
+def iter_sheet_rows(manager: SheetsManager, page_size: int = 1000) -> Iterator[List[str]]:
+    """
+    Stream the sheet page by page (one API call per page), header row first
+
+    Args:
+        manager: SheetsManager of the sheet to export
+        page_size: Rows per request
+
+    Yields:
+        Rows as lists of strings, padded to the header width
+    """
+    headers = manager.headers
+    if not headers:
+        return
+    yield headers
+
+    width = len(headers)
+    start = 2
+    while True:
+        end = start + page_size - 1
+        range_name = f"{rowcol_to_a1(start, 1)}:{rowcol_to_a1(end, width)}"
+        with tracing.span('sheets.get', rows=page_size):
+            page = manager.sheet.get(range_name)
+        if not page:
+            break
+        for row in page:
+            yield list(row) + [''] * (width - len(row))
+        if len(page) < page_size:
+            break
+        start = end + 1
+
+
+def export_csv(manager: SheetsManager, stream: TextIO, page_size: int = 1000,
+               progress: Optional[ProgressCallback] = None) -> int:
+    """
+    Write the sheet as CSV without holding it in memory
+
+    Returns:
+        Number of contacts written
+    """
+    writer = csv.writer(stream)
+    count = -1
+    for count, row in enumerate(iter_sheet_rows(manager, page_size)):
+        writer.writerow(row)
+        if progress and count and count % page_size == 0:
+            progress({'exported': count})
+    count = max(count, 0)
+    if progress:
+        progress({'exported': count})
+    return count
+
+
+def _escape_vcard(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace(',', '\\,').replace(';', '\\;')
+
+
+def export_vcard(manager: SheetsManager, stream: TextIO, page_size: int = 1000,
+                 progress: Optional[ProgressCallback] = None) -> int:
+    """
+    Write the sheet as vCard 3.0 without holding it in memory
+
+    Returns:
+        Number of contacts written
+    """
+    rows = iter_sheet_rows(manager, page_size)
+    headers = next(rows, None)
+    if headers is None:
+        return 0
+
+    count = 0
+    for row in rows:
+        contact = dict(zip(headers, row))
+        name = contact.get('Nombre', '').strip()
+        if not name:
+            continue
+        lines = ['BEGIN:VCARD', 'VERSION:3.0', f"FN:{_escape_vcard(name)}"]
+        if contact.get('Teléfono'):
+            lines.append(f"TEL:{_escape_vcard(contact['Teléfono'])}")
+        if contact.get('Email'):
+            lines.append(f"EMAIL:{_escape_vcard(contact['Email'])}")
+        if contact.get('Empresa'):
+            lines.append(f"ORG:{_escape_vcard(contact['Empresa'])}")
+        if contact.get('Rol'):
+            lines.append(f"TITLE:{_escape_vcard(contact['Rol'])}")
+        if contact.get('Telegram'):
+            lines.append(f"X-TELEGRAM:{_escape_vcard(contact['Telegram'])}")
+        note = '\n\n'.join(v for v in (contact.get('bio', ''), contact.get('bitácora', '')) if v)
+        if note:
+            lines.append(f"NOTE:{_escape_vcard(note)}")
+        lines.append('END:VCARD')
+        stream.write('\r\n'.join(lines) + '\r\n')
+        count += 1
+        if progress and count % page_size == 0:
+            progress({'exported': count})
+    if progress:
+        progress({'exported': count})
+    return count
+
+
+def _print_progress(stats: Dict[str, int]):
+    summary = '  '.join(f"{k}: {v}" for k, v in stats.items())
+    print(f"\r⏳ {summary}", end='', flush=True)
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Importar/exportar contactos en bloque")
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help="Importar contactos desde CSV o vCard")
+    imp.add_argument('path')
+    imp.add_argument('--chunk-size', type=int, default=200)
+    imp.add_argument('--dry-run', action='store_true', help="Contar sin escribir en la hoja")
+    exp = sub.add_parser('export', help="Exportar contactos a CSV o vCard")
+    exp.add_argument('path')
+    exp.add_argument('--page-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    load_dotenv()
+    spreadsheet_id = os.getenv('SPREADSHEET_ID')
+    credentials_file = os.getenv('GOOGLE_CREDENTIALS_FILE', 'asociate-f8e54014d9ea.json')
+    if not spreadsheet_id:
+        print("❌ Error: SPREADSHEET_ID no encontrado en .env")
+        sys.exit(1)
+
+    manager = SheetsManager(credentials_file, spreadsheet_id)
+
+    if args.command == 'import':
+        print(f"📥 Importando {args.path}...")
+        stats = import_contacts(manager, iter_contacts_from_file(args.path), args.chunk_size,
+                                progress=_print_progress, dry_run=args.dry_run)
+        print()
+        print(f"✅ Leídos: {stats['read']} | Agregados: {stats['added']} | Duplicados: {stats['duplicates']} "
+              f"| Sin nombre: {stats['invalid']} | Fallidos: {stats['failed']}")
+    else:
+        print(f"📤 Exportando a {args.path}...")
+        with open(args.path, 'w', encoding='utf-8', newline='') as stream:
+            if args.path.lower().endswith(('.vcf', '.vcard')):
+                count = export_vcard(manager, stream, args.page_size, progress=_print_progress)
+            else:
+                count = export_csv(manager, stream, args.page_size, progress=_print_progress)
+        print()
+        print(f"✅ {count} contactos exportados")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,11 +27,8 @@ def main():
     # Initialize Google Sheets Manager
     sheets_manager = SheetsManager(credentials_file, spreadsheet_id)
     
-    # Get the sheet
-    sheet = sheets_manager.sheet
-    
     # Get headers (first row)
-    headers = sheet.row_values(1)
+    headers = sheets_manager.headers
     
     print("📋 ENCABEZADOS DE LA HOJA:")
     print("=" * 60)
@@ -40,24 +37,21 @@ def main():
     
     print("\n" + "=" * 60)
     print("\n✅ ENCABEZADOS ESPERADOS (nueva estructura):")
-    expected = ['Nombre', 'Teléfono', 'Email', 'Telegram', 'Empresa', 'Rol', 'bio', 'bitácora']
+    expected = list(SheetsManager.COLUMNS)
     for i, exp_header in enumerate(expected, 1):
         print(f"  Columna {i}: '{exp_header}'")
     
     # Check if headers match
     print("\n" + "=" * 60)
     print("\n🔎 COMPARACIÓN:")
-    all_match = True
     for i, exp_header in enumerate(expected):
         if i < len(headers):
             actual = headers[i]
             match = "✅" if actual == exp_header else "❌"
             print(f"  {match} Columna {i+1}: Esperado '{exp_header}' | Actual '{actual}'")
-            if actual != exp_header:
-                all_match = False
         else:
             print(f"  ❌ Columna {i+1}: Esperado '{exp_header}' | FALTANTE")
-            all_match = False
+    all_match = not sheets_manager.validate_schema(headers)
     
     # Get sample data
     print("\n" + "=" * 60)
@@ -0,0 +1,368 @@
+"""
+Duplicate detection and merging for the contacts sheet
+Candidate pairs come from blocking keys (name tokens, email, phone digits,
+Telegram handle), so only contacts that share a key are compared instead of
+every pair in the sheet; a confirmed merge is written with one batched update
+"""
+
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from gspread.utils import rowcol_to_a1
+
+from sheets_manager import SheetsManager
+import tracing
+
+
+# Fields whose contents are combined on merge instead of picking one side
+MERGED_TEXT_FIELDS = ('bio', 'bitácora')
+
+# Name tokens too common to say anything about identity
+_NAME_STOPWORDS = {'del', 'los', 'las', 'san', 'van', 'von'}
+
+_TOKEN_SPLIT = re.compile(r'[^a-z0-9]+')
+
+
+def name_tokens(name: str) -> Set[str]:
+    """Normalized name tokens of at least 3 letters"""
+    return {
+        token for token in _TOKEN_SPLIT.split(SheetsManager.normalize_text(name))
+        if len(token) >= 3 and token not in _NAME_STOPWORDS
+    }
+
+
+def phone_key(phone: str) -> str:
+    """Last 8 digits of a phone number, so country and area prefixes don't matter"""
+    digits = re.sub(r'\D', '', str(phone))
+    return digits[-8:] if len(digits) >= 7 else ''
+
+
+def email_key(email: str) -> str:
+    return str(email).strip().lower() if '@' in str(email) else ''
+
+
+def telegram_key(handle: str) -> str:
+    text = str(handle).strip().lower()
+    text = re.sub(r'^(https?://)?(t\.me/|telegram\.me/)', '', text)
+    return text.lstrip('@') if len(text.lstrip('@')) >= 3 else ''
+
+
+def blocking_keys(record: Dict) -> Set[str]:
+    """
+    Keys shared by records that might be the same contact
+
+    Args:
+        record: Contact dictionary
+
+    Returns:
+        Set of prefixed keys ('f:' full name, 'n:' name token, 'k:' name token
+        prefixes, 'e:' email, 'p:' phone, 't:' Telegram)
+    """
+    tokens = name_tokens(record.get('Nombre', ''))
+    keys = {f"n:{token}" for token in tokens}
+    # The whole name too, so names without 3-letter tokens ("Li") still meet their twin
+    normalized = ' '.join(SheetsManager.normalize_text(record.get('Nombre', '')).split())
+    if normalized:
+        keys.add(f"f:{normalized}")
+    # Sorted 4-letter prefixes of every token: small blocks that still catch
+    # accents, typos at the end of words and swapped word order
+    if tokens:
+        keys.add('k:' + '|'.join(sorted(token[:4] for token in tokens)))
+    for prefix, value in (('e', email_key(record.get('Email', ''))),
+                          ('p', phone_key(record.get('Teléfono', ''))),
+                          ('t', telegram_key(record.get('Telegram', '')))):
+        if value:
+            keys.add(f"{prefix}:{value}")
+    return keys
+
+
+def score_pair(a: Dict, b: Dict) -> Tuple[float, List[str]]:
+    """
+    Score how likely two contacts are the same person
+
+    Returns:
+        Tuple (score between 0 and 1, list of reasons)
+    """
+    reasons = []
+    if email_key(a.get('Email', '')) and email_key(a.get('Email', '')) == email_key(b.get('Email', '')):
+        reasons.append('email')
+    if phone_key(a.get('Teléfono', '')) and phone_key(a.get('Teléfono', '')) == phone_key(b.get('Teléfono', '')):
+        reasons.append('teléfono')
+    if telegram_key(a.get('Telegram', '')) and telegram_key(a.get('Telegram', '')) == telegram_key(b.get('Telegram', '')):
+        reasons.append('telegram')
+
+    name_a = SheetsManager.normalize_text(a.get('Nombre', ''))
+    name_b = SheetsManager.normalize_text(b.get('Nombre', ''))
+    name_score = 0.0
+    if name_a and name_b:
+        tokens_a, tokens_b = name_tokens(name_a), name_tokens(name_b)
+        # Compare with sorted tokens too, so "Salomón Pablo" matches "Pablo Salomón"
+        name_score = max(
+            SequenceMatcher(None, name_a, name_b).ratio(),
+            SequenceMatcher(None, ' '.join(sorted(tokens_a)), ' '.join(sorted(tokens_b))).ratio(),
+        )
+        # One name extends the other ("Pablo Salomón" / "Pablo Salomón Pérez")
+        shorter = min(tokens_a, tokens_b, key=len)
+        if len(shorter) >= 2 and (tokens_a <= tokens_b or tokens_b <= tokens_a):
+            name_score = max(name_score, 0.86)
+        if name_score >= 0.8:
+            reasons.append('nombre')
+
+    score = 1.0 if len(reasons) > 1 or (reasons and reasons[0] != 'nombre') else name_score
+    return round(score, 2), reasons
+
+
+class DuplicateFinder:
+    """Blocking index over the contacts of a sheet"""
+
+    def __init__(self, headers: List[str], rows: List[List[str]], threshold: float = 0.85,
+                 max_block_size: int = 50):
+        """
+        Args:
+            headers: Header row
+            rows: Data rows, in sheet order (the first one is sheet row 2)
+            threshold: Minimum score reported as a candidate
+            max_block_size: Blocks larger than this are skipped (e.g. a very common first
+                name), which keeps candidate generation close to linear
+        """
+        self.headers = headers
+        self.records = [dict(zip(headers, row)) for row in rows]
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+
+        self.blocks: Dict[str, List[int]] = defaultdict(list)
+        for idx, record in enumerate(self.records):
+            if not record.get('Nombre', '').strip():
+                continue
+            for key in blocking_keys(record):
+                self.blocks[key].append(idx)
+
+    @classmethod
+    def from_sheet(cls, manager: SheetsManager, **kwargs) -> 'DuplicateFinder':
+        """Build the index from the sheet (one API call, none if the sheet is unchanged)"""
+        values = manager.get_all_values()
+        if not values:
+            return cls([], [], **kwargs)
+        return cls(values[0], values[1:], **kwargs)
+
+    def _candidate(self, i: int, j: int, score: float, reasons: List[str]) -> Dict:
+        return {
+            'contacto': self.records[i].get('Nombre', ''),
+            'fila': i + 2,
+            'duplicado': self.records[j].get('Nombre', ''),
+            'fila_duplicado': j + 2,
+            'similitud': score,
+            'motivos': reasons,
+        }
+
+    def _pairs(self) -> Iterator[Tuple[int, int]]:
+        seen = set()
+        for members in self.blocks.values():
+            if len(members) < 2 or len(members) > self.max_block_size:
+                continue
+            for pos, i in enumerate(members):
+                for j in members[pos + 1:]:
+                    if (i, j) not in seen:
+                        seen.add((i, j))
+                        yield i, j
+
+    def candidates(self, name: Optional[str] = None) -> List[Dict]:
+        """
+        Candidate duplicate pairs, best first
+
+        Args:
+            name: Only report pairs involving contacts whose name contains this text
+
+        Returns:
+            List of candidate dictionaries
+        """
+        name_filter = SheetsManager.normalize_text(name) if name else None
+        results = []
+        with tracing.span('dedup.candidates', contacts=len(self.records)):
+            for i, j in self._pairs():
+                if name_filter and not any(
+                    name_filter in SheetsManager.normalize_text(self.records[k].get('Nombre', '')) for k in (i, j)
+                ):
+                    continue
+                score, reasons = score_pair(self.records[i], self.records[j])
+                if score >= self.threshold:
+                    results.append(self._candidate(i, j, score, reasons))
+        results.sort(key=lambda c: -c['similitud'])
+        return results
+
+    def matches_for(self, record: Dict, threshold: Optional[float] = None) -> List[Dict]:
+        """
+        Existing contacts that look like the same person as a new record
+
+        A normalized name contained in an existing name also counts, as the
+        plain name search did before.
+
+        Args:
+            record: The contact about to be added
+            threshold: Minimum score (default: the finder's threshold)
+
+        Returns:
+            List of {'nombre', 'fila', 'similitud', 'motivos'}, best first
+        """
+        new_name = SheetsManager.normalize_text(record.get('Nombre', ''))
+        indices = set()
+        for key in blocking_keys(record):
+            indices.update(self.blocks.get(key, ()))
+
+        matches = []
+        for idx in indices:
+            existing = self.records[idx]
+            score, reasons = score_pair(record, existing)
+            if new_name and new_name in SheetsManager.normalize_text(existing.get('Nombre', '')):
+                score = 1.0
+                if 'nombre' not in reasons:
+                    reasons.append('nombre')
+            if score >= (threshold if threshold is not None else self.threshold):
+                matches.append({'nombre': existing.get('Nombre', ''), 'fila': idx + 2,
+                                'similitud': score, 'motivos': reasons})
+        matches.sort(key=lambda m: -m['similitud'])
+        return matches
+
+    def check_new(self, record: Dict, threshold: float = 0.9) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Split the matches of a contact about to be added by what they share
+
+        Only a similar name makes an existing contact the same person. An
+        email, phone or Telegram handle alone is often shared by different
+        people (a company address, an assistant's phone), so those matches
+        are only worth a warning.
+
+        Args:
+            record: The contact about to be added
+            threshold: Minimum score (see matches_for)
+
+        Returns:
+            (matches with a similar name, matches on contact fields only)
+        """
+        matches = self.matches_for(record, threshold=threshold)
+        same_name = [m for m in matches if 'nombre' in m['motivos']]
+        shared = [m for m in matches if 'nombre' not in m['motivos']]
+        return same_name, shared
+
+    def find_row(self, name: str, exclude: Optional[int] = None) -> Optional[int]:
+        """
+        Index of the contact with this name
+
+        Tries an exact match, then a unique normalized match, then a unique
+        partial match. Duplicates often share the normalized name, so the
+        other side of a merge can be excluded.
+
+        Args:
+            name: Contact name
+            exclude: Index to ignore
+
+        Returns:
+            Index into self.records, or None if not found or ambiguous
+        """
+        target = SheetsManager.normalize_text(name)
+        normalized, partial = [], []
+        for idx, record in enumerate(self.records):
+            if idx == exclude:
+                continue
+            if record.get('Nombre', '').strip() == name.strip():
+                return idx
+            record_name = SheetsManager.normalize_text(record.get('Nombre', ''))
+            if record_name == target:
+                normalized.append(idx)
+            elif target and target in record_name:
+                partial.append(idx)
+        if normalized:
+            return normalized[0] if len(normalized) == 1 else None
+        return partial[0] if len(partial) == 1 else None
+
+
+def merge_records(keep: Dict, duplicate: Dict, headers: List[str]) -> Dict[str, str]:
+    """
+    Merge a duplicate into the contact that is kept
+
+    bio and bitácora keep the kept contact's text and append the duplicate's
+    lines that are not already there; other fields are only filled when empty.
+
+    Returns:
+        The fields of the kept contact that change
+    """
+    changes = {}
+    for field in headers:
+        current = str(keep.get(field, '') or '')
+        other = str(duplicate.get(field, '') or '')
+        if not other or field == 'Nombre':
+            continue
+        if field in MERGED_TEXT_FIELDS:
+            existing_lines = set(line.strip() for line in current.split('\n'))
+            new_lines = [line for line in other.split('\n') if line.strip() and line.strip() not in existing_lines]
+            if new_lines:
+                changes[field] = '\n'.join(([current] if current else []) + new_lines)
+        elif not current:
+            changes[field] = other
+    return changes
+
+
+def merge_contacts(manager: SheetsManager, keep_name: str, duplicate_name: str) -> Dict:
+    """
+    Merge one contact into another and delete the duplicate row
+
+    The kept row is written with a single batch_update, then the duplicate
+    row is deleted. The rows come from a read that may be cached, so the
+    header row and both names are read again right before writing, and
+    nothing is written if the sheet changed meanwhile.
+
+    Args:
+        manager: SheetsManager of the contacts sheet
+        keep_name: Name of the contact that stays
+        duplicate_name: Name of the contact merged into it and removed
+
+    Returns:
+        {'ok': bool, 'mensaje': str, 'campos': [changed fields]}
+    """
+    finder = DuplicateFinder.from_sheet(manager)
+    keep_idx = finder.find_row(keep_name)
+    if keep_idx is None:
+        return {'ok': False, 'mensaje': f"No se encontró un único contacto '{keep_name}'", 'campos': []}
+    dup_idx = finder.find_row(duplicate_name, exclude=keep_idx)
+    if dup_idx is None:
+        return {'ok': False, 'mensaje': f"No se encontró un único contacto '{duplicate_name}'", 'campos': []}
+
+    keep, duplicate = finder.records[keep_idx], finder.records[dup_idx]
+    changes = merge_records(keep, duplicate, finder.headers)
+    keep_row, dup_row = keep_idx + 2, dup_idx + 2
+
+    name_col = finder.headers.index('Nombre') + 1
+    with tracing.span('sheets.batch_get', ranges=3):
+        header_range, keep_range, dup_range = manager.sheet.batch_get(
+            ['1:1', rowcol_to_a1(keep_row, name_col), rowcol_to_a1(dup_row, name_col)])
+    # Full reads pad the header row to the widest row; single-range reads don't
+    headers = list(finder.headers)
+    while headers and not headers[-1]:
+        headers.pop()
+    current = [list(header_range[0]) if header_range else []] + [
+        value_range[0][0] if value_range and value_range[0] else '' for value_range in (keep_range, dup_range)]
+    if current != [headers, keep.get('Nombre', ''), duplicate.get('Nombre', '')]:
+        print(f"Sheet changed since it was read, not merging rows {dup_row} into {keep_row}")
+        manager.invalidate_cache()
+        return {'ok': False, 'mensaje': "La hoja cambió mientras se preparaba la fusión; intenta de nuevo", 'campos': []}
+
+    if changes:
+        data = [
+            {'range': rowcol_to_a1(keep_row, finder.headers.index(field) + 1), 'values': [[value]]}
+            for field, value in changes.items()
+        ]
+        with tracing.span('sheets.batch_update', cells=len(data)):
+            manager.sheet.batch_update(data)
+
+    with tracing.span('sheets.delete_rows'):
+        manager.sheet.delete_rows(dup_row)
+    manager.invalidate_cache()
+
+    print(f"Merged '{duplicate.get('Nombre')}' (row {dup_row}) into '{keep.get('Nombre')}' (row {keep_row})")
+    return {
+        'ok': True,
+        'mensaje': f"'{duplicate.get('Nombre')}' fusionado en '{keep.get('Nombre')}'",
+        'campos': list(changes),
+    }
@@ -0,0 +1,82 @@
+"""
+Rendering of contact search results for the agent
+Every contact tool returns the same compact JSON: the field names once and
+one array of values per contact, minified. Each row is rendered at most once
+per snapshot of the sheet and reused by later calls
+"""
+
+import json
+from typing import Iterable, List, Mapping, Tuple
+
+from record_table import RecordView
+
+
+# (output field, source columns tried in order, text when all are empty)
+CONTACT_FIELDS: List[Tuple[str, Tuple[str, ...], str]] = [
+    ('Nombre', ('Nombre',), ''),
+    ('Teléfono', ('Teléfono', 'Telefono'), 'No registrado'),
+    ('Email', ('Email',), 'No registrado'),
+    ('Telegram', ('Telegram',), 'No registrado'),
+    ('Empresa', ('Empresa',), 'No registrada'),
+    ('Rol', ('Rol',), 'No registrado'),
+    ('bio', ('bio',), 'Sin información'),
+    ('bitácora', ('bitácora', 'bitacora'), 'Sin entradas'),
+]
+
+# Key of the rendered rows in RecordTable.derived
+_DERIVED_KEY = 'contact_format.rows'
+
+_FIELD_NAMES = json.dumps([field for field, _, _ in CONTACT_FIELDS], ensure_ascii=False, separators=(',', ':'))
+
+
+def contact_values(contact: Mapping) -> list:
+    """
+    Values of a contact in CONTACT_FIELDS order, with the fallback text for empty fields
+
+    Args:
+        contact: Record from SheetsManager (dict or RecordView)
+
+    Returns:
+        List of values
+    """
+    values = []
+    for _, sources, fallback in CONTACT_FIELDS:
+        value = ''
+        for source in sources:
+            value = contact.get(source, '')
+            if value:
+                break
+        values.append(value or fallback)
+    return values
+
+
+def _render_row(contact: Mapping) -> str:
+    return json.dumps(contact_values(contact), ensure_ascii=False, separators=(',', ':'))
+
+
+def _cached_row(contact: Mapping) -> str:
+    """Rendered row, memoized on the RecordTable the record comes from"""
+    if not isinstance(contact, RecordView):
+        return _render_row(contact)
+    # Rows are kept alive by the table, so their ids are stable while it exists
+    rendered = contact.table.derived.setdefault(_DERIVED_KEY, {})
+    key = id(contact.raw)
+    row = rendered.get(key)
+    if row is None:
+        row = rendered[key] = _render_row(contact)
+    return row
+
+
+def render_contacts(contacts: Iterable[Mapping]) -> str:
+    """
+    Render contacts as compact JSON for a tool result
+
+    Args:
+        contacts: Records from SheetsManager
+
+    Returns:
+        '{"campos":[...],"contactos":[[...],...]}' with the values of each
+        contact in "campos" order
+    """
+    rows = ','.join(_cached_row(contact) for contact in contacts)
+    return f'{{"campos":{_FIELD_NAMES},"contactos":[{rows}]}}'
@@ -0,0 +1,284 @@
+"""
+Speculative prefetch of contact rows
+While the model plans its first step, the words of the message are matched
+against an index of the names in the sheet and the rows of the contacts it
+probably refers to are read in the background. When the model then calls
+search_by_name, the search is answered from memory instead of waiting for a
+Sheets round trip
+"""
+
+import contextvars
+import os
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from sheets_manager import HYDRATE_MAX_ROWS, SheetsManager
+import tracing
+
+
+# Words shorter than this never select a contact ("de", "la", "a")
+MIN_TOKEN_LENGTH = 3
+
+_WORDS = re.compile(r'\w+')
+
+
+class NameIndex:
+    """Names of a sheet, normalized and indexed by word"""
+
+    def __init__(self, names: List[str], previous: Optional['NameIndex'] = None):
+        """
+        Args:
+            names: Name column from row 2 down (SheetsManager.get_names)
+            previous: Index of an earlier version of the column, whose
+                normalized names are reused
+        """
+        self.names = names
+        known = dict(zip(previous.names, previous.normalized)) if previous is not None else {}
+        normalize = SheetsManager.normalize_text
+        self.normalized = [known.get(name) or normalize(name) for name in names]
+        # word -> rows whose name has it
+        self.words: Dict[str, List[int]] = {}
+        for row, name in enumerate(self.normalized, start=2):
+            for word in set(_WORDS.findall(name)):
+                if len(word) >= MIN_TOKEN_LENGTH:
+                    self.words.setdefault(word, []).append(row)
+
+    def candidates(self, text: str, max_rows: int) -> List[int]:
+        """
+        Rows of the contacts a message most likely talks about
+
+        Rows are scored by how many words of the message their name has;
+        only the best-scored rows are returned, and none if there are more
+        than max_rows of them (e.g. a first name shared by half the sheet).
+
+        Args:
+            text: The user's message
+            max_rows: Most rows worth prefetching
+
+        Returns:
+            Row numbers (1-based, header is row 1), in sheet order
+        """
+        scores: Dict[int, int] = {}
+        for word in set(_WORDS.findall(SheetsManager.normalize_text(text))):
+            for row in self.words.get(word, ()):
+                scores[row] = scores.get(row, 0) + 1
+        if not scores:
+            return []
+        best = max(scores.values())
+        rows = sorted(row for row, score in scores.items() if score == best)
+        return rows if len(rows) <= max_rows else []
+
+    def matches(self, name: str) -> List[int]:
+        """Rows SheetsManager.search_by_name would return for `name`"""
+        name_normalized = SheetsManager.normalize_text(name)
+        return [row for row, text in enumerate(self.normalized, start=2) if name_normalized in text]
+
+
+class Prefetch:
+    """Rows read speculatively for one turn"""
+
+    def __init__(self, manager: SheetsManager, future: Future, wait_seconds: float):
+        self.manager = manager
+        self.generation = manager.generation
+        self.future = future
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+
+    def _loaded(self) -> Optional[Tuple[NameIndex, Dict[int, Mapping]]]:
+        """The prefetched index and rows, waiting for them if needed; None if unusable"""
+        try:
+            index, rows = self.future.result(timeout=self.wait_seconds)
+        except Exception as e:
+            print(f"Contact prefetch not used: {e!r}")
+            return None
+        # Something was written since: what we read may be stale
+        if self.manager.generation != self.generation:
+            return None
+        return index, rows
+
+    def search_by_name(self, name: str) -> Optional[List[Mapping]]:
+        """
+        Answer SheetsManager.search_by_name from the prefetched data
+
+        Rows that match but weren't prefetched are read in one request.
+
+        Returns:
+            The matching records, or None to let the manager search
+        """
+        start = time.perf_counter()
+        loaded = self._loaded()
+        if loaded is None:
+            return None
+        index, rows = loaded
+        matches = index.matches(name)
+        if len(matches) > HYDRATE_MAX_ROWS:
+            return None
+        with self._lock:
+            missing = [row for row in matches if row not in rows]
+        if missing:
+            try:
+                records = self.manager.get_rows(missing)
+            except Exception as e:
+                print(f"Error fetching rows missing from the prefetch: {e}")
+                return None
+            with self._lock:
+                rows.update(zip(missing, records))
+        tracing.record_span('prefetch.search', (time.perf_counter() - start) * 1000,
+                            rows=len(matches), fetched=len(missing))
+        return [rows[row] for row in matches]
+
+
+# Prefetch of the turn being processed in this context (None when there is none)
+current_prefetch: ContextVar[Optional[Prefetch]] = ContextVar('current_prefetch', default=None)
+
+
+class ContactPrefetcher:
+    """
+    Starts the speculative reads and keeps one name index per manager
+
+    Indexes are rebuilt only when the names themselves changed (a write
+    re-reads the column, but usually leaves the names as they were).
+    """
+
+    def __init__(self, enabled: bool = True, max_rows: int = 20, workers: int = 4, wait_seconds: float = 10.0,
+                 drain_seconds: float = 2.0):
+        """
+        Args:
+            enabled: False never prefetches
+            max_rows: Most rows read speculatively per message
+            workers: Prefetches running at once
+            wait_seconds: Longest a search waits for a prefetch still in flight
+            drain_seconds: Longest the end of a turn waits for its prefetch to finish
+        """
+        self.enabled = enabled
+        self.max_rows = max_rows
+        self.wait_seconds = wait_seconds
+        self.drain_seconds = drain_seconds
+        self.stats = {'started': 0, 'skipped': 0, 'rows': 0, 'cancelled': 0, 'abandoned': 0}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._indexes: 'weakref.WeakKeyDictionary[SheetsManager, NameIndex]' = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ContactPrefetcher':
+        """
+        Build the prefetcher from environment variables
+
+        CONTACT_PREFETCH: 'true' / 'false' (default true, false on AWS Lambda:
+            the container is frozen between invocations, so a read still in
+            flight when the turn ends would be left half done)
+        PREFETCH_MAX_ROWS: most rows read speculatively per message (default 20)
+        PREFETCH_WORKERS: prefetches running at once (default 4)
+        """
+        default = 'false' if os.getenv('AWS_LAMBDA_FUNCTION_NAME') else 'true'
+        return cls(
+            enabled=os.getenv('CONTACT_PREFETCH', default).lower() != 'false',
+            max_rows=int(os.getenv('PREFETCH_MAX_ROWS', '20')),
+            workers=int(os.getenv('PREFETCH_WORKERS', '4')),
+        )
+
+    def name_index(self, manager: SheetsManager) -> NameIndex:
+        """Index of the manager's names, built again only when they changed"""
+        names = manager.get_names()
+        with self._lock:
+            index = self._indexes.get(manager)
+        if index is not None and (index.names is names or index.names == names):
+            return index
+        index = NameIndex(names, previous=index)
+        with self._lock:
+            self._indexes[manager] = index
+        return index
+
+    def _load(self, manager: SheetsManager, text: str) -> Tuple[NameIndex, Dict[int, Mapping]]:
+        with tracing.span('prefetch.load') as s:
+            index = self.name_index(manager)
+            rows = index.candidates(text, self.max_rows)
+            s.set(rows=len(rows))
+            records = manager.get_rows(rows) if rows else []
+        with self._lock:
+            self.stats['rows'] += len(rows)
+        return index, dict(zip(rows, records))
+
+    def start(self, manager: SheetsManager, text: str) -> Optional[Prefetch]:
+        """
+        Start reading the contacts a message probably refers to
+
+        Args:
+            manager: Sheet the turn works on
+            text: The user's message
+
+        Returns:
+            The running Prefetch, or None when disabled
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self.stats['started'] += 1
+        # Copy the context so the reads land in the caller's trace
+        context = contextvars.copy_context()
+        return Prefetch(manager, self._executor.submit(context.run, self._load, manager, text), self.wait_seconds)
+
+    @contextmanager
+    def speculate(self, manager: SheetsManager, text: str, enabled: bool = True) -> Iterator[Optional[Prefetch]]:
+        """
+        Prefetch for the duration of a turn; search_by_name uses it meanwhile
+
+        When the turn ends the prefetch is cancelled if it hasn't started, or
+        waited for (up to drain_seconds) so no read outlives the turn.
+
+        Args:
+            manager: Sheet the turn works on
+            text: The user's message
+            enabled: False skips the prefetch for this turn (e.g. no contact intent)
+        """
+        if not enabled:
+            with self._lock:
+                self.stats['skipped'] += 1
+        prefetch = self.start(manager, text) if enabled else None
+        token = current_prefetch.set(prefetch)
+        try:
+            yield prefetch
+        finally:
+            current_prefetch.reset(token)
+            if prefetch is not None:
+                self._finish(prefetch.future)
+
+    def _finish(self, future: Future):
+        """Cancel or wait for the prefetch of a turn that ended"""
+        if future.cancel():
+            with self._lock:
+                self.stats['cancelled'] += 1
+            return
+        try:
+            future.result(timeout=self.drain_seconds)
+        except FutureTimeoutError:
+            print(f"Contact prefetch still running {self.drain_seconds}s after the turn ended")
+            with self._lock:
+                self.stats['abandoned'] += 1
+        except Exception as e:
+            print(f"Contact prefetch failed: {e!r}")
+
+
+def search_by_name(manager: SheetsManager, name: str) -> List[Mapping]:
+    """
+    SheetsManager.search_by_name, answered from the turn's prefetch when there is one
+
+    Args:
+        manager: Sheet to search
+        name: The name to search for
+
+    Returns:
+        List of matching records
+    """
+    prefetch = current_prefetch.get()
+    if prefetch is not None and prefetch.manager is manager:
+        records = prefetch.search_by_name(name)
+        if records is not None:
+            return records
+    return manager.search_by_name(name)
@@ -0,0 +1,184 @@
+"""
+Current date for the agent and deterministic resolution of relative dates
+The Buenos Aires date is computed once per request and injected into the
+prompt, and "hoy", "ayer"... in text going to the sheets are replaced with
+the actual date before the write tools run
+"""
+
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+from zoneinfo import ZoneInfo
+
+from sheets_manager import SheetsManager
+
+
+TIMEZONE = ZoneInfo('America/Argentina/Buenos_Aires')
+
+DAY_NAMES = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+MONTH_NAMES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+               'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+# Current time of the request being served (set by request_time)
+current_time: ContextVar[Optional[datetime]] = ContextVar('current_time', default=None)
+
+_WEEKDAYS = {'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3, 'viernes': 4, 'sabado': 5, 'domingo': 6}
+
+# Day words that mean the same date wherever they appear in a note, with the
+# preposition/article in front so it can be rewritten too. "mañana" (also the
+# morning) and weekdays (last or next one?) are left to the model, which has
+# the date in its prompt.
+_RELATIVE_DAY = re.compile(
+    r'(?:\b(?P<prep>de|del|el|para el|para)\s+)?'
+    r'\b(?P<word>hoy|ayer|anteayer|antes de ayer)\b'
+)
+# A date field made only of a relative day ('mañana', 'el lunes', 'el martes pasado')
+_DATE_FIELD = re.compile(
+    r'(?:(?:de|del|el|este|para el|para)\s+)?(?:'
+    r'(?P<word>hoy|ayer|anteayer|antes de ayer|pasado manana|manana)'
+    r'|(?P<next>proximo\s+)?(?P<weekday>lunes|martes|miercoles|jueves|viernes|sabado|domingo)'
+    r'(?:\s+(?P<after>que viene|proximo|pasado))?)'
+)
+
+_DAY_OFFSETS = {'hoy': 0, 'ayer': -1, 'anteayer': -2, 'antes de ayer': -2, 'manana': 1, 'pasado manana': 2}
+
+
+def now() -> datetime:
+    """Current time in Buenos Aires (the request's time when inside request_time)"""
+    return current_time.get() or datetime.now(TIMEZONE)
+
+
+def today() -> date:
+    """Current date in Buenos Aires (the request's date when inside request_time)"""
+    return now().date()
+
+
+@contextmanager
+def request_time(moment: Optional[datetime] = None) -> Iterator[datetime]:
+    """
+    Fix the current time for one request
+
+    Args:
+        moment: Time to use (default: now in Buenos Aires)
+
+    Yields:
+        The fixed time
+    """
+    moment = moment or datetime.now(TIMEZONE)
+    token = current_time.set(moment)
+    try:
+        yield moment
+    finally:
+        current_time.reset(token)
+
+
+def format_date(day: date) -> str:
+    return day.strftime('%d/%m/%Y')
+
+
+def describe(moment: datetime) -> str:
+    """
+    Describe a moment in Spanish
+
+    Returns:
+        Text like 'Sábado, 3 de Enero de 2026, 14:05 (03/01/2026)'
+    """
+    return (f"{DAY_NAMES[moment.weekday()]}, {moment.day} de {MONTH_NAMES[moment.month - 1]} de {moment.year}, "
+            f"{moment.strftime('%H:%M')} ({format_date(moment.date())})")
+
+
+def prompt_context(moment: datetime) -> str:
+    """System context with the current date, appended after the static prompt"""
+    return (f"Fecha y hora actual (Buenos Aires): {describe(moment)}. "
+            f"Usa esta fecha para 'hoy', 'ayer', 'el lunes', etc.; no hace falta consultar get_current_datetime.")
+
+
+def _resolve_weekday(weekday: int, reference: date, upcoming: bool) -> date:
+    if upcoming:
+        return reference + timedelta(days=(weekday - reference.weekday() - 1) % 7 + 1)
+    # A bare weekday in a date field refers to the most recent one (today included)
+    return reference - timedelta(days=(reference.weekday() - weekday) % 7)
+
+
+def _normalize(text: str) -> Optional[str]:
+    """Accent-free lowercase copy of text with the same length (None if it can't keep it)"""
+    normalized = ''.join(SheetsManager.normalize_text(c) or c for c in text)
+    return normalized if len(normalized) == len(text) else None
+
+
+def _whole_field(text: str, start: int, end: int) -> bool:
+    """Whether text[start:end] is a whole '|'-separated field"""
+    return (start == 0 or text[start - 1] == '|') and (end == len(text) or text[end] == '|')
+
+
+def resolve_relative_dates(text: str, reference: Optional[date] = None) -> str:
+    """
+    Replace the unambiguous relative days of a note with DD/MM/YYYY dates
+
+    "reunión hoy" -> "reunión el 03/01/2026", "llamada de ayer" -> "llamada del 02/01/2026".
+    Weekdays and "mañana" are left as written: "para el lunes" is the next
+    Monday, "el lunes pasado" the last one, and "la mañana" may be the morning.
+
+    Args:
+        text: Free text about to be written to the sheet
+        reference: Date that "hoy" refers to (default: today())
+
+    Returns:
+        The text with the references replaced
+    """
+    reference = reference or today()
+    # Match on an accent-free copy; the lengths match, so spans map back to the original
+    normalized = _normalize(text)
+    if normalized is None:
+        return text
+
+    pieces = []
+    last = 0
+    for match in _RELATIVE_DAY.finditer(normalized):
+        start, end = match.span()
+        day = reference + timedelta(days=_DAY_OFFSETS[re.sub(r'\s+', ' ', match.group('word'))])
+        prep = match.group('prep')
+        if prep in ('de', 'del'):
+            connector = 'del '
+        elif prep in ('para', 'para el'):
+            connector = 'para el '
+        elif prep or not _whole_field(text, start, end):
+            connector = 'el '
+        else:
+            # A field on its own ('hoy|Alta|...') becomes just the date
+            connector = ''
+        # Keep the capital of a sentence that started with the reference ("Ayer hablamos")
+        if connector and text[start].isupper():
+            connector = connector[0].upper() + connector[1:]
+        pieces.append(text[last:start])
+        pieces.append(connector + format_date(day))
+        last = end
+    pieces.append(text[last:])
+    return ''.join(pieces)
+
+
+def resolve_date_field(value: str, reference: Optional[date] = None) -> str:
+    """
+    Turn a date field into DD/MM/YYYY when it is a relative reference ('hoy', 'ayer', 'el lunes')
+
+    A weekday alone is the most recent one ('el lunes', 'el martes pasado');
+    'el próximo lunes' / 'el lunes que viene' is the next one.
+
+    Args:
+        value: The field as given by the model
+        reference: Date that "hoy" refers to (default: today())
+
+    Returns:
+        The date, or the value unchanged if it isn't a relative reference
+    """
+    reference = reference or today()
+    normalized = _normalize(value.strip())
+    match = _DATE_FIELD.fullmatch(re.sub(r'\s+', ' ', normalized)) if normalized else None
+    if match is None:
+        return value.strip()
+    if match.group('word'):
+        return format_date(reference + timedelta(days=_DAY_OFFSETS[match.group('word')]))
+    upcoming = bool(match.group('next')) or match.group('after') in ('que viene', 'proximo')
+    return format_date(_resolve_weekday(_WEEKDAYS[match.group('weekday')], reference, upcoming))
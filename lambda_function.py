@@ -3,27 +3,49 @@ AWS Lambda Handler for Telegram Bot with Webhooks
 Handles incoming Telegram updates via API Gateway
 """
 
+import asyncio
 import json
 import os
 import tempfile
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters
 from openai import OpenAI
-from sheets_manager import SheetsManager
+from sheets_manager import SheetsManager, SheetsPool
 from agent import LeadsAgent
+from update_dedup import UpdateDeduplicator
+from update_queue import create_update_queue, is_supported_update, validate_update
+from tenancy import TenantRegistry
+from transcription import TranscriptionScheduler, format_transcripts, group_voice_updates, merge_transcripts
+from telegram_outbox import TelegramOutbox
+import tracing
 
 
 # Initialize components globally for Lambda warm starts
 sheets_manager = None
 agent = None
 openai_client = None
+transcriber = None
 application = None
 application_initialized = False
 
+# Remembers processed update_ids so Telegram redeliveries are skipped
+update_deduplicator = UpdateDeduplicator.from_env()
+
+# Splits long replies and spaces out sends to stay under Telegram's rate limits
+outbox = TelegramOutbox.from_env()
+
+# 'sync' processes the update inside the webhook request; 'async' only enqueues it
+# and returns 200, leaving the work to worker_handler
+WEBHOOK_MODE = os.getenv('WEBHOOK_MODE', 'sync').lower()
+WORKER_BATCH_SIZE = int(os.getenv('WORKER_BATCH_SIZE', '10'))
+# Queued voice notes of a chat sent at most this many seconds apart are answered with one agent turn
+VOICE_BATCH_MAX_GAP = float(os.getenv('VOICE_BATCH_MAX_GAP', '60'))
+update_queue = None
+
 
 def initialize_components():
     """Initialize all components (runs once per cold start)"""
-    global sheets_manager, agent, openai_client, application
+    global sheets_manager, agent, openai_client, transcriber, application
     
     if sheets_manager is None:
         print("🔧 Initializing components...")
@@ -42,12 +64,18 @@ def initialize_components():
         print("📊 Connecting to Google Sheets...")
         sheets_manager = SheetsManager(credentials_file, spreadsheet_id)
         
+        # Per-chat sheets (TENANT_SHEETS); chats without one use SPREADSHEET_ID
+        tenants = None
+        if os.getenv('TENANT_SHEETS'):
+            tenants = TenantRegistry.from_env(SheetsPool.shared(credentials_file), default_manager=sheets_manager)
+        
         # Initialize AI Agent
         print("🤖 Initializing AI agent...")
-        agent = LeadsAgent(sheets_manager, openai_api_key, credentials_file)
+        agent = LeadsAgent(sheets_manager, openai_api_key, credentials_file, tenants=tenants)
         
         # Initialize OpenAI client
         openai_client = OpenAI(api_key=openai_api_key)
+        transcriber = TranscriptionScheduler.from_env(openai_client)
         
         # Initialize Telegram Application
         print("📱 Initializing Telegram application...")
@@ -82,7 +110,7 @@ Ejemplos:
 
 Usa /help para ver más ejemplos.
         """
-        await update.message.reply_text(welcome_message)
+        await outbox.send(update.message, welcome_message)
     
     async def help_command(update: Update, context):
         """Handle /help command"""
@@ -109,91 +137,79 @@ Usa /help para ver más ejemplos.
 
 🎤 Puedes usar notas de voz para cualquier comando!
         """
-        await update.message.reply_text(help_message)
+        await outbox.send(update.message, help_message)
     
     async def handle_text(update: Update, context):
         """Handle text messages"""
         user_message = update.message.text
         
-        # Process with agent
-        response = agent.process_query(user_message)
-        
-        # Send response
-        await update.message.reply_text(response)
+        with tracing.span('handle_text'):
+            # Process with agent (in a thread, so other chats' updates keep going)
+            response = await asyncio.to_thread(agent.process_query, user_message, chat_id=update.effective_chat.id)
+            
+            # Send response
+            with tracing.span('telegram.reply'):
+                await outbox.send(update.message, response)
     
     async def handle_voice(update: Update, context):
         """Handle voice messages"""
-        try:
-            # Download voice file
-            voice_file = await update.message.voice.get_file()
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix='.ogg', delete=False) as temp_audio:
-                temp_path = temp_audio.name
-                await voice_file.download_to_drive(temp_path)
-            
-            # Transcribe audio
-            with open(temp_path, 'rb') as audio_file:
-                transcript = openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="es"
-                )
-            
-            # Clean up temp file
-            os.unlink(temp_path)
-            
-            # Process with agent
-            transcribed_text = transcript.text
-            response = agent.process_query(transcribed_text)
-            
-            # Send single combined response
-            combined_response = f"📝 Transcripción: {transcribed_text}\n\n{response}"
-            await update.message.reply_text(combined_response)
-            
-        except Exception as e:
-            error_message = f"❌ Error: {str(e)}"
+        with tracing.span('handle_voice'):
             try:
-                await update.message.reply_text(error_message)
-            except:
-                pass
-            print(f"Error processing voice: {e}")
+                # Download voice file
+                with tracing.span('telegram.download'):
+                    temp_path = await download_audio(update.message)
+                
+                # Transcribe audio (on the shared transcription pool)
+                try:
+                    transcribed_text = await transcriber.transcribe(temp_path)
+                finally:
+                    # Clean up temp file
+                    os.unlink(temp_path)
+                
+                # Process with agent
+                response = await asyncio.to_thread(agent.process_query, transcribed_text, chat_id=update.effective_chat.id)
+                
+                # Send single combined response
+                combined_response = f"{format_transcripts([transcribed_text])}\n\n{response}"
+                with tracing.span('telegram.reply'):
+                    await outbox.send(update.message, combined_response)
+                
+            except Exception as e:
+                error_message = f"❌ Error: {str(e)}"
+                try:
+                    await outbox.send(update.message, error_message)
+                except:
+                    pass
+                print(f"Error processing voice: {e}")
     
     async def handle_audio(update: Update, context):
         """Handle audio files"""
-        try:
-            audio_file = await update.message.audio.get_file()
-            
-            file_extension = os.path.splitext(audio_file.file_path)[1] or '.mp3'
-            with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_audio:
-                temp_path = temp_audio.name
-                await audio_file.download_to_drive(temp_path)
-            
-            # Transcribe audio
-            with open(temp_path, 'rb') as audio:
-                transcript = openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio,
-                    language="es"
-                )
-            
-            os.unlink(temp_path)
-            
-            # Process with agent
-            transcribed_text = transcript.text
-            response = agent.process_query(transcribed_text)
-            
-            # Send single combined response
-            combined_response = f"📝 Transcripción: {transcribed_text}\n\n{response}"
-            await update.message.reply_text(combined_response)
-            
-        except Exception as e:
-            error_message = f"❌ Error: {str(e)}"
+        with tracing.span('handle_audio'):
             try:
-                await update.message.reply_text(error_message)
-            except:
-                pass
-            print(f"Error processing audio: {e}")
+                with tracing.span('telegram.download'):
+                    temp_path = await download_audio(update.message)
+                
+                # Transcribe audio
+                try:
+                    transcribed_text = await transcriber.transcribe(temp_path)
+                finally:
+                    os.unlink(temp_path)
+                
+                # Process with agent
+                response = await asyncio.to_thread(agent.process_query, transcribed_text, chat_id=update.effective_chat.id)
+                
+                # Send single combined response
+                combined_response = f"{format_transcripts([transcribed_text])}\n\n{response}"
+                with tracing.span('telegram.reply'):
+                    await outbox.send(update.message, combined_response)
+                
+            except Exception as e:
+                error_message = f"❌ Error: {str(e)}"
+                try:
+                    await outbox.send(update.message, error_message)
+                except:
+                    pass
+                print(f"Error processing audio: {e}")
     
     # Register handlers
     app.add_handler(CommandHandler("start", start_command))
@@ -203,18 +219,55 @@ Usa /help para ver más ejemplos.
     app.add_handler(MessageHandler(filters.AUDIO, handle_audio))
 
 
-async def process_update(update_data):
-    """Process a single Telegram update"""
+async def download_audio(message) -> str:
+    """
+    Download the voice note or audio file of a message to a temporary file
+    
+    Returns:
+        Path of the temporary file (the caller deletes it)
+    """
+    if message.voice:
+        telegram_file = await message.voice.get_file()
+        suffix = '.ogg'
+    else:
+        telegram_file = await message.audio.get_file()
+        suffix = os.path.splitext(telegram_file.file_path)[1] or '.mp3'
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_audio:
+        temp_path = temp_audio.name
+    await telegram_file.download_to_drive(temp_path)
+    return temp_path
+
+
+async def ensure_application():
+    """Initialize the components and the Telegram application (once per container)"""
     global application_initialized
     
+    initialize_components()
+    if not application_initialized:
+        await application.initialize()
+        application_initialized = True
+
+
+async def process_update(update_data, deduplicate: bool = True):
+    """
+    Process a single Telegram update
+    
+    Args:
+        update_data: The update as received from Telegram
+        deduplicate: Check the update_id first (the worker skips this, the webhook already did it)
+    """
+    # Skip Telegram redeliveries of an update we already handled
+    update_id = update_data.get('update_id')
+    if deduplicate and update_deduplicator.is_duplicate(update_id):
+        print(f"Skipping duplicate update {update_id}")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'status': 'duplicate'})
+        }
+    
     try:
-        # Initialize components if needed
-        initialize_components()
-        
-        # Initialize the application only once per Lambda container lifecycle
-        if not application_initialized:
-            await application.initialize()
-            application_initialized = True
+        # Initialize components and the application once per Lambda container lifecycle
+        await ensure_application()
         
         # Create Update object from JSON
         update = Update.de_json(update_data, application.bot)
@@ -232,6 +285,10 @@ async def process_update(update_data):
         import traceback
         traceback.print_exc()
         
+        # Let Telegram's retry through, since this attempt did not complete
+        if deduplicate:
+            update_deduplicator.release(update_id)
+        
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
@@ -246,6 +303,189 @@ def lambda_handler(event, context):
     
     print(f"Received event: {json.dumps(event)}")
     
+    with tracing.start_trace('lambda.invocation', cold_start=sheets_manager is None) as trace:
+        result = handle_event(event)
+    
+    emit_metrics(trace, context)
+    return result
+
+
+def emit_metrics(trace, context):
+    """Emit per-phase latencies as CloudWatch metrics (EMF)"""
+    function_name = getattr(context, 'function_name', None) or os.getenv('AWS_LAMBDA_FUNCTION_NAME', 'local')
+    print(json.dumps(tracing.to_emf(trace, Function=function_name)))
+
+
+def get_update_queue():
+    """Get the update queue (created once per container)"""
+    global update_queue
+    if update_queue is None:
+        update_queue = create_update_queue()
+    return update_queue
+
+
+def enqueue_update(update_data):
+    """
+    Validate an update and put it on the queue for the worker
+    
+    Runs without initializing the agent, so the webhook returns in milliseconds.
+    """
+    error = validate_update(update_data)
+    if error:
+        print(f"Rejected update: {error}")
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': error})
+        }
+    
+    update_id = update_data['update_id']
+    if not is_supported_update(update_data):
+        print(f"Ignoring unsupported update {update_id}")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'status': 'ignored'})
+        }
+    
+    if update_deduplicator.is_duplicate(update_id):
+        print(f"Skipping duplicate update {update_id}")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'status': 'duplicate'})
+        }
+    
+    try:
+        with tracing.span('queue.send'):
+            get_update_queue().send(update_data)
+    except Exception as e:
+        print(f"Error enqueueing update {update_id}: {e}")
+        update_deduplicator.release(update_id)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'status': 'queued'})
+    }
+
+
+async def process_voice_batch(group):
+    """
+    Answer consecutive voice notes of one chat with a single agent turn
+    
+    The notes are downloaded and transcribed concurrently (under the
+    transcriber's concurrency cap), then their transcripts go to the agent
+    as one message and get one reply. Once the agent turn has run the
+    batch counts as processed, even if the reply can't be sent.
+    
+    Args:
+        group: List of (message_id, update_data) tuples of the same chat
+        
+    Returns:
+        List of message ids that failed
+    """
+    try:
+        await ensure_application()
+        if not transcriber.merge:
+            return await process_batch(group, merge_voice=False)
+        
+        messages = [Update.de_json(update_data, application.bot).message for _, update_data in group]
+        with tracing.span('telegram.download', files=len(messages)):
+            paths = await asyncio.gather(*(download_audio(message) for message in messages), return_exceptions=True)
+        try:
+            for path in paths:
+                if isinstance(path, Exception):
+                    raise path
+            texts = await transcriber.transcribe_many(paths)
+        finally:
+            for path in paths:
+                if not isinstance(path, Exception):
+                    os.unlink(path)
+        
+        response = await asyncio.to_thread(agent.process_query, merge_transcripts(texts), chat_id=messages[-1].chat_id)
+    except Exception as e:
+        print(f"Error processing voice batch: {e}")
+        import traceback
+        traceback.print_exc()
+        return [message_id for message_id, _ in group]
+    
+    # The agent turn already ran (and may have written to the sheets): a failed
+    # reply is logged but the batch is acked, so a redelivery can't write twice
+    try:
+        with tracing.span('telegram.reply'):
+            await outbox.send(messages[-1], f"{format_transcripts(texts)}\n\n{response}")
+    except Exception as e:
+        print(f"Error replying to voice batch: {e}")
+    return []
+
+
+async def process_batch(items, merge_voice: bool = True):
+    """
+    Process queued updates one after another with the warm agent
+    
+    Consecutive voice notes of the same chat are answered together (see process_voice_batch).
+    
+    Args:
+        items: List of (message_id, update_data) tuples
+        merge_voice: Group consecutive voice notes of a chat into one agent turn
+        
+    Returns:
+        List of message ids that failed
+    """
+    failures = []
+    groups = group_voice_updates(items, VOICE_BATCH_MAX_GAP) if merge_voice else [[item] for item in items]
+    for group in groups:
+        if len(group) > 1:
+            with tracing.span('worker.voice_batch', notes=len(group)):
+                failures.extend(await process_voice_batch(group))
+            continue
+        message_id, update_data = group[0]
+        with tracing.span('worker.update', update_id=update_data.get('update_id')):
+            result = await process_update(update_data, deduplicate=False)
+        if result.get('statusCode') != 200:
+            failures.append(message_id)
+    return failures
+
+
+def worker_handler(event, context):
+    """
+    AWS Lambda handler for the update worker
+    
+    Triggered by the SQS event source mapping with a batch of queued updates.
+    Without 'Records' (local runs, manual draining), it drains the queue instead,
+    deleting each update only after it was processed.
+    Returns an SQS partial batch response so only failed updates are retried.
+    """
+    records = event.get('Records') if isinstance(event, dict) else None
+    if records:
+        items = [(r['messageId'], json.loads(r['body'])) for r in records]
+    else:
+        items = []
+        queue = get_update_queue()
+        while True:
+            batch = queue.receive_batch(WORKER_BATCH_SIZE)
+            if not batch:
+                break
+            items.extend(batch)
+    
+    if not items:
+        return {'batchItemFailures': []}
+    
+    with tracing.start_trace('lambda.worker', cold_start=sheets_manager is None, batch_size=len(items)) as trace:
+        failures = asyncio.run(process_batch(items))
+    
+    # Drained by hand: delete what was processed, the rest is delivered again
+    if not records:
+        queue.delete([receipt for receipt, _ in items if receipt not in failures])
+        queue.release(failures)
+    
+    emit_metrics(trace, context)
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failures]}
+
+
+def handle_event(event):
+    """Route an API Gateway event to the Telegram update processor"""
     try:
         # Parse the body (API Gateway sends it as string)
         if isinstance(event.get('body'), str):
@@ -255,8 +495,10 @@ def lambda_handler(event, context):
         
         # Handle Telegram webhook
         if body:
+            if WEBHOOK_MODE == 'async':
+                return enqueue_update(body)
+            
             # Run async function synchronously
-            import asyncio
             result = asyncio.run(process_update(body))
             return result
         
@@ -275,4 +517,3 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
-
@@ -4,7 +4,8 @@ Main entry point for the Leads/Contacts Telegram Bot
 
 import os
 from dotenv import load_dotenv
-from sheets_manager import SheetsManager
+from sheets_manager import SheetsManager, SheetsPool
+from tenancy import TenantRegistry
 from agent import LeadsAgent
 from telegram_bot import TelegramBot
 
@@ -34,15 +35,28 @@ def main():
     if not os.path.exists(credentials_file):
         raise FileNotFoundError(f"Credentials file not found: {credentials_file}")
     
+    # BOT_MODE=webhook: serve Telegram's webhook with a worker pool instead of polling
+    if os.getenv('BOT_MODE', 'polling').lower() == 'webhook':
+        os.environ.setdefault('GOOGLE_CREDENTIALS_FILE', credentials_file)
+        import webhook_server
+        print("🌐 Iniciando en modo webhook...")
+        webhook_server.run()
+        return
+    
     print("🔧 Inicializando componentes...")
     
     # Initialize Google Sheets Manager
     print("📊 Conectando a Google Sheets...")
     sheets_manager = SheetsManager(credentials_file, spreadsheet_id)
     
+    # Per-chat sheets (TENANT_SHEETS); chats without one use SPREADSHEET_ID
+    tenants = None
+    if os.getenv('TENANT_SHEETS'):
+        tenants = TenantRegistry.from_env(SheetsPool.shared(credentials_file), default_manager=sheets_manager)
+    
     # Initialize AI Agent
     print("🤖 Inicializando agente de IA...")
-    agent = LeadsAgent(sheets_manager, openai_api_key, credentials_file)
+    agent = LeadsAgent(sheets_manager, openai_api_key, credentials_file, tenants=tenants)
     
     # Initialize Telegram Bot
     print("📱 Inicializando bot de Telegram...")
@@ -0,0 +1,301 @@
+"""
+Migraine analytics over the migraine tracking sheet
+Loads the 'Fecha | Intensidad | Posible causa' sheet into NumPy columns and
+computes counts, frequencies, rolling windows and cause histograms with
+vectorized operations, so the agent only receives the aggregates
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from sheets_manager import SheetsManager
+import tracing
+
+
+# Ordinal intensity scale used for filtering and averages
+INTENSITY_LEVELS = {0: 'Desconocida', 1: 'Baja', 2: 'Media', 3: 'Alta'}
+
+_INTENSITY_WORDS = {
+    'baja': 1, 'leve': 1, 'suave': 1,
+    'media': 2, 'moderada': 2, 'medio': 2,
+    'alta': 3, 'fuerte': 3, 'intensa': 3, 'severa': 3, 'muy alta': 3,
+}
+
+_DATE_FORMATS = ('%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d-%m-%Y')
+
+# Several causes in one cell ("estrés, falta de sueño") count for each of them
+_CAUSE_SEPARATORS = re.compile(r'\s*(?:,|;|/|\by\b)\s*')
+
+
+def parse_intensity(value) -> int:
+    """
+    Map an intensity cell to the ordinal scale (1 = Baja, 2 = Media, 3 = Alta, 0 = unknown)
+
+    Numeric values on a 1-10 scale are bucketed into thirds.
+    """
+    text = SheetsManager.normalize_text(str(value))
+    if not text:
+        return 0
+    if text in _INTENSITY_WORDS:
+        return _INTENSITY_WORDS[text]
+    try:
+        number = float(text.replace(',', '.'))
+    except ValueError:
+        for word, level in _INTENSITY_WORDS.items():
+            if word in text:
+                return level
+        return 0
+    if number <= 3:
+        return 1
+    if number <= 6:
+        return 2
+    return 3
+
+
+def parse_date(value) -> Optional[date]:
+    """Parse a date cell (DD/MM/YYYY and a few common variants)"""
+    text = str(value).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class MigraineLog:
+    """
+    Columnar, NumPy-backed view of the migraine sheet
+
+    Attributes:
+        dates: datetime64[D] array, one entry per episode
+        intensity: int8 array with the ordinal intensity of each episode
+        cause_labels: Display label per cause code
+        cause_episode: For every (episode, cause) pair, the episode index
+        cause_code: For every (episode, cause) pair, the cause code
+        skipped: Rows ignored because their date could not be parsed
+    """
+
+    def __init__(self, dates: np.ndarray, intensity: np.ndarray, cause_labels: List[str],
+                 cause_episode: np.ndarray, cause_code: np.ndarray, skipped: int = 0):
+        self.dates = dates
+        self.intensity = intensity
+        self.cause_labels = cause_labels
+        self.cause_episode = cause_episode
+        self.cause_code = cause_code
+        self.skipped = skipped
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def from_values(cls, values: List[List[str]]) -> 'MigraineLog':
+        """
+        Build the log from raw sheet values (header row first)
+
+        Args:
+            values: Output of Worksheet.get_all_values()
+        """
+        if not values:
+            return cls(np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int8), [],
+                       np.array([], dtype=np.int32), np.array([], dtype=np.int32))
+
+        headers = [SheetsManager.normalize_text(h) for h in values[0]]
+        date_col = headers.index('fecha') if 'fecha' in headers else 0
+        intensity_col = headers.index('intensidad') if 'intensidad' in headers else 1
+        cause_col = headers.index('posible causa') if 'posible causa' in headers else 2
+
+        def column(idx: int) -> np.ndarray:
+            return np.array([row[idx].strip() if idx < len(row) else '' for row in values[1:]], dtype=object)
+
+        date_cells, intensity_cells, cause_cells = column(date_col), column(intensity_col), column(cause_col)
+
+        # Cells repeat a lot (same dates, same causes), so parse each distinct value once
+        # and map the results back with the inverse index
+        unique_dates, date_inverse = np.unique(date_cells.astype(str), return_inverse=True)
+        parsed_dates = np.array(
+            [parse_date(d) or np.datetime64('NaT') for d in unique_dates], dtype='datetime64[D]'
+        )
+        all_dates = parsed_dates[date_inverse]
+        valid = ~np.isnat(all_dates)
+        blank = (date_cells == '') & (intensity_cells == '') & (cause_cells == '')
+        skipped = int((~valid & ~blank).sum())
+
+        unique_intensity, intensity_inverse = np.unique(intensity_cells[valid].astype(str), return_inverse=True)
+        intensity = np.array([parse_intensity(i) for i in unique_intensity], dtype=np.int8)[intensity_inverse]
+
+        # Split each distinct cause cell into cause codes
+        unique_causes, cause_inverse = np.unique(cause_cells[valid].astype(str), return_inverse=True)
+        cause_index: Dict[str, int] = {}
+        cause_labels: List[str] = []
+        codes_per_cell: List[List[int]] = []
+        for cell in unique_causes:
+            codes = []
+            for cause in _CAUSE_SEPARATORS.split(cell):
+                key = SheetsManager.normalize_text(cause)
+                if not key:
+                    continue
+                if key not in cause_index:
+                    cause_index[key] = len(cause_labels)
+                    cause_labels.append(cause.strip().capitalize())
+                codes.append(cause_index[key])
+            codes_per_cell.append(codes)
+
+        # Explode episodes into (episode, cause) pairs without a Python loop over rows
+        cell_lengths = np.array([len(c) for c in codes_per_cell], dtype=np.int64)
+        cell_offsets = np.concatenate(([0], np.cumsum(cell_lengths)[:-1])) if len(cell_lengths) else cell_lengths
+        flat_codes = np.array([code for codes in codes_per_cell for code in codes], dtype=np.int32)
+        row_lengths = cell_lengths[cause_inverse]
+        total = int(row_lengths.sum())
+        cause_episode = np.repeat(np.arange(len(cause_inverse), dtype=np.int32), row_lengths)
+        row_starts = np.repeat(cell_offsets[cause_inverse], row_lengths)
+        position = np.arange(total) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+        cause_code = flat_codes[row_starts + position] if total else np.array([], dtype=np.int32)
+
+        return cls(all_dates[valid], intensity, cause_labels, cause_episode, cause_code, skipped)
+
+    @classmethod
+    def from_sheet(cls, manager: SheetsManager) -> 'MigraineLog':
+        """Load the log from the migraine sheet (one API call, none if the sheet is unchanged)"""
+        values = manager.get_all_values()
+        with tracing.span('migraine.load', rows=len(values)):
+            return cls.from_values(values)
+
+    def summarize(self, start: Optional[date] = None, end: Optional[date] = None,
+                  min_intensity: int = 0, top_causes: int = 5) -> Dict:
+        """
+        Aggregate the episodes in a date range
+
+        Args:
+            start: First day included (default: first episode)
+            end: Last day included (default: last episode; the ultimos_N_dias
+                windows count back from it, so pass today for current figures)
+            min_intensity: Only count episodes with at least this ordinal intensity
+            top_causes: Number of causes in the histogram
+
+        Returns:
+            Dictionary with counts, frequencies, rolling windows and top causes
+
+        Raises:
+            ValueError: If the range starts after it ends
+        """
+        if len(self) == 0:
+            return {'episodios': 0}
+
+        start64 = np.datetime64(start, 'D') if start else self.dates.min()
+        end64 = np.datetime64(end, 'D') if end else self.dates.max()
+        if start64 > end64:
+            raise ValueError(f"Período vacío: empieza el {_format_date(start64)} y termina el {_format_date(end64)}")
+        mask = (self.dates >= start64) & (self.dates <= end64) & (self.intensity >= min_intensity)
+
+        dates = self.dates[mask]
+        intensity = self.intensity[mask]
+        days = int((end64 - start64).astype(int)) + 1
+        total = int(mask.sum())
+
+        summary = {
+            'desde': _format_date(start64),
+            'hasta': _format_date(end64),
+            'episodios': total,
+            'por_intensidad': {
+                INTENSITY_LEVELS[level]: int(count)
+                for level, count in enumerate(np.bincount(intensity, minlength=4)) if count
+            },
+            'promedio_por_semana': round(total / days * 7, 2) if days > 0 else 0.0,
+        }
+        if total == 0:
+            return summary
+
+        known = intensity[intensity > 0]
+        if known.size:
+            summary['intensidad_promedio'] = INTENSITY_LEVELS[int(np.rint(known.mean()))]
+
+        # Episodes per month
+        months, month_counts = np.unique(dates.astype('datetime64[M]'), return_counts=True)
+        summary['por_mes'] = {str(m): int(c) for m, c in zip(months, month_counts)}
+
+        # Daily counts over the range, then rolling sums via cumulative sums
+        offsets = (dates - start64).astype(int)
+        daily = np.bincount(offsets, minlength=days)
+        cumulative = np.concatenate(([0], np.cumsum(daily)))
+        for window in (7, 30):
+            if days >= window:
+                rolling = cumulative[window:] - cumulative[:-window]
+                peak = int(rolling.argmax())
+                summary[f'max_en_{window}_dias'] = {
+                    'episodios': int(rolling[peak]),
+                    'desde': _format_date(start64 + peak),
+                    'hasta': _format_date(start64 + peak + window - 1),
+                }
+                summary[f'ultimos_{window}_dias'] = int(rolling[-1])
+
+        # Gaps between episode days
+        unique_days = np.unique(dates)
+        summary['dias_con_migrana'] = int(unique_days.size)
+        if unique_days.size > 1:
+            gaps = np.diff(unique_days).astype(int)
+            summary['intervalo_promedio_dias'] = round(float(gaps.mean()), 1)
+            summary['intervalo_maximo_dias'] = int(gaps.max())
+        summary['ultimo_episodio'] = _format_date(dates.max())
+
+        # Cause histogram over the selected episodes
+        selected = mask[self.cause_episode]
+        if selected.any():
+            counts = np.bincount(self.cause_code[selected], minlength=len(self.cause_labels))
+            order = np.argsort(-counts, kind='stable')[:top_causes]
+            summary['causas_principales'] = [
+                {'causa': self.cause_labels[i], 'episodios': int(counts[i])}
+                for i in order if counts[i]
+            ]
+
+        return summary
+
+
+def _format_date(value: np.datetime64) -> str:
+    return value.astype(date).strftime('%d/%m/%Y')
+
+
+def resolve_period(period: str, today: date) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Translate a period name or an explicit range into start/end dates
+
+    Args:
+        period: 'hoy', 'esta_semana', 'este_mes', 'mes_pasado', 'ultimos_7_dias',
+            'ultimos_30_dias', 'ultimos_90_dias', 'este_año', 'todo', or 'DD/MM/YYYY-DD/MM/YYYY'
+        today: Reference date
+
+    Returns:
+        Tuple (start, end); None means unbounded
+    """
+    key = SheetsManager.normalize_text(period).replace(' ', '_')
+    if key in ('', 'todo', 'todos', 'siempre', 'historico'):
+        return None, None
+    if key == 'hoy':
+        return today, today
+    if key == 'esta_semana':
+        return today - timedelta(days=today.weekday()), today
+    if key == 'este_mes':
+        return today.replace(day=1), today
+    if key == 'mes_pasado':
+        last_of_previous = today.replace(day=1) - timedelta(days=1)
+        return last_of_previous.replace(day=1), last_of_previous
+    if key in ('este_ano', 'este_anio'):
+        return today.replace(month=1, day=1), today
+    match = re.fullmatch(r'ultimos_(\d+)_dias', key)
+    if match:
+        return today - timedelta(days=int(match.group(1)) - 1), today
+
+    parts = [p for p in re.split(r'\s*(?:-|a|hasta)\s*(?=\d{1,2}/)', period.strip()) if p]
+    if len(parts) == 2:
+        start, end = parse_date(parts[0]), parse_date(parts[1])
+        if start and end:
+            if start > end:
+                raise ValueError(f"Período invertido: '{period}' (la fecha inicial es posterior a la final)")
+            return start, end
+    single = parse_date(period)
+    if single:
+        return single, single
+    raise ValueError(f"Período no reconocido: '{period}'")
@@ -0,0 +1,238 @@
+"""
+Model selection for LeadsAgent
+Simple turns (a single lookup, a single-field update, a bitácora note, a
+migraine entry) go to a small, fast model; everything else, and any small-model
+turn that hits a tool error or doesn't finish, goes to the large model.
+Latency, token usage and estimated cost are tracked per tier.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from sheets_manager import SheetsManager
+from prompts import CONTACTS, MIGRAINE
+import tracing
+
+
+SMALL = 'small'
+LARGE = 'large'
+TIERS = (SMALL, LARGE)
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    'gpt-4o': (2.50, 1.25, 10.00),
+    'gpt-4o-mini': (0.15, 0.075, 0.60),
+    'gpt-4.1': (2.00, 0.50, 8.00),
+    'gpt-4.1-mini': (0.40, 0.10, 1.60),
+    'gpt-4.1-nano': (0.10, 0.025, 0.40),
+}
+
+# Tools that write to a sheet: a small-model turn that already wrote something
+# is never re-run, so an escalation can't write twice
+WRITE_TOOLS = {
+    'update_bio', 'update_phone', 'update_email', 'update_telegram', 'update_company', 'update_role',
+    'add_to_log', 'add_new_contact', 'register_migraine', 'merge_contacts',
+}
+
+# Answer of an AgentExecutor that ran out of iterations
+_STOPPED_OUTPUT = 'Agent stopped'
+
+_MAX_SIMPLE_WORDS = 30
+
+# Requests that need reasoning over several records or a confirmation flow
+_COMPLEX_WORDS = re.compile(
+    r'\b(duplicad\w*|fusion\w*|merge|compar\w*|analiz\w*|resum\w*|recomiend\w*|recomenda\w*|'
+    r'por que|estrategia\w*|prioriz\w*|todos los que|cada uno)\b'
+)
+_ACTION_WORDS = re.compile(
+    r'\b(busca\w*|actualiza\w*|cambia\w*|modifica\w*|pon|anade\w*|agrega\w*|suma\w*|registra\w*|'
+    r'crea\w*|borra\w*|elimina\w*|muestra\w*)\b'
+)
+_LOOKUP = re.compile(
+    r'^[¿¡\s]*(busca\w*|encontra\w*|encuentra\w*|muestra\w*|mostra\w*|dame|decime|dime|quien\w*|cual\w*|'
+    r'que sabes|que tenes|que tienes|info\w*|datos de|telefono de|email de|mail de)\b'
+)
+_FIELD_UPDATE = re.compile(
+    r'^[¿¡\s]*(actualiza\w*|cambia\w*|modifica\w*|pon\w*|corrige\w*)\s+(el |la |su )?'
+    r'(telefono|celular|email|mail|correo|telegram|empresa|rol|cargo|puesto)\b'
+)
+_LOG_NOTE = re.compile(
+    r'^[¿¡\s]*(anade\w*|agrega\w*|suma\w*|anota\w*|registra\w*)\s+(a |en )?(la |su )?(bitacora|bio)\b'
+)
+
+
+class ModelPolicy:
+    """
+    Chooses the model tier of each turn and keeps per-tier statistics
+
+    A turn goes to the small model only when the classifier's confidence is
+    at least `threshold`; below that the large model answers directly.
+    """
+
+    def __init__(self, small_model: str = 'gpt-4o-mini', large_model: str = 'gpt-4o',
+                 enabled: bool = True, threshold: float = 0.75):
+        """
+        Args:
+            small_model: OpenAI model for simple turns
+            large_model: OpenAI model for everything else and for escalations
+            enabled: False sends every turn to the large model
+            threshold: Minimum classifier confidence for the small model
+        """
+        self.models = {SMALL: small_model, LARGE: large_model}
+        self.enabled = enabled
+        self.threshold = threshold
+        self.latency = tracing.PhaseStats()
+        self.stats: Dict[str, Dict[str, float]] = {
+            tier: {'turns': 0, 'escalations': 0, 'prompt_tokens': 0, 'cached_tokens': 0,
+                   'completion_tokens': 0, 'cost_usd': 0.0}
+            for tier in TIERS
+        }
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ModelPolicy':
+        """
+        Build the policy from environment variables
+
+        MODEL_TIERING: 'false' to always use the large model (default true)
+        SMALL_MODEL: model for simple turns (default gpt-4o-mini)
+        LARGE_MODEL: model for complex turns and escalations (default gpt-4o)
+        MODEL_TIER_THRESHOLD: minimum confidence for the small model (default 0.75)
+        """
+        return cls(
+            small_model=os.getenv('SMALL_MODEL', 'gpt-4o-mini'),
+            large_model=os.getenv('LARGE_MODEL', 'gpt-4o'),
+            enabled=os.getenv('MODEL_TIERING', 'true').lower() != 'false',
+            threshold=float(os.getenv('MODEL_TIER_THRESHOLD', '0.75')),
+        )
+
+    @staticmethod
+    def classify(query: str, intents: Iterable[str]) -> Tuple[float, str]:
+        """
+        How confident we are that a turn is simple enough for the small model
+
+        Args:
+            query: The user's message
+            intents: Intents routed for the message (prompts.route_intents)
+
+        Returns:
+            Tuple (confidence between 0 and 1, short reason)
+        """
+        text = SheetsManager.normalize_text(query)
+        intents = set(intents)
+        if len(text.split()) > _MAX_SIMPLE_WORDS:
+            return 0.2, 'mensaje largo'
+        if _COMPLEX_WORDS.search(text):
+            return 0.1, 'pedido complejo'
+        if len(_ACTION_WORDS.findall(text)) > 1:
+            return 0.3, 'varias acciones'
+        if MIGRAINE in intents and CONTACTS not in intents:
+            return 0.85, 'migraña'
+        if _FIELD_UPDATE.search(text):
+            return 0.85, 'actualización de un campo'
+        if _LOG_NOTE.search(text):
+            return 0.8, 'nota en bitácora'
+        if _LOOKUP.search(text):
+            return 0.9, 'consulta simple'
+        return 0.5, 'sin clasificar'
+
+    def select(self, query: str, intents: FrozenSet[str]) -> Tuple[str, float, str]:
+        """
+        Pick the tier for a turn
+
+        Returns:
+            Tuple (tier, confidence, reason)
+        """
+        if not self.enabled:
+            return LARGE, 1.0, 'tiering desactivado'
+        confidence, reason = self.classify(query, intents)
+        return (SMALL if confidence >= self.threshold else LARGE), confidence, reason
+
+    @staticmethod
+    def escalation_reason(response: Dict, tool_names: Iterable[str]) -> Optional[str]:
+        """
+        Why a small-model turn should be answered again by the large model
+
+        Escalates when a tool returned an error, the model called a tool that
+        doesn't exist or sent a malformed call, or the turn ran out of
+        iterations - unless a write already succeeded.
+
+        Args:
+            response: AgentExecutor output with intermediate_steps
+            tool_names: Tools available in the turn
+
+        Returns:
+            The reason, or None to keep the small model's answer
+        """
+        available = set(tool_names)
+        reason = None
+        for action, observation in response.get('intermediate_steps', []):
+            observation = str(observation)
+            failed = observation.startswith('Error') or action.tool not in available
+            if action.tool in WRITE_TOOLS and not failed:
+                return None
+            if failed and reason is None:
+                reason = f"error en {action.tool}"
+        if reason:
+            return reason
+        output = str(response.get('output') or '').strip()
+        if not output:
+            return 'respuesta vacía'
+        if output.startswith(_STOPPED_OUTPUT):
+            return 'límite de iteraciones'
+        return None
+
+    def record_turn(self, tier: str, duration_ms: float):
+        self.latency.record(tier, duration_ms)
+        with self._lock:
+            self.stats[tier]['turns'] += 1
+
+    def record_escalation(self):
+        with self._lock:
+            self.stats[SMALL]['escalations'] += 1
+
+    def cost(self, tier: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+        """Estimated USD cost of one call (0 for models without a known price)"""
+        prices = MODEL_PRICES.get(self.models[tier])
+        if not prices:
+            return 0.0
+        input_price, cached_price, output_price = prices
+        uncached = max(0, prompt_tokens - cached_tokens)
+        return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+    def record_usage(self, tier: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+        """
+        Add the token usage of one model call to the tier's totals
+
+        Returns:
+            The estimated cost of the call
+        """
+        cost = self.cost(tier, prompt_tokens, cached_tokens, completion_tokens)
+        with self._lock:
+            totals = self.stats[tier]
+            totals['prompt_tokens'] += prompt_tokens
+            totals['cached_tokens'] += cached_tokens
+            totals['completion_tokens'] += completion_tokens
+            totals['cost_usd'] += cost
+        return cost
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Per-tier statistics
+
+        Returns:
+            Dictionary tier -> model, turns, escalations, tokens, cost and p50/p95 latency
+        """
+        latency = self.latency.summary()
+        with self._lock:
+            return {
+                tier: {
+                    'model': self.models[tier],
+                    **{key: (round(value, 6) if key == 'cost_usd' else value) for key, value in self.stats[tier].items()},
+                    'p50_ms': latency.get(tier, {}).get('p50', 0.0),
+                    'p95_ms': latency.get(tier, {}).get('p95', 0.0),
+                }
+                for tier in TIERS
+            }
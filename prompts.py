@@ -0,0 +1,150 @@
+"""
+Prompt assembly for LeadsAgent
+The system message is a static core followed by the sections of the routed
+intents, always in the same order, so identical requests share an identical
+prompt prefix (which the provider can cache) and each turn only carries the
+instructions and tool schemas it can use
+"""
+
+import re
+from typing import FrozenSet, Iterable, List
+
+from sheets_manager import SheetsManager
+
+
+CONTACTS = 'contacts'
+MIGRAINE = 'migraine'
+DATETIME = 'datetime'
+
+# Fixed order: sections and tools are always assembled in this order
+INTENTS = (CONTACTS, MIGRAINE, DATETIME)
+ALL_INTENTS: FrozenSet[str] = frozenset(INTENTS)
+
+# Tools available to each intent
+TOOL_GROUPS = {
+    CONTACTS: [
+        'search_by_name', 'search_by_company', 'search_by_role', 'get_all_contacts',
+        'update_bio', 'update_phone', 'update_email', 'update_telegram', 'update_company',
+        'update_role', 'add_to_log', 'add_new_contact', 'find_duplicates', 'merge_contacts',
+    ],
+    MIGRAINE: ['register_migraine', 'migraine_stats'],
+    DATETIME: ['get_current_datetime'],
+}
+
+CORE_PROMPT = """Eres un asistente inteligente que gestiona una base de datos de Leads y Contactos, y también ayuda a registrar episodios de migraña.
+
+Responde siempre en español, de manera sucinta, sin repreguntar ni agregar información no solicitada."""
+
+SECTIONS = {
+    CONTACTS: """Tu trabajo con los contactos es:
+1. Buscar información sobre contactos (por nombre, empresa, rol, etc.)
+2. Crear nuevos contactos en la base de datos
+3. Actualizar información de contactos existentes (bio, teléfono, email, telegram, empresa, rol, etc.)
+4. Añadir entradas a la bitácora de contactos
+5. Detectar y fusionar contactos duplicados
+
+La base de datos de contactos tiene los siguientes campos:
+- Nombre: Nombre completo del contacto (obligatorio)
+- Teléfono: Número de teléfono (puede estar vacío o decir "No registrado")
+- Email: Dirección de correo electrónico (puede estar vacío o decir "No registrado")
+- Telegram: Usuario de Telegram (puede estar vacío o decir "No registrado")
+- Empresa: Empresa donde trabaja (puede estar vacío o decir "No registrada")
+- Rol: Su rol o posición (puede estar vacío o decir "No registrado")
+- bio: Biografía e información personal (puede estar vacío o decir "Sin información")
+- bitácora: Registro de interacciones y notas (puede estar vacío o decir "Sin entradas")
+
+Las herramientas de búsqueda devuelven JSON compacto: "campos" lista los nombres de los campos una sola vez y cada elemento de "contactos" trae los valores de un contacto en ese mismo orden.
+
+IMPORTANTE - Presentación de información de contacto:
+- Si un campo dice "No registrado", "No registrada" o "Sin información", menciónalo naturalmente
+- NO digas "no hay información de contacto" si hay al menos UN campo con datos (teléfono, email o telegram)
+- Presenta la información disponible aunque algunos campos estén vacíos
+- Ejemplo: Si solo hay email, di "Email: juan@ejemplo.com. El teléfono y Telegram no están registrados"
+
+Cuando el usuario te pida agregar información de contactos:
+1. Busca al contacto por nombre para verificar si existe
+2. Si NO existe y el usuario quiere agregar información: usa add_new_contact para crearlo
+3. Si ya existe: usa las herramientas de actualización apropiadas (update_phone, update_email, update_telegram, etc.)
+4. Confirma al usuario que la operación fue exitosa
+
+IMPORTANTE - Contactos duplicados:
+- Si add_new_contact indica que ya existe un contacto similar, probablemente es el mismo: actualiza ese contacto en lugar de crear uno nuevo
+- Para revisar duplicados usa find_duplicates y muestra los pares encontrados
+- NUNCA uses merge_contacts sin que el usuario haya confirmado explícitamente qué contacto conservar""",
+
+    MIGRAINE: """La hoja de migrañas tiene los siguientes campos:
+- Fecha: Fecha del episodio en formato DD/MM/YYYY (obligatorio)
+- Intensidad: Nivel de intensidad (Baja, Media, Alta, o numérica) (obligatorio)
+- Posible causa: Causa o disparador de la migraña (obligatorio)
+
+IMPORTANTE - Registro de migrañas:
+- Cuando el usuario mencione palabras como "migraña", "dolor de cabeza", "jaqueca", "cefalea" y pida registrar, usa la herramienta register_migraine
+- Si el usuario no especifica fecha, usa la fecha de hoy del contexto
+- Extrae del mensaje del usuario: la intensidad (baja/media/alta o numérica) y la posible causa
+- Si falta alguna información, pregunta al usuario por ella antes de registrar
+- Confirma al usuario que el episodio fue registrado exitosamente
+- Para preguntas sobre el historial ("¿cuántas migrañas tuve este mes?", "¿cuáles son las causas más comunes?"), usa migraine_stats con el período y la intensidad mínima adecuados""",
+
+    DATETIME: """IMPORTANTE - Manejo de fechas y tiempo:
+- La fecha y hora actual están en el contexto al final de las instrucciones: úsalas directamente, sin llamar a get_current_datetime
+- Cuando guardes información con referencias temporales (ej: "reunión hoy", "llamada de ayer"), escribe la fecha real en formato DD/MM/YYYY
+- Ejemplo: Si el usuario dice "añade a la bitácora de Juan: reunión hoy", guarda "reunión el <fecha de hoy>"
+- Si quedara alguna referencia como "hoy", "ayer" o "el lunes" en bio, bitácora o fecha de migraña, se convierte automáticamente a la fecha real""",
+}
+
+_MIGRAINE_WORDS = re.compile(r'\b(migran\w*|jaqueca\w*|cefalea\w*|dolor(es)? de cabeza)\b')
+_CONTACT_WORDS = re.compile(
+    r'\b(contactos?|bitacora|bio|telefono|email|mail|correo|telegram|empresa|rol|busca\w*|'
+    r'lead\w*|duplicad\w*|fusion\w*|persona\w*|trabaja\w*)\b'
+)
+_TEMPORAL_WORDS = re.compile(
+    r'\b(hoy|ayer|anteayer|manana|ahora|fecha|dia|semana\w*|mes\w*|ano|lunes|martes|miercoles|jueves|'
+    r'viernes|sabado|domingo|today|now|yesterday|tomorrow|proxim\w*|pasad\w*|ultim\w*)\b|\d{1,2}/\d{1,2}'
+)
+
+
+def route_intents(query: str) -> FrozenSet[str]:
+    """
+    Pick the intents a query needs, with cheap keyword rules
+
+    Queries that mention migraines and nothing about contacts get only the
+    migraine tools; everything else gets the contact tools. Date handling is
+    added when the query has a temporal reference (and always for migraines,
+    which need a date).
+
+    Args:
+        query: The user's message
+
+    Returns:
+        Set of intents
+    """
+    text = SheetsManager.normalize_text(query)
+    intents = set()
+    migraine = bool(_MIGRAINE_WORDS.search(text))
+    if migraine:
+        intents.update((MIGRAINE, DATETIME))
+    if not migraine or _CONTACT_WORDS.search(text):
+        intents.add(CONTACTS)
+    if _TEMPORAL_WORDS.search(text):
+        intents.add(DATETIME)
+    return frozenset(intents)
+
+
+def build_system_prompt(intents: Iterable[str]) -> str:
+    """
+    Assemble the system message: the static core, then each intent's section in fixed order
+
+    Args:
+        intents: Intents to include
+
+    Returns:
+        The system message
+    """
+    selected = set(intents)
+    return '\n\n'.join([CORE_PROMPT] + [SECTIONS[intent] for intent in INTENTS if intent in selected])
+
+
+def tool_names(intents: Iterable[str]) -> List[str]:
+    """Names of the tools for some intents, in fixed order"""
+    selected = set(intents)
+    return [name for intent in INTENTS if intent in selected for name in TOOL_GROUPS[intent]]
@@ -0,0 +1,135 @@
+"""
+Compact in-memory table of sheet rows
+Keeps the rows exactly as the Sheets API returned them (lists of strings) plus
+one shared header index, instead of one dict per row with its own copy of the
+header keys. Rows are exposed as read-only dict-like views created on access,
+so only the records actually handed to a caller cost an object
+"""
+
+import sys
+from collections.abc import Mapping, Sequence
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Tuple
+
+from gspread.utils import numericise
+
+
+class RecordView(Mapping):
+    """
+    Read-only dict-like view of one row of a RecordTable
+
+    Behaves like the dicts returned by gspread's get_all_records: missing
+    cells read as '' and numeric strings are returned as numbers.
+    """
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: 'RecordTable', row: List[str]):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        index = self._table.index[key]
+        return numericise(self._row[index]) if index < len(self._row) else ''
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.index)
+
+    def __len__(self) -> int:
+        return len(self._table.index)
+
+    @property
+    def table(self) -> 'RecordTable':
+        """Table the record belongs to"""
+        return self._table
+
+    @property
+    def raw(self) -> List[str]:
+        """Cell text of the row as read from the sheet (shared: don't modify)"""
+        return self._row
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Copy the row into a plain dict (e.g. to modify it or serialize it)"""
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"RecordView({self.to_dict()!r})"
+
+
+class RecordTable(Sequence):
+    """
+    Sheet rows stored as lists, with interned headers and lazy record views
+
+    Indexing and iteration return RecordView objects; the underlying rows are
+    shared with whoever read them (e.g. the SheetsManager read cache), so
+    neither the table nor its views may be modified.
+    """
+
+    __slots__ = ('headers', 'index', 'derived', '_values', '_start')
+
+    def __init__(self, headers: List[str], rows: List[List[str]], start: int = 0):
+        """
+        Args:
+            headers: Header row
+            rows: Data rows (lists of cell values, possibly shorter than the header)
+            start: Position of the first data row in `rows` (lets a full
+                get_all_values result be wrapped without copying it)
+        """
+        self.headers = [sys.intern(header) for header in headers]
+        # Like dict(zip(headers, row)): on duplicated headers the last column wins
+        self.index: Dict[str, int] = {header: i for i, header in enumerate(self.headers)}
+        # Data computed from the rows by other modules (e.g. rendered records),
+        # kept as long as this snapshot of the sheet is in use
+        self.derived: Dict[str, Any] = {}
+        self._values = rows
+        self._start = start
+
+    @classmethod
+    def from_values(cls, values: List[List[str]]) -> 'RecordTable':
+        """
+        Wrap the output of Worksheet.get_all_values (header row first)
+
+        Args:
+            values: Rows of the sheet, header included
+
+        Returns:
+            RecordTable over the data rows (empty if there is no header row)
+        """
+        if not values:
+            return cls([], [])
+        return cls(values[0], values, start=1)
+
+    @property
+    def source(self) -> List[List[str]]:
+        """Rows the table was built from (e.g. the cached get_all_values result)"""
+        return self._values
+
+    def __len__(self) -> int:
+        return max(0, len(self._values) - self._start)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('record index out of range')
+        return RecordView(self, self._values[self._start + position])
+
+    def __iter__(self) -> Iterator[RecordView]:
+        for i in range(self._start, len(self._values)):
+            yield RecordView(self, self._values[i])
+
+    def cells(self, field: str) -> Iterator[Tuple[int, str]]:
+        """
+        Lazily yield the raw text of one column
+
+        Args:
+            field: Header name (an unknown field yields '' for every row)
+
+        Yields:
+            (position, text) pairs; table[position] is the record of the cell
+        """
+        index = self.index.get(field)
+        for position, row in enumerate(islice(self._values, self._start, None)):
+            yield position, row[index] if index is not None and index < len(row) else ''
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Script para configurar el webhook de Telegram
-Uso: python setup_webhook.py <webhook_url>
+Uso: python setup_webhook.py <webhook_url> [max_connections]
 """
 
 import sys
@@ -10,18 +10,34 @@ import requests
 from dotenv import load_dotenv
 
 
-def set_webhook(bot_token, webhook_url):
-    """Configure Telegram webhook"""
+def set_webhook(bot_token, webhook_url, max_connections=None, secret_token=None):
+    """
+    Configure Telegram webhook
+    
+    Args:
+        bot_token: Telegram bot token
+        webhook_url: HTTPS URL Telegram will post updates to
+        max_connections: Simultaneous connections Telegram opens to deliver
+            updates (1-100, Telegram's default is 40). With the self-hosted
+            webhook_server, around WEBHOOK_WORKERS lets every worker get updates
+        secret_token: Sent by Telegram in X-Telegram-Bot-Api-Secret-Token
+    """
     url = f"https://api.telegram.org/bot{bot_token}/setWebhook"
     
     payload = {
         "url": webhook_url,
         "allowed_updates": ["message", "edited_message"]
     }
+    if max_connections:
+        payload["max_connections"] = max(1, min(100, int(max_connections)))
+    if secret_token:
+        payload["secret_token"] = secret_token
     
     print(f"🔗 Configurando webhook...")
     print(f"   Bot token: {bot_token[:10]}...")
     print(f"   Webhook URL: {webhook_url}")
+    if max_connections:
+        print(f"   Max connections: {payload['max_connections']}")
     
     response = requests.post(url, json=payload)
     result = response.json()
@@ -98,7 +114,9 @@ def main():
         elif command.startswith("http"):
             # Set webhook with provided URL
             webhook_url = sys.argv[1]
-            if set_webhook(bot_token, webhook_url):
+            max_connections = sys.argv[2] if len(sys.argv) > 2 else os.getenv('WEBHOOK_MAX_CONNECTIONS')
+            secret_token = os.getenv('WEBHOOK_SECRET')
+            if set_webhook(bot_token, webhook_url, max_connections, secret_token):
                 print("\n")
                 get_webhook_info(bot_token)
         
@@ -114,10 +132,12 @@ def print_usage():
     """Print usage information"""
     print("\n📖 Uso:")
     print("   python setup_webhook.py <webhook_url>  - Configurar webhook")
+    print("   python setup_webhook.py <webhook_url> <max_connections>  - Con conexiones simultáneas (1-100)")
     print("   python setup_webhook.py info            - Ver info del webhook")
     print("   python setup_webhook.py delete          - Eliminar webhook")
     print("\n📝 Ejemplos:")
     print("   python setup_webhook.py https://abc.execute-api.us-east-1.amazonaws.com/prod/webhook")
+    print("   python setup_webhook.py https://bot.midominio.com/webhook 16")
     print("   python setup_webhook.py info")
     print("   python setup_webhook.py delete")
     print("")
@@ -4,10 +4,95 @@ Handles all interactions with the Google Sheet
 """
 
 import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import rowcol_to_a1
 from google.oauth2.service_account import Credentials
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Mapping, Optional, Tuple
 import os
+import threading
+import time
 import unicodedata
+import tracing
+from record_table import RecordTable
+
+
+# Scopes requested for the service account
+SCOPES = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Set SHEETS_CHANGE_DETECTION=false to always download the full sheet on reads
+CHANGE_DETECTION = os.getenv('SHEETS_CHANGE_DETECTION', 'true').lower() != 'false'
+
+# Seconds a Drive fingerprint is trusted before asking again (0: check on every read)
+CHANGE_CHECK_SECONDS = float(os.getenv('SHEETS_CHANGE_CHECK_SECONDS', '0'))
+
+# Searches matching more rows than this read the whole sheet instead of fetching each row
+HYDRATE_MAX_ROWS = int(os.getenv('SHEETS_HYDRATE_MAX_ROWS', '50'))
+
+
+class DriveChangeDetector:
+    """
+    Cheap "has the spreadsheet changed?" check
+    
+    Reads the Drive metadata of the spreadsheet file (version and modifiedTime),
+    a tiny request compared to downloading the sheet. Drive bumps the version
+    on every edit, from the bot or from a person in the browser.
+    """
+    
+    def __init__(self, spreadsheet, min_interval: float = 0.0):
+        """
+        Args:
+            spreadsheet: gspread Spreadsheet (or a compatible object with .id and .client.request)
+            min_interval: Seconds a fingerprint is reused before asking Drive again
+        """
+        self.spreadsheet = spreadsheet
+        self.min_interval = min_interval
+        self._fingerprint: Optional[str] = None
+        self._checked_at = 0.0
+        self._retry_at = 0.0
+    
+    def fingerprint(self) -> Optional[str]:
+        """
+        Current version of the spreadsheet file
+        
+        Returns:
+            An opaque string that changes whenever the file changes, or None if
+            Drive can't be queried (then nothing should be served from cache)
+        """
+        now = time.monotonic()
+        if now < self._retry_at:
+            return None
+        if self._fingerprint is not None and now - self._checked_at < self.min_interval:
+            return self._fingerprint
+        try:
+            with tracing.span('drive.files.get'):
+                response = self.spreadsheet.client.request(
+                    'get',
+                    f"{DRIVE_FILES_API_V3_URL}/{self.spreadsheet.id}",
+                    params={'fields': 'version,modifiedTime', 'supportsAllDrives': True}
+                )
+                metadata = response.json()
+        except Exception as e:
+            # Full reads until Drive answers again; don't retry on every read
+            print(f"Warning: could not read Drive metadata, reading the full sheet: {e}")
+            self._fingerprint = None
+            self._retry_at = now + 60
+            return None
+        self._fingerprint = f"{metadata.get('version')}:{metadata.get('modifiedTime')}"
+        self._checked_at = now
+        return self._fingerprint
+    
+    @property
+    def last_fingerprint(self) -> Optional[str]:
+        """Fingerprint seen by the last check, without asking Drive (None after invalidate)"""
+        return self._fingerprint
+    
+    def invalidate(self):
+        """Forget the last fingerprint (after our own writes, so min_interval can't hide them)"""
+        self._fingerprint = None
 
 
 class SheetsManager:
@@ -25,27 +110,129 @@ class SheetsManager:
         'bitácora': 7
     }
     
-    def __init__(self, credentials_file: str, spreadsheet_id: str):
+    # Column mapping for the migraine tracking sheet
+    MIGRAINE_COLUMNS = {
+        'Fecha': 0,
+        'Intensidad': 1,
+        'Posible causa': 2
+    }
+    
+    def __init__(self, credentials_file: str, spreadsheet_id: str, columns: Optional[Dict[str, int]] = None,
+                 worksheet: Optional[str] = None, change_detection: Optional[bool] = None):
         """
         Initialize the sheets manager
         
+        The client, spreadsheet and worksheet come from the shared SheetsPool of
+        the credentials file, so managers for other sheets reuse the same
+        authorized client.
+        
         Args:
             credentials_file: Path to the service account JSON file
             spreadsheet_id: The ID of the Google Spreadsheet
+            columns: Expected column mapping (default: COLUMNS, the contacts sheet)
+            worksheet: Worksheet title (default: the first sheet)
+            change_detection: Serve full reads from memory while Drive reports the file
+                unchanged (default: SHEETS_CHANGE_DETECTION, on)
+        """
+        self.columns = columns if columns is not None else self.COLUMNS
+        self._headers: Optional[List[str]] = None
+        self._column_map: Dict[str, int] = {}
+        
+        pool = SheetsPool.shared(credentials_file)
+        self.client = pool.client
+        self.spreadsheet = pool.spreadsheet(spreadsheet_id)
+        self.sheet = pool.worksheet(spreadsheet_id, worksheet)
+        self._setup_read_cache(change_detection)
+    
+    @classmethod
+    def from_worksheet(cls, worksheet, columns: Optional[Dict[str, int]] = None,
+                       change_detection: Optional[bool] = None) -> 'SheetsManager':
+        """
+        Build a manager around an already opened worksheet, skipping authentication
+        
+        Useful for benchmarks and local tools that provide their own worksheet
+        object (anything implementing the gspread Worksheet methods used here).
+        
+        Args:
+            worksheet: A gspread Worksheet or a compatible object
+            columns: Expected column mapping (default: COLUMNS, the contacts sheet)
+            change_detection: Serve full reads from memory while Drive reports the file
+                unchanged (default: SHEETS_CHANGE_DETECTION; needs worksheet.spreadsheet)
+            
+        Returns:
+            SheetsManager bound to that worksheet
+        """
+        manager = cls.__new__(cls)
+        manager.columns = columns if columns is not None else cls.COLUMNS
+        manager._headers = None
+        manager._column_map = {}
+        manager.client = None
+        manager.spreadsheet = getattr(worksheet, 'spreadsheet', None)
+        manager.sheet = worksheet
+        manager._setup_read_cache(change_detection)
+        return manager
+    
+    def _setup_read_cache(self, change_detection: Optional[bool]):
+        if change_detection is None:
+            change_detection = CHANGE_DETECTION
+        self._read_cache: Dict[str, tuple] = {}
+        self._records: Optional[RecordTable] = None
+        # Bumped on every write through this manager, so data read earlier can tell it's stale
+        self.generation = 0
+        self.change_detector: Optional[DriveChangeDetector] = None
+        if change_detection and getattr(self.spreadsheet, 'client', None) is not None:
+            self.change_detector = DriveChangeDetector(self.spreadsheet, min_interval=CHANGE_CHECK_SECONDS)
+        # Drive fingerprint of the file when the cached header row was last confirmed
+        self._schema_fingerprint: Optional[str] = None
+    
+    def _cached_read(self, key: str, read: Callable[[], Any]) -> Any:
         """
-        # Define the scope
-        scope = [
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
+        Run a full-sheet read, or return the previous result if the file hasn't changed
         
-        # Authenticate using the service account
-        creds = Credentials.from_service_account_file(credentials_file, scopes=scope)
-        self.client = gspread.authorize(creds)
+        Args:
+            key: Cache slot (e.g. 'values')
+            read: Function doing the actual read
+            
+        Returns:
+            The read result (shared between callers: don't modify it)
+        """
+        fingerprint = self.change_detector.fingerprint() if self.change_detector is not None else None
+        entry = self._read_cache.get(key)
+        if fingerprint is not None and entry is not None and entry[0] == fingerprint:
+            tracing.record_span('sheets.cache_hit', 0.0, read=key)
+            result = entry[1]
+        else:
+            with tracing.span(f'sheets.get_all_{key}') as s:
+                result = read()
+                s.set(rows=len(result))
+            if fingerprint is not None:
+                self._read_cache[key] = (fingerprint, result)
+        # A full read carries the header row: confirm the cached schema for free
+        if key == 'values':
+            self._confirm_schema(result[0] if result else [], fingerprint)
+        return result
+    
+    def _fresh_read(self, key: str) -> Optional[Any]:
+        """
+        Cached full read, if there is one and the file hasn't changed since
         
-        # Open the spreadsheet
-        self.spreadsheet = self.client.open_by_key(spreadsheet_id)
-        self.sheet = self.spreadsheet.sheet1  # Use the first sheet
+        Only asks Drive when something is cached, so it's free otherwise.
+        """
+        entry = self._read_cache.get(key)
+        if entry is None or self.change_detector is None:
+            return None
+        if self.change_detector.fingerprint() != entry[0]:
+            return None
+        tracing.record_span('sheets.cache_hit', 0.0, read=key)
+        return entry[1]
+    
+    def invalidate_cache(self):
+        """Drop the cached full reads (call after writing to the sheet outside this manager)"""
+        self._read_cache.clear()
+        self._records = None
+        self.generation += 1
+        if self.change_detector is not None:
+            self.change_detector.invalidate()
     
     @staticmethod
     def normalize_text(text: str) -> str:
@@ -64,61 +251,328 @@ class SheetsManager:
         without_accents = ''.join(c for c in nfd if unicodedata.category(c) != 'Mn')
         # Convert to lowercase
         return without_accents.lower().strip()
+    
+    @property
+    def headers(self) -> List[str]:
+        """Header row of the sheet, read once and cached"""
+        if self._headers is None:
+            self.refresh_schema()
+        return self._headers
+    
+    def refresh_schema(self) -> List[str]:
+        """
+        Read the header row again and rebuild the column map
+        
+        Called lazily on first use and whenever a write finds the cached
+        schema out of date (e.g. a column was added or moved in the sheet).
+        
+        Returns:
+            The header row
+        """
+        with tracing.span('sheets.row_values'):
+            headers = self.sheet.row_values(1)
+        self._set_schema(headers)
+        self._schema_fingerprint = self.change_detector.last_fingerprint if self.change_detector is not None else None
+        return headers
+    
+    def _set_schema(self, headers: List[str]):
+        """Cache a header row read from the sheet and rebuild the column map"""
+        self._headers = headers
+        self._column_map = {header: idx for idx, header in enumerate(headers, start=1) if header}
+        
+        for problem in self.validate_schema(headers):
+            print(f"Warning: sheet schema mismatch: {problem}")
+    
+    def _check_schema(self, headers: List[str]) -> bool:
+        """
+        Compare a header row just read with the cached one, adopting it if they differ
+        
+        Writes call this with a header row read together with (or right
+        before) the write, so a column added or moved in the sheet by hand
+        is not written with the old column positions.
+        
+        Returns:
+            True if the schema changed
+        """
+        if headers == self._headers:
+            return False
+        print("Sheet header row changed, refreshing the cached schema")
+        self._set_schema(headers)
+        self.invalidate_cache()
+        return True
+    
+    def _confirm_schema(self, headers: List[str], fingerprint: Optional[str]):
+        """Adopt the header row of a full read made at `fingerprint`"""
+        # Full reads pad the header row to the widest row; row_values doesn't
+        headers = list(headers)
+        while headers and not headers[-1]:
+            headers.pop()
+        if headers != self._headers:
+            if self._headers is not None:
+                print("Sheet header row changed, refreshing the cached schema")
+            self._set_schema(headers)
+        self._schema_fingerprint = fingerprint
+    
+    def _schema_is_current(self) -> bool:
+        """
+        Whether rows can be built from the cached header row without reading it
+        
+        True while Drive hasn't reported a version of the file other than the
+        one the schema was confirmed at (by refresh_schema or a full read,
+        such as the duplicate check before adding a contact). Without change
+        detection there is no way to tell, so the header row is read again.
+        """
+        if self._headers is None or self.change_detector is None:
+            return False
+        seen = self.change_detector.last_fingerprint
+        return seen is None or seen == self._schema_fingerprint
+    
+    def validate_schema(self, headers: Optional[List[str]] = None) -> List[str]:
+        """
+        Compare the header row with the expected columns
+        
+        Args:
+            headers: Header row to check (default: the cached one)
+            
+        Returns:
+            List of problems (empty if the sheet matches the expected columns)
+        """
+        if headers is None:
+            headers = self.headers
+        
+        problems = []
+        for column, position in self.columns.items():
+            if column not in headers:
+                problems.append(f"missing column '{column}' (expected at column {position + 1})")
+            elif headers.index(column) != position:
+                problems.append(f"column '{column}' is at column {headers.index(column) + 1}, expected {position + 1}")
+        return problems
+    
+    def column_index(self, field: str) -> Optional[int]:
+        """
+        Get the 1-based column index of a field from the cached schema
+        
+        Args:
+            field: Header name
+            
+        Returns:
+            Column index, or None if the sheet has no such column
+        """
+        if self._headers is None:
+            self.refresh_schema()
+        return self._column_map.get(field)
         
-    def get_all_records(self) -> List[Dict]:
+    def get_all_records(self) -> RecordTable:
         """
         Get all records from the sheet
         
+        The records are read-only views over the rows of get_all_values (no
+        dict per row), so they share its cache: with change detection the
+        sheet is only downloaded again when Drive reports that it changed.
+        
         Returns:
-            List of dictionaries with all records
+            RecordTable with all records (a sequence of dict-like records;
+            use to_dict() on a record to get a modifiable copy)
         """
         try:
-            records = self.sheet.get_all_records()
-            return records
+            return self._table_for(self.get_all_values())
         except Exception as e:
             print(f"Error fetching records: {e}")
+            return RecordTable([], [])
+    
+    def _table_for(self, values: List[List[str]]) -> RecordTable:
+        """RecordTable over a full read, reused while the read is (so its derived data is too)"""
+        if self._records is None or self._records.source is not values:
+            self._records = RecordTable.from_values(values)
+        return self._records
+    
+    def get_all_values(self) -> List[List[str]]:
+        """
+        Get every row of the sheet as lists of strings, header row first
+        
+        With change detection the sheet is only downloaded again when Drive
+        reports that the file changed; callers must not modify the result.
+        
+        Returns:
+            List of rows
+        """
+        return self._cached_read('values', self.sheet.get_all_values)
+    
+    def read_columns(self, fields: List[str]) -> Dict[str, List[str]]:
+        """
+        Read only some columns of the sheet, in one request
+        
+        Args:
+            fields: Header names
+            
+        Returns:
+            Dictionary mapping each field to its values from row 2 down (the lists
+            can be shorter than the sheet: trailing empty cells are not returned)
+        """
+        indexes = {field: self.column_index(field) for field in fields}
+        missing = [field for field, col in indexes.items() if col is None]
+        if missing:
+            raise KeyError(f"Fields not found in headers: {', '.join(missing)}")
+        
+        ranges = []
+        for field in fields:
+            start = rowcol_to_a1(2, indexes[field])
+            ranges.append(f"{start}:{start.rstrip('0123456789')}")
+        with tracing.span('sheets.batch_get', columns=len(fields)):
+            value_ranges = self.sheet.batch_get(ranges)
+        return {
+            field: [row[0] if row else '' for row in values]
+            for field, values in zip(fields, value_ranges)
+        }
+    
+    def get_names(self) -> List[str]:
+        """
+        Get the name column from row 2 down
+        
+        Kept in memory like the full reads while the file is unchanged.
+        
+        Returns:
+            Names in sheet order (names[i] is row i + 2); callers must not modify it
+        """
+        return self._cached_read('names', lambda: self.read_columns(['Nombre'])['Nombre'])
+    
+    def get_rows(self, row_numbers: List[int]) -> List[Mapping]:
+        """
+        Read whole rows by number, in one request
+        
+        Values are converted like get_all_records (numeric strings become numbers).
+        
+        Args:
+            row_numbers: 1-based row numbers (the header is row 1)
+            
+        Returns:
+            One record per row, in the given order (read-only views, see RecordTable)
+        """
+        if not row_numbers:
             return []
+        headers = self.headers
+        ranges = [f"A{row}:{rowcol_to_a1(row, len(headers))}" for row in row_numbers]
+        with tracing.span('sheets.batch_get', rows=len(ranges)):
+            value_ranges = self.sheet.batch_get(ranges)
+        
+        return list(RecordTable(headers, [values[0] if values else [] for values in value_ranges]))
     
-    def search_by_name(self, name: str) -> List[Dict]:
+    def _column_cells(self, field: str) -> Tuple[Optional[RecordTable], Iterable[Tuple[int, str]]]:
         """
-        Search for records by name (fuzzy match: case-insensitive, accent-insensitive)
+        Text of one column, reading as little as possible
+        
+        Uses the cached full read when it is still fresh. Otherwise only the
+        column is downloaded, so the bio and bitácora of contacts that don't
+        match never leave the sheet.
         
         Args:
-            name: The name to search for
+            field: Header name
             
         Returns:
-            List of matching records
+            (table, cells): cells yields (key, text) pairs. With a table the key
+            is a position in it; without one (only the column was read) the key
+            is the sheet row number, to be fetched with get_rows
+        """
+        values = self._fresh_read('values')
+        if values is None and self.column_index(field) is not None:
+            try:
+                return None, enumerate(self.read_columns([field])[field], start=2)
+            except Exception as e:
+                print(f"Error reading column '{field}', reading the whole sheet: {e}")
+        table = self._table_for(values) if values is not None else self.get_all_records()
+        return table, table.cells(field)
+    
+    def iter_matches(self, field: str, predicate: Callable[[str], bool],
+                     limit: Optional[int] = None) -> Iterator[Mapping]:
+        """
+        Lazily yield the records whose `field` satisfies `predicate`
+        
+        The column is scanned only until `limit` matches are found. When only
+        the column was downloaded, the matching rows are fetched together in one
+        request (or the whole sheet is read if there are more than
+        SHEETS_HYDRATE_MAX_ROWS of them).
+        
+        Args:
+            field: Header name of the column to match on
+            predicate: Called with the cell text
+            limit: Stop after this many records (default: all)
+            
+        Yields:
+            Matching records, in sheet order
+        """
+        table, cells = self._column_cells(field)
+        keys = (key for key, text in cells if predicate(text))
+        if table is None:
+            rows = list(islice(keys, HYDRATE_MAX_ROWS + 1 if limit is None else limit))
+            records = None
+            if len(rows) <= HYDRATE_MAX_ROWS:
+                try:
+                    records = self.get_rows(rows)
+                except Exception as e:
+                    print(f"Error fetching matching rows, reading the whole sheet: {e}")
+            if records is not None:
+                yield from records
+                return
+            table = self.get_all_records()
+            keys = (key for key, text in table.cells(field) if predicate(text))
+        for key in islice(keys, limit):
+            yield table[key]
+    
+    def iter_by_name(self, name: str, limit: Optional[int] = None) -> Iterator[Mapping]:
+        """
+        Lazily search for records by name (fuzzy match: case-insensitive, accent-insensitive)
+        
+        Args:
+            name: The name to search for
+            limit: Stop after this many records (default: all)
+            
+        Yields:
+            Matching records
         """
-        all_records = self.get_all_records()
         name_normalized = self.normalize_text(name)
+        return self.iter_matches('Nombre', lambda value: name_normalized in self.normalize_text(value), limit)
+    
+    def iter_by_field(self, field: str, value: str, limit: Optional[int] = None) -> Iterator[Mapping]:
+        """
+        Lazily search for records by any field (fuzzy match: case-insensitive, accent-insensitive)
         
-        matches = [
-            record for record in all_records 
-            if name_normalized in self.normalize_text(record.get('Nombre', ''))
-        ]
+        Args:
+            field: The field name to search in
+            value: The value to search for
+            limit: Stop after this many records (default: all)
+            
+        Yields:
+            Matching records
+        """
+        value_normalized = self.normalize_text(value)
+        return self.iter_matches(field, lambda cell: value_normalized in self.normalize_text(cell), limit)
+    
+    def search_by_name(self, name: str, limit: Optional[int] = None) -> List[Mapping]:
+        """
+        Search for records by name (fuzzy match: case-insensitive, accent-insensitive)
         
-        return matches
+        Args:
+            name: The name to search for
+            limit: Return at most this many records (default: all)
+            
+        Returns:
+            List of matching records
+        """
+        return list(self.iter_by_name(name, limit))
     
-    def search_by_field(self, field: str, value: str) -> List[Dict]:
+    def search_by_field(self, field: str, value: str, limit: Optional[int] = None) -> List[Mapping]:
         """
         Search for records by any field (fuzzy match: case-insensitive, accent-insensitive)
         
         Args:
             field: The field name to search in
             value: The value to search for
+            limit: Return at most this many records (default: all)
             
         Returns:
             List of matching records
         """
-        all_records = self.get_all_records()
-        value_normalized = self.normalize_text(value)
-        
-        matches = [
-            record for record in all_records 
-            if value_normalized in self.normalize_text(str(record.get(field, '')))
-        ]
-        
-        return matches
+        return list(self.iter_by_field(field, value, limit))
     
     def update_field(self, name: str, field: str, new_value: str, append: bool = False) -> bool:
         """
@@ -134,26 +588,47 @@ class SheetsManager:
             True if successful, False otherwise
         """
         try:
-            # Find the row with the matching name
-            all_values = self.sheet.get_all_values()
+            field_col_idx = self.column_index(field)
+            name_col_idx = self.column_index('Nombre')
             
-            # Find the header row
-            headers = all_values[0]
+            # An unknown field may be a column added since the schema was cached
+            if field_col_idx is None or name_col_idx is None:
+                self.refresh_schema()
+                field_col_idx = self.column_index(field)
+                name_col_idx = self.column_index('Nombre')
             
-            # Find the column index for the field
-            if field not in headers:
+            if field_col_idx is None:
                 print(f"Field '{field}' not found in headers")
                 return False
+            if name_col_idx is None:
+                print("Field 'Nombre' not found in headers")
+                return False
             
-            field_col_idx = headers.index(field) + 1  # gspread uses 1-based indexing
-            name_col_idx = headers.index('Nombre') + 1
+            # Only the name column is needed to find the row; the header row
+            # comes in the same request to check the cached column positions
+            name_column = rowcol_to_a1(1, name_col_idx).rstrip('0123456789')
+            with tracing.span('sheets.batch_get', ranges=2):
+                header_range, name_range = self.sheet.batch_get(['1:1', f"{name_column}:{name_column}"])
+            names = [row[0] if row else '' for row in name_range]
+            
+            # The columns changed since the schema was cached: use the new positions
+            if self._check_schema(list(header_range[0]) if header_range else []):
+                field_col_idx = self.column_index(field)
+                moved = self.column_index('Nombre') != name_col_idx
+                name_col_idx = self.column_index('Nombre')
+                if field_col_idx is None or name_col_idx is None:
+                    print(f"Field '{field}' not found in headers")
+                    return False
+                if moved:
+                    with tracing.span('sheets.col_values'):
+                        names = self.sheet.col_values(name_col_idx)
             
             # Find the row with the matching name (fuzzy match: case-insensitive, accent-insensitive)
             name_normalized = self.normalize_text(name)
             target_row = None
             
-            for row_idx, row in enumerate(all_values[1:], start=2):  # Start from row 2 (skip header)
-                row_name_normalized = self.normalize_text(row[name_col_idx - 1])
+            for row_idx, row_name in enumerate(names[1:], start=2):  # Start from row 2 (skip header)
+                row_name_normalized = self.normalize_text(row_name)
                 if name_normalized == row_name_normalized or name_normalized in row_name_normalized:
                     target_row = row_idx
                     break
@@ -164,12 +639,15 @@ class SheetsManager:
             
             # Get current value if appending
             if append:
-                current_value = self.sheet.cell(target_row, field_col_idx).value or ""
+                with tracing.span('sheets.cell'):
+                    current_value = self.sheet.cell(target_row, field_col_idx).value or ""
                 if current_value:
                     new_value = f"{current_value}\n{new_value}"
             
             # Update the cell
-            self.sheet.update_cell(target_row, field_col_idx, new_value)
+            with tracing.span('sheets.update_cell'):
+                self.sheet.update_cell(target_row, field_col_idx, new_value)
+            self.invalidate_cache()
             print(f"Successfully updated {field} for {name}")
             return True
             
@@ -177,6 +655,16 @@ class SheetsManager:
             print(f"Error updating field: {e}")
             return False
     
+    def _headers_for_write(self) -> List[str]:
+        """Header row to build appended rows with, read again only if the file may have changed"""
+        if self._schema_is_current():
+            return self._headers
+        with tracing.span('sheets.row_values'):
+            headers = self.sheet.row_values(1)
+        self._check_schema(headers)
+        self._schema_fingerprint = self.change_detector.last_fingerprint if self.change_detector is not None else None
+        return headers
+    
     def add_record(self, record: Dict) -> bool:
         """
         Add a new record to the sheet
@@ -188,15 +676,18 @@ class SheetsManager:
             True if successful, False otherwise
         """
         try:
-            # Get the headers from the sheet to know the column order
-            headers = self.sheet.row_values(1)
+            # The row is built in header order; the cached header row is only
+            # read again when Drive reports a change since it was confirmed
+            headers = self._headers_for_write()
             
             # Prepare the row data in the correct order based on headers
             row = []
             for header in headers:
                 row.append(record.get(header, ''))
             
-            self.sheet.append_row(row)
+            with tracing.span('sheets.append_row'):
+                self.sheet.append_row(row)
+            self.invalidate_cache()
             
             # Get identifier for log message (try 'Nombre' first, then 'Fecha', then first field)
             identifier = record.get('Nombre') or record.get('Fecha') or record.get(headers[0], 'Unknown')
@@ -207,7 +698,62 @@ class SheetsManager:
             print(f"Error adding record: {e}")
             return False
     
-    def get_record_by_name(self, name: str) -> Optional[Dict]:
+    def add_records(self, records: List[Dict], headers: Optional[List[str]] = None) -> bool:
+        """
+        Add several records to the sheet in a single API call
+        
+        Args:
+            records: List of dictionaries with the record data
+            headers: Header row to use instead of the cached schema
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not records:
+            return True
+        
+        try:
+            if headers is None:
+                headers = self._headers_for_write()
+            
+            rows = [[record.get(header, '') for header in headers] for record in records]
+            
+            with tracing.span('sheets.append_rows', rows=len(rows)):
+                self.sheet.append_rows(rows)
+            self.invalidate_cache()
+            
+            print(f"Successfully added {len(rows)} new records")
+            return True
+            
+        except Exception as e:
+            print(f"Error adding records: {e}")
+            return False
+    
+    def get_name_index(self) -> Dict[str, int]:
+        """
+        Get the normalized names in the sheet, reading only the name column
+        
+        Returns:
+            Dictionary mapping normalized name to its row number (1-based, header is row 1)
+        """
+        try:
+            name_col_idx = self.column_index('Nombre')
+            if name_col_idx is None:
+                print("Field 'Nombre' not found in headers")
+                return {}
+            with tracing.span('sheets.col_values'):
+                names = self.sheet.col_values(name_col_idx)
+        except Exception as e:
+            print(f"Error fetching name index: {e}")
+            return {}
+        
+        index = {}
+        for row_idx, name in enumerate(names[1:], start=2):
+            if name:
+                index.setdefault(self.normalize_text(name), row_idx)
+        return index
+    
+    def get_record_by_name(self, name: str) -> Optional[Mapping]:
         """
         Get a single record by fuzzy name match
         
@@ -217,17 +763,231 @@ class SheetsManager:
         Returns:
             Dictionary with the record data or None if not found
         """
-        matches = self.search_by_name(name)
+        name_normalized = self.normalize_text(name)
+        table, cells = self._column_cells('Nombre')
+        
+        # An exact normalized match wins; otherwise the first partial match.
+        # The scan stops at the first exact match, and only the chosen row is fetched
+        best = None
+        for key, text in cells:
+            normalized = self.normalize_text(text)
+            if normalized == name_normalized:
+                best = key
+                break
+            if best is None and name_normalized in normalized:
+                best = key
         
-        if not matches:
+        if best is None:
             return None
+        if table is not None:
+            return table[best]
+        try:
+            records = self.get_rows([best])
+        except Exception as e:
+            print(f"Error fetching record: {e}")
+            return None
+        return records[0] if records else None
+
+
+class SheetsPool:
+    """
+    Opens spreadsheets and worksheets through one authorized client
+    
+    Everything is opened on first use and cached, so adding more sheets
+    (per team, per tracker) doesn't add authorizations or work at cold start.
+    """
+    
+    _shared: Dict[str, 'SheetsPool'] = {}
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, credentials_file: Optional[str] = None, client=None):
+        """
+        Args:
+            credentials_file: Path to the service account JSON file
+            client: An already authorized gspread client (or a compatible object)
+        """
+        if credentials_file is None and client is None:
+            raise ValueError("SheetsPool needs a credentials file or a client")
+        self.credentials_file = credentials_file
+        self._client = client
+        self._spreadsheets: Dict[str, object] = {}
+        self._worksheets: Dict[tuple, object] = {}
+        self._managers: Dict[tuple, SheetsManager] = {}
+        # Worksheets handed out for good (worksheet/manager) vs. leased (lease/release)
+        self._pinned: set = set()
+        self._leases: Dict[tuple, int] = {}
+        # One lock per handle being opened, so a slow sheet doesn't hold up the others
+        self._opening: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.RLock()
+    
+    @classmethod
+    def shared(cls, credentials_file: str) -> 'SheetsPool':
+        """
+        Get the process-wide pool for a credentials file
         
-        # If exact normalized match found, return it
-        name_normalized = self.normalize_text(name)
-        for match in matches:
-            if self.normalize_text(match.get('Nombre', '')) == name_normalized:
-                return match
+        Args:
+            credentials_file: Path to the service account JSON file
+            
+        Returns:
+            The same SheetsPool for every call with the same file
+        """
+        with cls._shared_lock:
+            pool = cls._shared.get(credentials_file)
+            if pool is None:
+                pool = cls._shared[credentials_file] = cls(credentials_file)
+            return pool
+    
+    @property
+    def client(self):
+        """The authorized gspread client (authorizes on first use)"""
+        with self._lock:
+            if self._client is None:
+                with tracing.span('sheets.authorize'):
+                    creds = Credentials.from_service_account_file(self.credentials_file, scopes=SCOPES)
+                    self._client = gspread.authorize(creds)
+            return self._client
+    
+    def _open(self, cache: Dict, key, open_handle: Callable[[], Any]):
+        """
+        Get a cached handle, opening it at most once at a time per key
         
-        # Otherwise return the first match
-        return matches[0] if matches else None
-
+        The pool lock is only held to look up and store handles; the network
+        request runs under a lock of its own key, so other sheets are served
+        meanwhile and concurrent requests for the same sheet open it once.
+        """
+        with self._lock:
+            handle = cache.get(key)
+            if handle is not None:
+                return handle
+            opening = self._opening.setdefault((id(cache), key), threading.Lock())
+        with opening:
+            with self._lock:
+                handle = cache.get(key)
+            if handle is not None:
+                return handle
+            try:
+                handle = open_handle()
+                with self._lock:
+                    cache[key] = handle
+            finally:
+                with self._lock:
+                    self._opening.pop((id(cache), key), None)
+            return handle
+    
+    def spreadsheet(self, spreadsheet_id: str):
+        """
+        Get a spreadsheet, opening it on first use
+        
+        Args:
+            spreadsheet_id: The ID of the Google Spreadsheet
+        """
+        def open_spreadsheet():
+            client = self.client
+            with tracing.span('sheets.open_by_key'):
+                return client.open_by_key(spreadsheet_id)
+        return self._open(self._spreadsheets, spreadsheet_id, open_spreadsheet)
+    
+    def _worksheet(self, key: tuple):
+        spreadsheet_id, title = key
+        
+        def open_worksheet():
+            spreadsheet = self.spreadsheet(spreadsheet_id)
+            if title is None:
+                return spreadsheet.sheet1
+            with tracing.span('sheets.worksheet'):
+                return spreadsheet.worksheet(title)
+        return self._open(self._worksheets, key, open_worksheet)
+    
+    def worksheet(self, spreadsheet_id: str, title: Optional[str] = None):
+        """
+        Get a worksheet, opening it on first use
+        
+        Args:
+            spreadsheet_id: The ID of the Google Spreadsheet
+            title: Worksheet title (default: the first sheet)
+        """
+        key = (spreadsheet_id, title)
+        with self._lock:
+            self._pinned.add(key)
+        return self._worksheet(key)
+    
+    def _manager(self, key: tuple, columns: Optional[Dict[str, int]]) -> SheetsManager:
+        def create_manager():
+            manager = SheetsManager.from_worksheet(self._worksheet(key), columns=columns)
+            manager.client = self._client
+            return manager
+        return self._open(self._managers, key, create_manager)
+    
+    def manager(self, spreadsheet_id: str, worksheet: Optional[str] = None,
+                columns: Optional[Dict[str, int]] = None) -> SheetsManager:
+        """
+        Get the SheetsManager of a worksheet, created on first use
+        
+        Managers are cached too, so their header schema is read once per process.
+        
+        Args:
+            spreadsheet_id: The ID of the Google Spreadsheet
+            worksheet: Worksheet title (default: the first sheet)
+            columns: Expected column mapping (default: COLUMNS, the contacts sheet)
+            
+        Returns:
+            SheetsManager bound to that worksheet
+        """
+        key = (spreadsheet_id, worksheet)
+        with self._lock:
+            self._pinned.add(key)
+        return self._manager(key, columns)
+    
+    def lease(self, spreadsheet_id: str, worksheet: Optional[str] = None,
+              columns: Optional[Dict[str, int]] = None) -> SheetsManager:
+        """
+        Get the SheetsManager of a worksheet for as long as it's needed
+        
+        Like manager(), but every lease must be paired with a release(); the
+        handles are dropped when the last lease is released, unless the
+        worksheet is also used for good (through worksheet() or manager()).
+        
+        Returns:
+            SheetsManager bound to that worksheet (shared by all its holders)
+        """
+        key = (spreadsheet_id, worksheet)
+        with self._lock:
+            self._leases[key] = self._leases.get(key, 0) + 1
+        try:
+            return self._manager(key, columns)
+        except Exception:
+            self.release(spreadsheet_id, worksheet)
+            raise
+    
+    def release(self, spreadsheet_id: str, worksheet: Optional[str] = None):
+        """
+        Give back a lease; the last one out drops the handles nobody else uses
+        
+        Args:
+            spreadsheet_id: The ID of the Google Spreadsheet
+            worksheet: Worksheet title (default: the first sheet)
+        """
+        key = (spreadsheet_id, worksheet)
+        with self._lock:
+            remaining = self._leases.get(key, 0) - 1
+            if remaining > 0:
+                self._leases[key] = remaining
+                return
+            self._leases.pop(key, None)
+            if key not in self._pinned:
+                self.forget(spreadsheet_id, worksheet)
+    
+    def forget(self, spreadsheet_id: str, worksheet: Optional[str] = None):
+        """
+        Drop the cached handles of a worksheet (and its spreadsheet, if no other worksheet uses it)
+        
+        Args:
+            spreadsheet_id: The ID of the Google Spreadsheet
+            worksheet: Worksheet title (default: the first sheet)
+        """
+        with self._lock:
+            self._worksheets.pop((spreadsheet_id, worksheet), None)
+            self._managers.pop((spreadsheet_id, worksheet), None)
+            self._pinned.discard((spreadsheet_id, worksheet))
+            if not any(key[0] == spreadsheet_id for key in list(self._worksheets) + list(self._managers)):
+                self._spreadsheets.pop(spreadsheet_id, None)
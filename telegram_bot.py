@@ -3,12 +3,16 @@ Telegram Bot Handler
 Receives messages and audio from Telegram, transcribes audio, and processes with the agent
 """
 
+import asyncio
 import os
 import tempfile
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from openai import OpenAI
 from agent import LeadsAgent
+from transcription import TranscriptionScheduler, format_transcripts, merge_transcripts
+from telegram_outbox import TelegramOutbox
+import tracing
 
 
 class TelegramBot:
@@ -25,9 +29,13 @@ class TelegramBot:
         """
         self.agent = agent
         self.openai_client = OpenAI(api_key=openai_api_key)
+        self.transcriber = TranscriptionScheduler.from_env(self.openai_client)
+        # Every reply goes through the outbox (splitting, status edits, rate limits)
+        self.outbox = TelegramOutbox.from_env()
         
-        # Create the Application
-        self.application = Application.builder().token(telegram_token).build()
+        # Create the Application; updates are handled concurrently so voice notes
+        # sent in a row are transcribed together instead of one after another
+        self.application = Application.builder().token(telegram_token).concurrent_updates(True).build()
         
         # Add handlers
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -55,7 +63,7 @@ Puedes enviarme mensajes de texto o notas de voz. Por ejemplo:
 
 Usa /help para ver más ejemplos.
         """
-        await update.message.reply_text(welcome_message)
+        await self.outbox.send(update.message, welcome_message)
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
@@ -83,112 +91,127 @@ Usa /help para ver más ejemplos.
 
 🎤 Puedes usar notas de voz para cualquier comando!
         """
-        await update.message.reply_text(help_message)
+        await self.outbox.send(update.message, help_message)
     
     async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages"""
         user_message = update.message.text
         user_name = update.effective_user.first_name
         
-        # Show typing indicator
-        await update.message.chat.send_action("typing")
-        
-        # Process with agent
-        response = self.agent.process_query(user_message)
-        
-        # Send response
-        await update.message.reply_text(response)
-    
-    async def handle_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle voice messages"""
-        try:
+        with tracing.start_trace('handle_text', chat_id=update.effective_chat.id):
             # Show typing indicator
             await update.message.chat.send_action("typing")
             
-            # Download voice file
-            voice_file = await update.message.voice.get_file()
-            
-            # Create a temporary file to store the voice message
-            with tempfile.NamedTemporaryFile(suffix='.ogg', delete=False) as temp_audio:
-                temp_path = temp_audio.name
-                await voice_file.download_to_drive(temp_path)
-            
-            # Transcribe audio using OpenAI Whisper
-            await update.message.reply_text("🎤 Transcribiendo audio...")
-            
-            with open(temp_path, 'rb') as audio_file:
-                transcript = self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="es"  # Spanish
-                )
-            
-            # Clean up temp file
-            os.unlink(temp_path)
-            
-            # Get transcribed text
-            transcribed_text = transcript.text
-            
-            # Send transcribed text to user
-            await update.message.reply_text(f"📝 Transcripción: {transcribed_text}")
-            
             # Process with agent
-            await update.message.chat.send_action("typing")
-            response = self.agent.process_query(transcribed_text)
+            response = await asyncio.to_thread(self.agent.process_query, user_message, chat_id=update.effective_chat.id)
             
             # Send response
-            await update.message.reply_text(response)
-            
-        except Exception as e:
-            error_message = f"❌ Error al procesar el audio: {str(e)}"
-            await update.message.reply_text(error_message)
-            print(f"Error processing voice: {e}")
+            with tracing.span('telegram.reply'):
+                await self.outbox.send(update.message, response)
+    
+    async def handle_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle voice messages"""
+        with tracing.start_trace('handle_voice', chat_id=update.effective_chat.id):
+            status = None
+            try:
+                # Show typing indicator
+                await update.message.chat.send_action("typing")
+                status = await self.outbox.send(update.message, "🎤 Transcribiendo audio...")
+                
+                # Download voice file
+                with tracing.span('telegram.download'):
+                    voice_file = await update.message.voice.get_file()
+                    
+                    # Create a temporary file to store the voice message
+                    with tempfile.NamedTemporaryFile(suffix='.ogg', delete=False) as temp_audio:
+                        temp_path = temp_audio.name
+                        await voice_file.download_to_drive(temp_path)
+                
+                await self._transcribe_and_answer(update, temp_path, status)
+                
+            except Exception as e:
+                print(f"Error processing voice: {e}")
+                await self._report_error(update, f"❌ Error al procesar el audio: {str(e)}", status)
     
     async def handle_audio(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle audio files"""
+        with tracing.start_trace('handle_audio', chat_id=update.effective_chat.id):
+            status = None
+            try:
+                # Show typing indicator
+                await update.message.chat.send_action("typing")
+                status = await self.outbox.send(update.message, "🎤 Transcribiendo audio...")
+                
+                # Download audio file
+                with tracing.span('telegram.download'):
+                    audio_file = await update.message.audio.get_file()
+                    
+                    # Create a temporary file
+                    file_extension = os.path.splitext(audio_file.file_path)[1] or '.mp3'
+                    with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_audio:
+                        temp_path = temp_audio.name
+                        await audio_file.download_to_drive(temp_path)
+                
+                await self._transcribe_and_answer(update, temp_path, status)
+                
+            except Exception as e:
+                print(f"Error processing audio: {e}")
+                await self._report_error(update, f"❌ Error al procesar el audio: {str(e)}", status)
+    
+    async def _report_error(self, update: Update, error_message: str, status=None):
+        """
+        Tell the user a voice/audio message failed
+        
+        The error replaces the status message, so it doesn't stay stuck on
+        "Transcribiendo audio..." (a new message is sent if there is none).
+        
+        Args:
+            update: The voice/audio update
+            error_message: Text to show
+            status: Status message sent for the update, if any
+        """
         try:
-            # Show typing indicator
-            await update.message.chat.send_action("typing")
-            
-            # Download audio file
-            audio_file = await update.message.audio.get_file()
-            
-            # Create a temporary file
-            file_extension = os.path.splitext(audio_file.file_path)[1] or '.mp3'
-            with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_audio:
-                temp_path = temp_audio.name
-                await audio_file.download_to_drive(temp_path)
-            
-            # Transcribe audio
-            await update.message.reply_text("🎤 Transcribiendo audio...")
-            
-            with open(temp_path, 'rb') as audio:
-                transcript = self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio,
-                    language="es"
-                )
-            
+            await self.outbox.send(update.message, error_message, edit=status)
+        except Exception as e:
+            print(f"Error sending the error message: {e}")
+    
+    async def _transcribe_and_answer(self, update: Update, temp_path: str, status):
+        """
+        Transcribe a downloaded audio file and answer it with the agent
+        
+        Notes sent in a row in the same chat are answered together by the
+        handler of the first one; the others return after transcribing.
+        The status message is edited with the transcription and then with
+        the answer, instead of sending three messages.
+        
+        Args:
+            update: The voice/audio update
+            temp_path: Downloaded audio file (deleted here)
+            status: The "transcribing" status message to edit
+        """
+        try:
+            transcripts = await self.transcriber.submit(update.effective_chat.id, temp_path)
+        finally:
             # Clean up temp file
             os.unlink(temp_path)
-            
-            # Get transcribed text
-            transcribed_text = transcript.text
-            
-            # Send transcribed text
-            await update.message.reply_text(f"📝 Transcripción: {transcribed_text}")
-            
-            # Process with agent
-            await update.message.chat.send_action("typing")
-            response = self.agent.process_query(transcribed_text)
-            
-            # Send response
-            await update.message.reply_text(response)
-            
-        except Exception as e:
-            error_message = f"❌ Error al procesar el audio: {str(e)}"
-            await update.message.reply_text(error_message)
-            print(f"Error processing audio: {e}")
+        
+        if transcripts is None:
+            # Answered together with the previous voice note of this chat
+            await self.outbox.send(update.message, "🔗 Se responde junto con el audio anterior", edit=status)
+            return
+        
+        # Show the transcription while the agent works
+        transcript = format_transcripts(transcripts)
+        if self.outbox.fits(transcript):
+            status = await self.outbox.send(update.message, transcript, edit=status)
+        
+        # Process with agent (one turn for all the notes of the batch)
+        await update.message.chat.send_action("typing")
+        response = await asyncio.to_thread(self.agent.process_query, merge_transcripts(transcripts), chat_id=update.effective_chat.id)
+        
+        # Send response
+        with tracing.span('telegram.reply'):
+            await self.outbox.send(update.message, f"{transcript}\n\n{response}", edit=status)
     
     def run(self):
         """Start the bot"""
@@ -0,0 +1,201 @@
+"""
+Outbound Telegram messages
+Splits long replies at safe boundaries to fit Telegram's 4096 character
+limit, turns status messages ("🎤 Transcribiendo audio...") into edits of the
+same message, and spaces out sends per chat and globally so busy chats don't
+get 429 Too Many Requests
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List
+
+from telegram.error import BadRequest, RetryAfter
+
+
+# Telegram's limit per message (counted in UTF-16 code units)
+MAX_MESSAGE_LENGTH = 4096
+
+GROUP_CHAT_TYPES = ('group', 'supergroup')
+
+
+def _utf16_length(text: str) -> int:
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _prefix_within(text: str, limit: int) -> int:
+    """Number of leading characters of text that fit in `limit` UTF-16 code units"""
+    units = 0
+    for i, char in enumerate(text):
+        units += 2 if ord(char) > 0xFFFF else 1
+        if units > limit:
+            return i
+    return len(text)
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Split a message into pieces Telegram accepts
+
+    Cuts at the last paragraph break, line break or space that keeps the
+    piece within the limit (only in the second half of the piece, so pieces
+    don't get tiny), and mid-text only when there is none.
+
+    Args:
+        text: Message text
+        limit: Longest piece, in UTF-16 code units
+
+    Returns:
+        List of pieces (one if the text already fits)
+    """
+    pieces = []
+    while _utf16_length(text) > limit:
+        end = _prefix_within(text, limit)
+        cut = end
+        for separator in ('\n\n', '\n', ' '):
+            position = text.rfind(separator, 0, end)
+            if position > end // 2:
+                cut = position
+                break
+        pieces.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text or not pieces:
+        pieces.append(text)
+    return pieces
+
+
+class TelegramOutbox:
+    """
+    Sends replies through Telegram with chunking, status edits and rate limits
+
+    Every send or edit first reserves a slot: after a burst of `chat_burst`
+    messages, one message per `chat_interval` seconds in a private chat or
+    per `group_interval` in a group, and `global_rate` per second for the
+    whole bot (with bursts of up to that many). Reservations are taken in call order, so concurrent
+    replies queue up instead of being rejected; a 429 pushes the chat back
+    by the retry_after Telegram asks for and the call is retried.
+    """
+
+    def __init__(self, chat_interval: float = 1.0, group_interval: float = 3.0, chat_burst: int = 3,
+                 global_rate: float = 30.0, max_length: int = MAX_MESSAGE_LENGTH, max_retries: int = 3):
+        """
+        Args:
+            chat_interval: Seconds between messages to the same private chat
+            group_interval: Seconds between messages to the same group (Telegram allows 20 per minute)
+            chat_burst: Messages a chat can get back to back before the interval applies
+            global_rate: Messages per second across all chats
+            max_length: Longest message before it's split
+            max_retries: Retries of a call rejected with 429
+        """
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.chat_burst = max(1, chat_burst)
+        self.global_rate = global_rate
+        self.max_length = max_length
+        self.max_retries = max_retries
+        self._chat_next: Dict[int, float] = {}
+        self._global_next = 0.0
+        # Replies can come from several threads (Lambda load tests, executors)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'TelegramOutbox':
+        """
+        Build the outbox from environment variables
+
+        TELEGRAM_CHAT_INTERVAL: seconds between messages to one chat (default 1)
+        TELEGRAM_GROUP_INTERVAL: seconds between messages to one group (default 3)
+        TELEGRAM_CHAT_BURST: messages a chat can get back to back (default 3)
+        TELEGRAM_GLOBAL_RATE: messages per second for the whole bot (default 30)
+        """
+        return cls(
+            chat_interval=float(os.getenv('TELEGRAM_CHAT_INTERVAL', '1')),
+            group_interval=float(os.getenv('TELEGRAM_GROUP_INTERVAL', '3')),
+            chat_burst=int(os.getenv('TELEGRAM_CHAT_BURST', '3')),
+            global_rate=float(os.getenv('TELEGRAM_GLOBAL_RATE', '30')),
+        )
+
+    def fits(self, text: str) -> bool:
+        """Whether text goes out as a single message"""
+        return _utf16_length(text) <= self.max_length
+
+    def _reserve(self, chat_id: int, group: bool) -> float:
+        """
+        Take the next send slot of a chat
+
+        Returns:
+            Seconds to wait before sending
+        """
+        with self._lock:
+            now = time.monotonic()
+            interval = self.group_interval if group else self.chat_interval
+            # Same scheme per chat: chat_burst messages, then one every interval
+            chat_next = self._chat_next.get(chat_id, 0.0)
+            at = max(now, chat_next - (self.chat_burst - 1) * interval)
+            if self.global_rate > 0:
+                # Bursts of up to global_rate messages, then one every 1/global_rate seconds
+                spacing = 1.0 / self.global_rate
+                at = max(at, self._global_next - 1.0 + spacing)
+                self._global_next = max(self._global_next, at) + spacing
+            self._chat_next[chat_id] = max(chat_next, at) + interval
+
+            if len(self._chat_next) > 1000:
+                self._chat_next = {chat: t for chat, t in self._chat_next.items() if t > now}
+            return at - now
+
+    def _hold(self, chat_id: int, seconds: float):
+        """Don't send anything else to a chat for `seconds` (after a 429)"""
+        with self._lock:
+            self._chat_next[chat_id] = max(self._chat_next.get(chat_id, 0.0), time.monotonic() + seconds)
+
+    async def _call(self, chat, method, *args, **kwargs):
+        """Run a Bot API call on a chat once its slot comes up, retrying on 429"""
+        group = chat.type in GROUP_CHAT_TYPES
+        for attempt in range(self.max_retries + 1):
+            wait = self._reserve(chat.id, group)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await method(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                retry_after = e.retry_after
+                if hasattr(retry_after, 'total_seconds'):
+                    retry_after = retry_after.total_seconds()
+                print(f"Telegram rate limit in chat {chat.id}, retrying in {retry_after}s")
+                self._hold(chat.id, float(retry_after))
+
+    async def send(self, message, text: str, edit=None):
+        """
+        Reply to a message, splitting the text if it's too long
+
+        Args:
+            message: Telegram message being answered
+            text: Reply text
+            edit: A message sent earlier by the bot (e.g. a status message) to
+                replace with the first piece instead of sending a new one
+
+        Returns:
+            The last message sent or edited (pass it as `edit` to update it again)
+        """
+        chat = message.chat
+        sent = edit
+        for i, piece in enumerate(split_message(text, self.max_length)):
+            if i == 0 and edit is not None:
+                if piece == edit.text:
+                    continue
+                try:
+                    result = await self._call(chat, edit.edit_text, piece)
+                except BadRequest as e:
+                    if 'not modified' not in str(e).lower():
+                        raise
+                    continue
+                # edit_text returns True for inline messages; keep the message object
+                if not isinstance(result, bool):
+                    sent = result
+            else:
+                sent = await self._call(chat, message.reply_text, piece)
+        return sent
@@ -0,0 +1,147 @@
+"""
+Per-chat sheets for a shared LeadsAgent
+Maps Telegram chat_ids to their own spreadsheet while the agent (LLM client,
+prompt, tools, executor) is built once; the tools read the sheet of the chat
+being served from a context variable
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from sheets_manager import SheetsManager, SheetsPool
+
+
+# SheetsManager of the chat being served; None means the agent's default sheet
+current_sheets_manager: ContextVar[Optional[SheetsManager]] = ContextVar('current_sheets_manager', default=None)
+
+
+class TenantRegistry:
+    """
+    Resolves a chat_id to its SheetsManager
+
+    Managers are leased from the pool and kept in a bounded LRU so their
+    caches (header schema, etc.) survive between messages; tenants idle for
+    longer than idle_seconds are evicted and their lease released, which
+    drops the worksheet handles once nobody else uses them.
+    """
+
+    def __init__(self, pool: SheetsPool, default_manager: Optional[SheetsManager] = None,
+                 sheets: Optional[Dict[int, str]] = None, max_tenants: int = 32, idle_seconds: float = 3600):
+        """
+        Args:
+            pool: Pool used to open the tenants' worksheets
+            default_manager: Manager for chats without their own sheet
+            sheets: Map chat_id -> 'spreadsheet_id' or 'spreadsheet_id/worksheet title'
+            max_tenants: Most managers kept at once
+            idle_seconds: Evict tenants not seen for this long
+        """
+        self.pool = pool
+        self.default_manager = default_manager
+        self.sheets = {int(chat_id): target for chat_id, target in (sheets or {}).items()}
+        self.max_tenants = max_tenants
+        self.idle_seconds = idle_seconds
+        self._managers: 'OrderedDict[int, Tuple[SheetsManager, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls, pool: SheetsPool, default_manager: Optional[SheetsManager] = None) -> 'TenantRegistry':
+        """
+        Build the registry from environment variables
+
+        TENANT_SHEETS: JSON object chat_id -> 'spreadsheet_id' or 'spreadsheet_id/worksheet'
+        TENANT_CACHE_SIZE: most tenants kept in memory (default 32)
+        TENANT_IDLE_SECONDS: idle time before a tenant is evicted (default 3600)
+        """
+        raw = os.getenv('TENANT_SHEETS', '').strip()
+        sheets = json.loads(raw) if raw else {}
+        return cls(
+            pool,
+            default_manager=default_manager,
+            sheets=sheets,
+            max_tenants=int(os.getenv('TENANT_CACHE_SIZE', '32')),
+            idle_seconds=float(os.getenv('TENANT_IDLE_SECONDS', '3600')),
+        )
+
+    @staticmethod
+    def _parse_target(target: str) -> Tuple[str, Optional[str]]:
+        spreadsheet_id, _, worksheet = target.partition('/')
+        return spreadsheet_id.strip(), (worksheet.strip() or None)
+
+    def _evict(self, chat_id: int):
+        self._managers.pop(chat_id, None)
+        self.evictions += 1
+        # The pool keeps the handles while another tenant or the default sheet uses them
+        self.pool.release(*self._parse_target(self.sheets[chat_id]))
+
+    def _evict_idle(self, now: float):
+        while self._managers:
+            chat_id, (_, last_used) = next(iter(self._managers.items()))
+            if now - last_used < self.idle_seconds and len(self._managers) <= self.max_tenants:
+                break
+            self._evict(chat_id)
+
+    def manager_for(self, chat_id: Optional[int]) -> Optional[SheetsManager]:
+        """
+        Get the SheetsManager of a chat
+
+        A tenant seen for the first time is opened through the pool without
+        holding the registry lock, so a slow sheet only delays its own chat.
+
+        Args:
+            chat_id: Telegram chat id (None for the default sheet)
+
+        Returns:
+            The chat's manager, or the default manager if the chat has no sheet of its own
+        """
+        if chat_id is None or chat_id not in self.sheets:
+            return self.default_manager
+
+        with self._lock:
+            entry = self._managers.pop(chat_id, None)
+            if entry is not None:
+                return self._touch(chat_id, entry[0])
+
+        spreadsheet_id, worksheet = self._parse_target(self.sheets[chat_id])
+        manager = self.pool.lease(spreadsheet_id, worksheet)
+        with self._lock:
+            entry = self._managers.pop(chat_id, None)
+            if entry is not None:
+                # Another request of the chat got here first: keep its lease only
+                self.pool.release(spreadsheet_id, worksheet)
+                manager = entry[0]
+            return self._touch(chat_id, manager)
+
+    def _touch(self, chat_id: int, manager: SheetsManager) -> SheetsManager:
+        """Mark a tenant as just used and evict the idle ones (call with the lock held)"""
+        now = time.monotonic()
+        self._managers[chat_id] = (manager, now)
+        self._evict_idle(now)
+        return manager
+
+    @contextmanager
+    def activate(self, chat_id: Optional[int]) -> Iterator[Optional[SheetsManager]]:
+        """
+        Serve one request with the chat's sheet
+
+        Args:
+            chat_id: Telegram chat id
+
+        Yields:
+            The SheetsManager that the agent's tools will use
+        """
+        manager = self.manager_for(chat_id)
+        token = current_sheets_manager.set(manager)
+        try:
+            yield manager
+        finally:
+            current_sheets_manager.reset(token)
+
+    def __len__(self) -> int:
+        return len(self._managers)
@@ -0,0 +1,60 @@
+"""
+Shared fixtures: sheets served by the in-memory fake from benchmarks/fake_sheets.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_sheets import FakeSpreadsheet, make_contact_rows
+from sheets_manager import SheetsManager
+
+
+@pytest.fixture
+def contacts():
+    """Fake contacts spreadsheet with 20 generated rows"""
+    return FakeSpreadsheet('contacts', {'Contactos': make_contact_rows(20)})
+
+
+@pytest.fixture
+def manager(contacts):
+    """SheetsManager on the fake contacts sheet, with Drive change detection"""
+    return SheetsManager.from_worksheet(contacts.sheet1, change_detection=True)
+
+
+def insert_column(spreadsheet: FakeSpreadsheet, position: int, header: str):
+    """Insert a column by hand, like a user editing the sheet (1-based position)"""
+    for index, row in enumerate(spreadsheet.sheet1._rows):
+        row.insert(position - 1, header if index == 0 else '')
+    spreadsheet.touch()
+
+
+@pytest.fixture
+def recordings():
+    """Recorded model responses of the benchmark turns (benchmarks/recordings/agent_turns.json)"""
+    from benchmarks.run import RECORDINGS
+    with open(RECORDINGS, encoding='utf-8') as f:
+        return json.load(f)['turns']
+
+
+@pytest.fixture
+def agent(manager, recordings):
+    """LeadsAgent on the fake sheets, with one recorded model per tier"""
+    from agent import LeadsAgent
+    from benchmarks.fake_sheets import make_migraine_rows
+    from benchmarks.recorded_llm import RecordedChatModel
+    from contact_prefetch import ContactPrefetcher
+    from model_tiers import ModelPolicy
+    from turn_budget import TurnPolicy
+
+    migraines = FakeSpreadsheet('migraines', {'Migrañas': make_migraine_rows(20)})
+    return LeadsAgent(
+        manager, openai_api_key='test',
+        llm=RecordedChatModel(recordings=recordings), small_llm=RecordedChatModel(recordings=recordings),
+        migraine_manager=SheetsManager.from_worksheet(migraines.sheet1, columns=SheetsManager.MIGRAINE_COLUMNS),
+        model_policy=ModelPolicy(), turn_policy=TurnPolicy(), prefetcher=ContactPrefetcher(enabled=False),
+    )
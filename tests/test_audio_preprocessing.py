@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+import audio_preprocessing
+from audio_preprocessing import AudioPreprocessor
+
+
+class FakeTools:
+    """ffprobe/mediainfo/ffmpeg stand-ins that record their command lines"""
+
+    def __init__(self, durations, installed=('ffmpeg', 'ffprobe')):
+        self.durations = durations
+        self.installed = set(installed)
+        self.commands = []
+
+    def which(self, name):
+        return f"/usr/bin/{name}" if name in self.installed else None
+
+    def run(self, args):
+        self.commands.append(args)
+        if args[0] == 'ffmpeg':
+            with open(args[-1], 'wb') as f:
+                f.write(b'audio')
+            return ''
+        duration = self.durations.get(args[-1], self.durations.get('*', ''))
+        return str(duration * 1000 if args[0] == 'mediainfo' else duration)
+
+    def ffmpeg_runs(self):
+        return [args for args in self.commands if args[0] == 'ffmpeg']
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / 'nota.m4a'
+    path.write_bytes(b'\0' * 2000)
+    return str(path)
+
+
+@pytest.fixture
+def preprocessor():
+    return AudioPreprocessor(min_bytes=1000, chunk_seconds=600)
+
+
+def install(monkeypatch, preprocessor, tools):
+    monkeypatch.setattr(audio_preprocessing.shutil, 'which', tools.which)
+    monkeypatch.setattr(preprocessor, '_run', tools.run)
+
+
+def option(args, name):
+    return args[args.index(name) + 1]
+
+
+def test_long_audio_is_transcoded_in_chunks(monkeypatch, preprocessor, audio):
+    tools = FakeTools({audio: 1500.0, '*': 300.0})
+    install(monkeypatch, preprocessor, tools)
+
+    paths = preprocessor.prepare(audio)
+
+    runs = tools.ffmpeg_runs()
+    assert [option(args, '-ss') for args in runs] == ['0', '600', '1200']
+    assert all(option(args, '-t') == '600' and option(args, '-ac') == '1' for args in runs)
+    # Leading silence is trimmed in the first chunk, trailing silence in the last one
+    assert 'areverse' not in option(runs[0], '-af') and 'areverse' in option(runs[-1], '-af')
+    assert '-af' not in runs[1]
+    assert len(paths) == 3 and audio not in paths
+    preprocessor.cleanup(paths, audio)
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_silent_last_chunk_is_dropped(monkeypatch, preprocessor, audio):
+    tools = FakeTools({audio: 1200.5, '*': 0.0})
+    install(monkeypatch, preprocessor, tools)
+
+    paths = preprocessor.prepare(audio)
+
+    assert len(tools.ffmpeg_runs()) == 3
+    assert len(paths) == 2
+    preprocessor.cleanup(paths, audio)
+
+
+def test_mediainfo_is_used_without_ffprobe(monkeypatch, preprocessor, audio):
+    tools = FakeTools({audio: 90.0}, installed=('ffmpeg', 'mediainfo'))
+    install(monkeypatch, preprocessor, tools)
+
+    assert preprocessor.probe_duration(audio) == 90.0
+    paths = preprocessor.prepare(audio)
+
+    assert len(paths) == 1
+    preprocessor.cleanup(paths, audio)
+
+
+@pytest.mark.parametrize('installed', [('ffprobe',), ('ffmpeg',)])
+def test_missing_tools_upload_the_original(monkeypatch, preprocessor, audio, installed):
+    tools = FakeTools({audio: 90.0}, installed=installed)
+    install(monkeypatch, preprocessor, tools)
+
+    assert preprocessor.prepare(audio) == [audio]
+    assert tools.ffmpeg_runs() == []
+
+
+def test_small_files_are_not_probed(monkeypatch, audio):
+    preprocessor = AudioPreprocessor(min_bytes=1_000_000)
+    tools = FakeTools({audio: 90.0})
+    install(monkeypatch, preprocessor, tools)
+
+    assert preprocessor.prepare(audio) == [audio]
+    assert tools.commands == []
@@ -0,0 +1,98 @@
+import pytest
+
+from benchmarks.fake_sheets import CONTACT_HEADERS, FakeSpreadsheet
+from contact_dedup import DuplicateFinder, blocking_keys, merge_contacts
+from sheets_manager import SheetsManager
+
+
+def contact(name, phone='', email='', bio=''):
+    return [name, phone, email, '', '', '', bio, '']
+
+
+@pytest.fixture
+def spreadsheet():
+    return FakeSpreadsheet('contacts', {'Contactos': [
+        list(CONTACT_HEADERS),
+        contact('Pablo Salomón', '+54 9 11 5555-0001', 'pablo@example.com', 'Fundador'),
+        contact('Li', '+54 9 11 5555-0002'),
+        contact('María García', '+54 9 11 5555-0003'),
+        contact('Pablo Salomon', '11 5555-0001', bio='Inversor'),
+    ]})
+
+
+@pytest.fixture
+def sheet_manager(spreadsheet):
+    return SheetsManager.from_worksheet(spreadsheet.sheet1, change_detection=True)
+
+
+def names(spreadsheet):
+    return [row[0] for row in spreadsheet.sheet1._rows[1:]]
+
+
+def test_blocking_keys_include_the_full_name():
+    keys = blocking_keys({'Nombre': 'Li'})
+
+    assert keys == {'f:li'}
+
+
+def test_short_names_still_match(sheet_manager):
+    finder = DuplicateFinder.from_sheet(sheet_manager)
+
+    assert [m['fila'] for m in finder.matches_for({'Nombre': 'Li'})] == [3]
+
+
+def test_candidates_pair_accent_and_phone_variants(sheet_manager):
+    candidates = DuplicateFinder.from_sheet(sheet_manager).candidates()
+
+    assert [(c['fila'], c['fila_duplicado']) for c in candidates] == [(2, 5)]
+    assert 'teléfono' in candidates[0]['motivos']
+
+
+def test_find_row_excludes_the_other_side(sheet_manager):
+    finder = DuplicateFinder.from_sheet(sheet_manager)
+
+    keep = finder.find_row('Pablo Salomón')
+    assert keep == 0
+    assert finder.find_row('Pablo Salomon', exclude=keep) == 3
+    # Both normalize to the same name: ambiguous without the exclusion
+    assert finder.find_row('pablo salomon') is None
+
+
+def test_merge_writes_the_kept_row_and_deletes_the_duplicate(sheet_manager, spreadsheet):
+    result = merge_contacts(sheet_manager, 'Pablo Salomón', 'Pablo Salomon')
+
+    assert result['ok']
+    assert names(spreadsheet) == ['Pablo Salomón', 'Li', 'María García']
+    assert spreadsheet.sheet1._rows[1][6] == 'Fundador\nInversor'
+
+
+def test_merge_aborts_when_the_cached_rows_are_stale(sheet_manager, spreadsheet):
+    sheet_manager.get_all_values()
+    # Edited by hand without Drive reporting it yet (e.g. within SHEETS_CHANGE_CHECK_SECONDS)
+    del spreadsheet.sheet1._rows[2]
+
+    result = merge_contacts(sheet_manager, 'Pablo Salomón', 'Pablo Salomon')
+
+    assert not result['ok']
+    assert names(spreadsheet) == ['Pablo Salomón', 'María García', 'Pablo Salomon']
+
+    # The cache was dropped, so trying again works on the current rows
+    assert merge_contacts(sheet_manager, 'Pablo Salomón', 'Pablo Salomon')['ok']
+    assert names(spreadsheet) == ['Pablo Salomón', 'María García']
+
+
+def test_shared_email_alone_does_not_block_a_new_contact(sheet_manager):
+    finder = DuplicateFinder.from_sheet(sheet_manager)
+
+    same_name, shared = finder.check_new({'Nombre': 'Ana Torres', 'Email': 'Pablo@example.com'})
+
+    assert same_name == []
+    assert [(m['nombre'], m['motivos']) for m in shared] == [('Pablo Salomón', ['email'])]
+
+
+def test_similar_name_blocks_a_new_contact(sheet_manager):
+    finder = DuplicateFinder.from_sheet(sheet_manager)
+
+    same_name, _ = finder.check_new({'Nombre': 'Maria Garcia', 'Teléfono': '11 5555-0003'})
+
+    assert [m['fila'] for m in same_name] == [4]
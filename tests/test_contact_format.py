@@ -0,0 +1,60 @@
+import json
+
+from benchmarks.fake_sheets import CONTACT_HEADERS
+from contact_format import CONTACT_FIELDS, render_contacts
+from record_table import RecordTable
+
+
+ROWS = [
+    list(CONTACT_HEADERS),
+    ['Pablo Salomón', '+54 9 11 5555-0001', 'pablo@example.com', '', 'Tech Corp', 'CEO', '', 'Reunión'],
+    ['Li'],
+]
+
+
+def test_contacts_render_as_compact_json():
+    output = render_contacts(RecordTable.from_values(ROWS))
+    data = json.loads(output)
+
+    assert ' ' not in output.split('"contactos"')[0]
+    assert data['campos'] == [field for field, _, _ in CONTACT_FIELDS]
+    assert data['contactos'][0] == ['Pablo Salomón', '+54 9 11 5555-0001', 'pablo@example.com', 'No registrado',
+                                    'Tech Corp', 'CEO', 'Sin información', 'Reunión']
+    assert data['contactos'][1] == ['Li', 'No registrado', 'No registrado', 'No registrado', 'No registrada',
+                                    'No registrado', 'Sin información', 'Sin entradas']
+
+
+def test_plain_dicts_and_alternative_headers():
+    data = json.loads(render_contacts([{'Nombre': 'Ana', 'Telefono': '123', 'bitacora': 'Nota'}]))
+
+    assert data['contactos'] == [['Ana', '123', 'No registrado', 'No registrado', 'No registrada',
+                                  'No registrado', 'Sin información', 'Nota']]
+
+
+def test_no_contacts():
+    assert json.loads(render_contacts([]))['contactos'] == []
+
+
+def test_rows_are_rendered_once_per_table():
+    table = RecordTable.from_values(ROWS)
+    render_contacts(table)
+    rendered = table.derived['contact_format.rows']
+
+    assert len(rendered) == 2
+    cached = rendered[id(table[0].raw)]
+    render_contacts(table[:1])
+    assert rendered[id(table[0].raw)] is cached
+
+    # A new snapshot of the sheet (e.g. after a write) is rendered again
+    changed = [list(row) for row in ROWS]
+    changed[1][5] = 'CTO'
+    assert json.loads(render_contacts(RecordTable.from_values(changed)))['contactos'][0][5] == 'CTO'
+
+
+def test_search_tool_returns_the_compact_format(agent):
+    tool = next(tool for tool in agent.tools if tool.name == 'search_by_name')
+    data = json.loads(tool.func('pablo salomon'))
+
+    assert data['campos'][0] == 'Nombre'
+    assert data['contactos']
+    assert all(len(values) == len(data['campos']) for values in data['contactos'])
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from benchmarks.fake_sheets import FakeSpreadsheet, make_contact_rows
+from contact_prefetch import ContactPrefetcher, NameIndex, search_by_name
+from sheets_manager import SheetsManager
+
+
+@pytest.fixture
+def prefetcher():
+    return ContactPrefetcher(max_rows=5)
+
+
+def test_candidates_score_the_words_of_the_message():
+    index = NameIndex(['Pablo Salomón', 'Pablo Pérez', 'María García', 'Ana Pérez'])
+
+    assert index.candidates('busca a pablo salomon', max_rows=5) == [2]
+    assert index.candidates('¿y Pablo?', max_rows=5) == [2, 3]
+    assert index.candidates('¿y Pablo?', max_rows=1) == []
+    assert index.candidates('hola', max_rows=5) == []
+
+
+def test_search_in_the_turn_is_served_from_the_prefetch(prefetcher, manager, contacts):
+    name = manager.get_names()[3]
+    expected = manager.search_by_name(name)
+
+    with prefetcher.speculate(manager, f"Busca a {name}") as prefetch:
+        prefetch.future.result()
+        contacts.sheet1.reset_calls()
+        contacts.reset_calls()
+        records = search_by_name(manager, name)
+        assert contacts.sheet1.api_calls == 0
+
+    assert [record['Nombre'] for record in records] == [record['Nombre'] for record in expected]
+
+
+def test_write_in_the_turn_bypasses_the_prefetch(prefetcher, manager, contacts):
+    name = manager.get_names()[3]
+
+    with prefetcher.speculate(manager, f"Busca a {name}") as prefetch:
+        prefetch.future.result()
+        manager.update_field(name, 'Rol', 'CTO')
+        records = search_by_name(manager, name)
+
+    assert records[0]['Rol'] == 'CTO'
+
+
+def test_turn_without_contacts_skips_the_prefetch(prefetcher, manager):
+    with prefetcher.speculate(manager, 'Registra una migraña', enabled=False) as prefetch:
+        assert prefetch is None
+
+    assert prefetcher.stats['skipped'] == 1
+
+
+def test_prefetch_not_started_is_cancelled_when_the_turn_ends(manager):
+    prefetcher = ContactPrefetcher(workers=1)
+    release = threading.Event()
+    busy = prefetcher._executor.submit(release.wait)
+
+    with prefetcher.speculate(manager, 'Busca a Pablo') as prefetch:
+        pass
+    release.set()
+    busy.result()
+
+    assert prefetch.future.cancelled()
+    assert prefetcher.stats['cancelled'] == 1
+
+
+def test_turn_end_waits_for_a_running_prefetch():
+    slow = FakeSpreadsheet('slow', {'Contactos': make_contact_rows(20)}, latency_ms=50)
+    manager = SheetsManager.from_worksheet(slow.sheet1, change_detection=False)
+    name = make_contact_rows(20)[4][0]
+
+    with ContactPrefetcher().speculate(manager, f"Busca a {name}") as prefetch:
+        pass
+
+    assert prefetch.future.done()
+
+
+def test_prefetch_past_the_drain_time_is_abandoned():
+    slow = FakeSpreadsheet('slow', {'Contactos': make_contact_rows(20)}, latency_ms=100)
+    manager = SheetsManager.from_worksheet(slow.sheet1, change_detection=False)
+    prefetcher = ContactPrefetcher(drain_seconds=0.01)
+
+    with prefetcher.speculate(manager, 'Busca a Pablo') as prefetch:
+        pass
+
+    assert prefetcher.stats['abandoned'] == 1
+    prefetch.future.result()
+
+
+def test_disabled_by_default_on_lambda(monkeypatch):
+    monkeypatch.delenv('CONTACT_PREFETCH', raising=False)
+    monkeypatch.delenv('AWS_LAMBDA_FUNCTION_NAME', raising=False)
+    assert ContactPrefetcher.from_env().enabled
+
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'leads-worker')
+    assert not ContactPrefetcher.from_env().enabled
+
+    monkeypatch.setenv('CONTACT_PREFETCH', 'true')
+    assert ContactPrefetcher.from_env().enabled
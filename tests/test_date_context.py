@@ -0,0 +1,54 @@
+from datetime import date
+
+import pytest
+
+from date_context import resolve_date_field, resolve_relative_dates
+
+
+# Wednesday
+REFERENCE = date(2026, 10, 14)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("reunión hoy sobre inversión", "reunión el 14/10/2026 sobre inversión"),
+    ("llamada de ayer", "llamada del 13/10/2026"),
+    ("lo vi anteayer", "lo vi el 12/10/2026"),
+    ("lo vi antes de ayer", "lo vi el 12/10/2026"),
+    ("entrega para hoy", "entrega para el 14/10/2026"),
+    ("Ayer hablamos de la ronda", "El 13/10/2026 hablamos de la ronda"),
+    ("hoy", "14/10/2026"),
+])
+def test_resolves_unambiguous_days(text, expected):
+    assert resolve_relative_dates(text, REFERENCE) == expected
+
+
+@pytest.mark.parametrize('text', [
+    "Reunión agendada para el lunes",
+    "Llamar el lunes",
+    "Nos vemos el viernes",
+    "El martes pasado hablamos",
+    "Llamar mañana por la mañana",
+    "Presentado por Domingo Pérez",
+])
+def test_leaves_weekdays_and_manana_alone(text):
+    assert resolve_relative_dates(text, REFERENCE) == text
+
+
+def test_only_whole_fields_lose_the_article():
+    assert resolve_relative_dates("hoy|Alta|estrés", REFERENCE) == "14/10/2026|Alta|estrés"
+
+
+@pytest.mark.parametrize('value, expected', [
+    ("hoy", "14/10/2026"),
+    ("ayer", "13/10/2026"),
+    ("mañana", "15/10/2026"),
+    ("el lunes", "12/10/2026"),
+    ("el martes pasado", "13/10/2026"),
+    ("el miércoles", "14/10/2026"),
+    ("el próximo lunes", "19/10/2026"),
+    ("el lunes que viene", "19/10/2026"),
+    ("03/01/2026", "03/01/2026"),
+    (" Alta ", "Alta"),
+])
+def test_resolve_date_field(value, expected):
+    assert resolve_date_field(value, REFERENCE) == expected
@@ -0,0 +1,75 @@
+from sheets_manager import DriveChangeDetector, SheetsManager
+
+
+def downloads(spreadsheet):
+    return spreadsheet.sheet1.calls['get_all_values']
+
+
+def test_unchanged_file_is_read_once(manager, contacts):
+    first = manager.get_all_values()
+
+    assert manager.get_all_values() is first
+    assert downloads(contacts) == 1
+    assert contacts.calls['drive.files.get'] == 2
+
+
+def test_edit_in_the_browser_is_picked_up(manager, contacts):
+    manager.get_all_values()
+    contacts.sheet1._rows[1][0] = 'Editado a mano'
+    contacts.touch()
+
+    assert manager.get_all_values()[1][0] == 'Editado a mano'
+    assert downloads(contacts) == 2
+
+
+def test_own_writes_are_seen_by_the_next_read(manager, contacts):
+    manager.get_all_values()
+    manager.add_record({'Nombre': 'Nuevo'})
+
+    assert manager.get_all_values()[-1][0] == 'Nuevo'
+    assert downloads(contacts) == 2
+
+
+def test_column_reads_are_cached_apart(manager, contacts):
+    manager.get_all_values()
+    manager.get_names()
+    manager.get_names()
+    contacts.touch()
+    manager.get_names()
+
+    assert downloads(contacts) == 1
+    assert contacts.sheet1.calls['batch_get'] == 2
+
+
+def test_without_change_detection_every_read_downloads(contacts):
+    manager = SheetsManager.from_worksheet(contacts.sheet1, change_detection=False)
+    manager.get_all_values()
+    manager.get_all_values()
+
+    assert downloads(contacts) == 2
+    assert contacts.calls['drive.files.get'] == 0
+
+
+def test_drive_errors_fall_back_to_full_reads(manager, contacts, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise ConnectionError('Drive caído')
+
+    monkeypatch.setattr(contacts.client, 'request', unavailable)
+    manager.get_all_values()
+    manager.get_all_values()
+
+    assert downloads(contacts) == 2
+    assert manager.change_detector.fingerprint() is None
+
+
+def test_min_interval_reuses_the_fingerprint_until_invalidated(contacts):
+    detector = DriveChangeDetector(contacts, min_interval=60)
+
+    first = detector.fingerprint()
+    contacts.touch()
+    assert detector.fingerprint() == first
+    assert contacts.calls['drive.files.get'] == 1
+
+    detector.invalidate()
+    assert detector.fingerprint() != first
+    assert detector.last_fingerprint == detector.fingerprint()
@@ -0,0 +1,92 @@
+from datetime import date
+
+import pytest
+
+from migraine_analytics import MigraineLog, resolve_period
+
+
+TODAY = date(2026, 10, 14)
+
+
+@pytest.fixture
+def log():
+    return MigraineLog.from_values([
+        ['Fecha', 'Intensidad', 'Posible causa'],
+        ['01/10/2026', 'Alta', 'Estrés laboral'],
+        ['03/10/2026', 'Media', 'Falta de sueño, estrés laboral'],
+        ['03/10/2026', 'Baja', ''],
+        ['10/10/2026', 'Alta', 'Alcohol'],
+        ['no es una fecha', 'Alta', 'Alcohol'],
+        ['', '', ''],
+    ])
+
+
+def test_summarize_counts_the_range(log):
+    summary = log.summarize(date(2026, 10, 1), date(2026, 10, 10))
+
+    assert summary['episodios'] == 4
+    assert summary['por_intensidad'] == {'Baja': 1, 'Media': 1, 'Alta': 2}
+    assert summary['dias_con_migrana'] == 3
+    assert summary['intervalo_maximo_dias'] == 7
+    assert summary['ultimo_episodio'] == '10/10/2026'
+    assert summary['max_en_7_dias'] == {'episodios': 3, 'desde': '01/10/2026', 'hasta': '07/10/2026'}
+    assert summary['causas_principales'][0]['episodios'] == 2
+
+
+def test_summarize_filters_by_intensity(log):
+    summary = log.summarize(min_intensity=3)
+
+    assert summary['episodios'] == 2
+    assert summary['por_intensidad'] == {'Alta': 2}
+
+
+def test_summarize_empty_range(log):
+    summary = log.summarize(date(2026, 9, 1), date(2026, 9, 30))
+
+    assert summary['episodios'] == 0
+    assert 'causas_principales' not in summary
+
+
+def test_rolling_windows_count_back_from_the_end_date(log):
+    # Last episode on 10/10: the windows still end today, as migraine_stats asks for
+    summary = log.summarize(date(2026, 9, 15), TODAY)
+
+    assert summary['hasta'] == '14/10/2026'
+    assert summary['ultimos_7_dias'] == 1
+    assert summary['ultimos_30_dias'] == 4
+
+
+def test_summarize_rejects_a_reversed_range(log):
+    with pytest.raises(ValueError):
+        log.summarize(date(2026, 10, 10), date(2026, 10, 1))
+
+
+def test_summarize_empty_log():
+    assert MigraineLog.from_values([]).summarize() == {'episodios': 0}
+
+
+@pytest.mark.parametrize('period, expected', [
+    ('todo', (None, None)),
+    ('hoy', (TODAY, TODAY)),
+    ('esta semana', (date(2026, 10, 12), TODAY)),
+    ('este_mes', (date(2026, 10, 1), TODAY)),
+    ('mes_pasado', (date(2026, 9, 1), date(2026, 9, 30))),
+    ('ultimos_7_dias', (date(2026, 10, 8), TODAY)),
+    ('últimos 90 días', (date(2026, 7, 17), TODAY)),
+    ('este_año', (date(2026, 1, 1), TODAY)),
+    ('01/09/2026-15/09/2026', (date(2026, 9, 1), date(2026, 9, 15))),
+    ('01/09/2026 hasta 15/09/2026', (date(2026, 9, 1), date(2026, 9, 15))),
+    ('05/10/2026', (date(2026, 10, 5), date(2026, 10, 5))),
+])
+def test_resolve_period(period, expected):
+    assert resolve_period(period, TODAY) == expected
+
+
+def test_resolve_period_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        resolve_period('la otra vez', TODAY)
+
+
+def test_resolve_period_rejects_a_reversed_range():
+    with pytest.raises(ValueError, match='invertido'):
+        resolve_period('15/09/2026-01/09/2026', TODAY)
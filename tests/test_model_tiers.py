@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.recorded_llm import RecordedChatModel
+from contact_prefetch import ContactPrefetcher
+from model_tiers import LARGE, SMALL, ModelPolicy
+from prompts import route_intents
+from turn_budget import TurnPolicy
+
+
+def step(tool, observation):
+    return SimpleNamespace(tool=tool), observation
+
+
+@pytest.mark.parametrize('query, tier', [
+    ('Busca a Pablo Salomón', SMALL),
+    ('Actualiza el teléfono de Pablo Salomón a +54 9 11 5555-0000', SMALL),
+    ('Añade a la bitácora de Pablo Salomón: reunión hoy sobre inversión', SMALL),
+    ('Registra una migraña de hoy, intensidad alta, causa estrés laboral', SMALL),
+    ('Busca los duplicados de Pablo y fusionalos', LARGE),
+    ('Busca a Pablo y actualiza su email', LARGE),
+    ('Contame algo de la reunión', LARGE),
+])
+def test_select_routes_simple_turns_to_the_small_model(query, tier):
+    assert ModelPolicy().select(query, route_intents(query))[0] == tier
+
+
+def test_disabled_policy_always_uses_the_large_model():
+    assert ModelPolicy(enabled=False).select('Busca a Pablo', route_intents('Busca a Pablo'))[0] == LARGE
+
+
+def test_threshold_sends_lower_confidence_turns_to_the_large_model():
+    query = 'Añade a la bitácora de Pablo: reunión'
+
+    assert ModelPolicy(threshold=0.8).select(query, route_intents(query))[0] == SMALL
+    assert ModelPolicy(threshold=0.85).select(query, route_intents(query))[0] == LARGE
+
+
+def test_escalation_reasons():
+    names = ['search_by_name', 'update_email']
+    escalation_reason = ModelPolicy.escalation_reason
+
+    assert escalation_reason({'output': 'Listo', 'intermediate_steps': [step('search_by_name', '[]')]}, names) is None
+    assert escalation_reason({'output': 'x', 'intermediate_steps': [step('search_by_name', 'Error: caído')]},
+                             names) == 'error en search_by_name'
+    assert escalation_reason({'output': 'x', 'intermediate_steps': [step('borrar_todo', 'no existe')]},
+                             names) == 'error en borrar_todo'
+    assert escalation_reason({'output': ''}, names) == 'respuesta vacía'
+    assert escalation_reason({'output': 'Agent stopped due to iteration limit'}, names) == 'límite de iteraciones'
+
+
+def test_no_escalation_after_a_successful_write():
+    response = {'output': '', 'intermediate_steps': [
+        step('update_email', 'Email actualizado exitosamente para Pablo'),
+        step('search_by_name', 'Error: caído'),
+    ]}
+
+    assert ModelPolicy.escalation_reason(response, ['search_by_name', 'update_email']) is None
+
+
+def test_usage_cost_counts_cached_tokens_at_their_price():
+    policy = ModelPolicy(small_model='gpt-4o-mini')
+
+    cost = policy.record_usage(SMALL, prompt_tokens=1_000_000, cached_tokens=500_000, completion_tokens=0)
+
+    assert cost == pytest.approx(0.5 * 0.15 + 0.5 * 0.075)
+    assert policy.summary()[SMALL]['cached_tokens'] == 500_000
+
+
+def make_agent(manager, small_recordings, large_recordings):
+    from agent import LeadsAgent
+    return LeadsAgent(
+        manager, openai_api_key='test',
+        llm=RecordedChatModel(recordings=large_recordings),
+        small_llm=RecordedChatModel(recordings=small_recordings),
+        model_policy=ModelPolicy(), turn_policy=TurnPolicy(), prefetcher=ContactPrefetcher(enabled=False),
+    )
+
+
+def test_simple_turn_is_answered_by_the_small_model(agent):
+    answer = agent.process_query('Busca a Pablo Salomón')
+
+    assert answer.startswith('Pablo Salomón trabaja en Tech Corp')
+    stats = agent.model_policy.stats
+    assert (stats[SMALL]['turns'], stats[SMALL]['escalations'], stats[LARGE]['turns']) == (1, 0, 0)
+
+
+def test_failed_small_turn_escalates_to_the_large_model(manager, recordings):
+    query = 'Busca a Pablo Salomón'
+    small = {query: [{'function_call': {'name': 'borrar_todo', 'arguments': {'__arg1': ''}}},
+                     {'content': 'Listo'}]}
+    agent = make_agent(manager, small, recordings)
+
+    answer = agent.process_query(query)
+
+    assert answer.startswith('Pablo Salomón trabaja en Tech Corp')
+    stats = agent.model_policy.stats
+    assert (stats[SMALL]['turns'], stats[SMALL]['escalations'], stats[LARGE]['turns']) == (1, 1, 1)
+
+
+def test_small_model_write_is_not_repeated(manager, recordings):
+    query = 'Actualiza el teléfono de Pablo Salomón a +54 9 11 5555-0000'
+    small = {query: [{'function_call': {'name': 'update_phone', 'arguments': {'__arg1': 'Pablo Salomón|+54 9 11 5555-0000'}}},
+                     {'function_call': {'name': 'borrar_todo', 'arguments': {'__arg1': ''}}},
+                     {'content': 'Teléfono actualizado'}]}
+    agent = make_agent(manager, small, recordings)
+
+    assert agent.process_query(query) == 'Teléfono actualizado'
+    assert agent.model_policy.stats[LARGE]['turns'] == 0
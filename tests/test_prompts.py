@@ -0,0 +1,49 @@
+import pytest
+
+from prompts import (ALL_INTENTS, CONTACTS, CORE_PROMPT, DATETIME, MIGRAINE, SECTIONS, TOOL_GROUPS,
+                     build_system_prompt, route_intents, tool_names)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('Busca a Pablo Salomón', {CONTACTS}),
+    ('¿Quién trabaja en Tech Corp?', {CONTACTS}),
+    ('Añade a la bitácora de Pablo: reunión hoy', {CONTACTS, DATETIME}),
+    ('Registra una migraña, intensidad alta', {MIGRAINE, DATETIME}),
+    ('Tuve dolor de cabeza por el estrés', {MIGRAINE, DATETIME}),
+    ('Anota en la bitácora de Juan que le dio migraña', {CONTACTS, MIGRAINE, DATETIME}),
+    ('Hola', {CONTACTS}),
+])
+def test_route_intents(query, expected):
+    assert route_intents(query) == expected
+
+
+def test_prompt_keeps_a_stable_prefix():
+    contacts_only = build_system_prompt({CONTACTS})
+    with_dates = build_system_prompt({DATETIME, CONTACTS})
+
+    assert contacts_only.startswith(CORE_PROMPT)
+    assert with_dates.startswith(contacts_only)
+    # Order comes from INTENTS, not from the caller
+    assert build_system_prompt([DATETIME, MIGRAINE]) == build_system_prompt([MIGRAINE, DATETIME])
+
+
+def test_prompt_only_carries_the_routed_sections():
+    prompt = build_system_prompt({MIGRAINE})
+
+    assert SECTIONS[MIGRAINE] in prompt
+    assert SECTIONS[CONTACTS] not in prompt
+    assert len(prompt) < len(build_system_prompt(ALL_INTENTS))
+
+
+def test_tool_names_follow_the_intents():
+    assert tool_names({MIGRAINE}) == TOOL_GROUPS[MIGRAINE]
+    assert tool_names({DATETIME, MIGRAINE}) == TOOL_GROUPS[MIGRAINE] + TOOL_GROUPS[DATETIME]
+    assert set(tool_names(ALL_INTENTS)) == {name for names in TOOL_GROUPS.values() for name in names}
+
+
+def test_every_tool_group_exists_in_the_agent(agent):
+    names = {tool.name for tool in agent.tools}
+
+    assert set(tool_names(ALL_INTENTS)) == names
+    executor = agent._executor_for(frozenset({MIGRAINE, DATETIME}))
+    assert {tool.name for tool in executor.tools} == {'register_migraine', 'migraine_stats', 'get_current_datetime'}
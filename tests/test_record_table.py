@@ -0,0 +1,68 @@
+import pytest
+
+from record_table import RecordTable, RecordView
+
+
+VALUES = [
+    ['Nombre', 'Edad', 'Email'],
+    ['Ana', '34', 'ana@example.com'],
+    ['Luis'],
+    ['Pablo', '007', ''],
+]
+
+
+@pytest.fixture
+def table():
+    return RecordTable.from_values(VALUES)
+
+
+def test_views_read_like_get_all_records(table):
+    assert len(table) == 3
+    assert table[0] == {'Nombre': 'Ana', 'Edad': 34, 'Email': 'ana@example.com'}
+    # Short rows read '' for the missing cells
+    assert table[1] == {'Nombre': 'Luis', 'Edad': '', 'Email': ''}
+    assert table[-1]['Edad'] == 7
+    assert [record['Nombre'] for record in table[1:]] == ['Luis', 'Pablo']
+
+
+def test_views_share_the_source_rows(table):
+    assert table.source is VALUES
+    assert table[0].raw is VALUES[1]
+    assert table[0].table is table
+
+    copy = table[0].to_dict()
+    copy['Nombre'] = 'Otra'
+    assert VALUES[1][0] == 'Ana'
+
+
+def test_views_are_read_only(table):
+    with pytest.raises(TypeError):
+        table[0]['Nombre'] = 'Otra'
+    with pytest.raises(AttributeError):
+        table[0].extra = 1
+
+
+def test_out_of_range_and_unknown_fields(table):
+    with pytest.raises(IndexError):
+        table[3]
+    with pytest.raises(KeyError):
+        table[0]['Teléfono']
+    assert table[0].get('Teléfono', 'No registrado') == 'No registrado'
+
+
+def test_cells_yield_positions_and_raw_text(table):
+    assert list(table.cells('Edad')) == [(0, '34'), (1, ''), (2, '007')]
+    assert list(table.cells('Teléfono')) == [(0, ''), (1, ''), (2, '')]
+
+
+def test_headers_are_interned_and_shared():
+    first = RecordTable.from_values([[''.join(['Nom', 'bre'])], ['Ana']])
+    second = RecordTable.from_values([['Nombre'], ['Luis']])
+
+    assert first.headers[0] is second.headers[0]
+    assert isinstance(next(iter(first)), RecordView)
+
+
+def test_empty_sheet():
+    assert len(RecordTable.from_values([])) == 0
+    assert len(RecordTable.from_values([['Nombre']])) == 0
@@ -0,0 +1,100 @@
+import pytest
+
+import sheets_manager
+from benchmarks.fake_sheets import CONTACT_HEADERS, FakeSpreadsheet
+from sheets_manager import SheetsManager
+
+
+def contact(name, email='', company='', bio=''):
+    return [name, '', email, '', company, '', bio, '']
+
+
+@pytest.fixture
+def spreadsheet():
+    return FakeSpreadsheet('contacts', {'Contactos': [
+        list(CONTACT_HEADERS),
+        contact('Ana María López', 'ana.maria@example.com', 'Tech Corp', 'Bio larga ' * 50),
+        contact('Pablo Salomón', 'pablo@example.com', 'Tech Corp'),
+        contact('Ana', 'ana@example.com', 'Startup Labs'),
+        contact('Juana Pérez', '', 'Tech Corp'),
+        contact('Luis Gómez', 'luis@example.com', 'Startup Labs'),
+    ]})
+
+
+@pytest.fixture
+def requests(spreadsheet, monkeypatch):
+    """Ranges of every batch_get request"""
+    sheet = spreadsheet.sheet1
+    batch_get, seen = sheet.batch_get, []
+
+    def recording(ranges, **kwargs):
+        seen.append(list(ranges))
+        return batch_get(ranges, **kwargs)
+
+    monkeypatch.setattr(sheet, 'batch_get', recording)
+    return seen
+
+
+@pytest.fixture
+def uncached(spreadsheet):
+    return SheetsManager.from_worksheet(spreadsheet.sheet1, change_detection=False)
+
+
+def names(records):
+    return [record['Nombre'] for record in records]
+
+
+def test_search_reads_the_column_then_the_matching_rows(uncached, spreadsheet, requests):
+    results = uncached.search_by_name('ana')
+
+    assert names(results) == ['Ana María López', 'Ana', 'Juana Pérez']
+    assert requests == [['A2:A'], ['A2:H2', 'A4:H4', 'A5:H5']]
+    assert spreadsheet.sheet1.calls['get_all_values'] == 0
+
+
+def test_search_by_field_matches_on_that_column(uncached, requests):
+    results = uncached.search_by_field('Empresa', 'startup')
+
+    assert names(results) == ['Ana', 'Luis Gómez']
+    assert requests[0] == ['E2:E']
+
+
+def test_limit_fetches_only_the_rows_it_returns(uncached, requests):
+    assert names(uncached.search_by_name('ana', limit=2)) == ['Ana María López', 'Ana']
+    assert requests[-1] == ['A2:H2', 'A4:H4']
+
+
+def test_iterators_are_lazy(uncached, spreadsheet):
+    matches = uncached.iter_by_field('Empresa', 'tech')
+    assert spreadsheet.sheet1.api_calls == 0
+
+    assert next(matches)['Nombre'] == 'Ana María López'
+    assert spreadsheet.sheet1.calls['batch_get'] == 2
+
+
+def test_many_matches_read_the_whole_sheet(uncached, spreadsheet, monkeypatch):
+    monkeypatch.setattr(sheets_manager, 'HYDRATE_MAX_ROWS', 2)
+
+    assert names(uncached.search_by_field('Empresa', 'tech')) == ['Ana María López', 'Pablo Salomón', 'Juana Pérez']
+    assert spreadsheet.sheet1.calls['get_all_values'] == 1
+
+
+def test_fresh_full_read_is_searched_in_memory(spreadsheet, requests):
+    manager = SheetsManager.from_worksheet(spreadsheet.sheet1, change_detection=True)
+    manager.get_all_values()
+
+    assert names(manager.search_by_name('pablo')) == ['Pablo Salomón']
+    assert requests == []
+
+
+def test_get_record_by_name_prefers_an_exact_match(uncached, requests):
+    record = uncached.get_record_by_name('ANA')
+
+    assert record['Email'] == 'ana@example.com'
+    # Only the chosen row is fetched
+    assert requests[-1] == ['A4:H4']
+
+
+def test_get_record_by_name_falls_back_to_a_partial_match(uncached):
+    assert uncached.get_record_by_name('gomez')['Nombre'] == 'Luis Gómez'
+    assert uncached.get_record_by_name('nadie') is None
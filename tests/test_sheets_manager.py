@@ -0,0 +1,90 @@
+from conftest import insert_column
+
+
+def test_add_record_follows_the_header_order(manager, contacts):
+    assert manager.add_record({'Nombre': 'Nuevo', 'Email': 'nuevo@example.com'})
+
+    headers = contacts.sheet1._rows[0]
+    added = contacts.sheet1._rows[-1]
+    assert added[headers.index('Nombre')] == 'Nuevo'
+    assert added[headers.index('Email')] == 'nuevo@example.com'
+
+
+def api_calls(spreadsheet):
+    return spreadsheet.sheet1.api_calls + spreadsheet.api_calls
+
+
+def test_add_record_is_one_api_call(manager, contacts):
+    # The duplicate check before adding a contact reads the sheet (and its header row)
+    manager.get_all_values()
+    contacts.sheet1.reset_calls()
+    contacts.reset_calls()
+
+    assert manager.add_record({'Nombre': 'Nuevo'})
+    assert api_calls(contacts) == 1
+
+
+def test_consecutive_appends_reuse_the_schema(manager, contacts):
+    manager.headers
+    contacts.sheet1.reset_calls()
+
+    manager.add_record({'Nombre': 'Uno'})
+    manager.add_record({'Nombre': 'Dos'})
+    assert contacts.sheet1.calls['row_values'] == 0
+
+
+def test_add_record_after_a_column_was_inserted(manager, contacts):
+    manager.get_all_values()
+    insert_column(contacts, 2, 'Apodo')
+    manager.get_all_values()
+
+    assert manager.add_record({'Nombre': 'Nuevo', 'Teléfono': '+54 11 5555-0000'})
+    added = contacts.sheet1._rows[-1]
+    assert added[:3] == ['Nuevo', '', '+54 11 5555-0000']
+    assert manager.column_index('Teléfono') == 3
+
+
+def test_drive_change_seen_elsewhere_rereads_the_header(manager, contacts):
+    manager.get_all_values()
+    insert_column(contacts, 2, 'Apodo')
+    # A read that only sees the new Drive version (not the header row)
+    manager.get_names()
+
+    assert manager.add_records([{'Nombre': 'Uno', 'Email': 'uno@example.com'}])
+    assert contacts.sheet1._rows[-1][:4] == ['Uno', '', '', 'uno@example.com']
+
+
+def test_update_field_after_a_column_was_inserted(manager, contacts):
+    worksheet = contacts.sheet1
+    name = worksheet._rows[1][0]
+    phone = worksheet._rows[1][1]
+    manager.headers
+    insert_column(contacts, 2, 'Apodo')
+
+    assert manager.update_field(name, 'Email', 'nuevo@example.com')
+    assert worksheet._rows[1][:4] == [name, '', phone, 'nuevo@example.com']
+
+
+def test_update_field_after_the_name_column_moved(manager, contacts):
+    worksheet = contacts.sheet1
+    name = worksheet._rows[1][0]
+    manager.headers
+    insert_column(contacts, 1, 'Apodo')
+
+    assert manager.update_field(name, 'Email', 'nuevo@example.com')
+    assert worksheet._rows[1][1] == name
+    assert worksheet._rows[1][3] == 'nuevo@example.com'
+
+
+def test_update_field_unknown_contact(manager):
+    assert not manager.update_field('Nadie Conocido', 'Email', 'x@example.com')
+
+
+def test_write_invalidates_the_cached_reads(manager, contacts):
+    before = manager.get_all_records()
+    generation = manager.generation
+
+    manager.add_record({'Nombre': 'Nuevo'})
+
+    assert manager.generation > generation
+    assert len(manager.get_all_records()) == len(before) + 1
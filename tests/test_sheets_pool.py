@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_sheets import FakeClient, FakeSpreadsheet, make_contact_rows, make_migraine_rows
+from sheets_manager import SheetsManager, SheetsPool
+
+
+@pytest.fixture
+def client():
+    return FakeClient({
+        'contacts': FakeSpreadsheet('contacts', {'Contactos': make_contact_rows(5), 'Equipo': make_contact_rows(3)}),
+        'migraines': FakeSpreadsheet('migraines', {'Migrañas': make_migraine_rows(5)}),
+        'slow': FakeSpreadsheet('slow', {'Contactos': make_contact_rows(5)}, latency_ms=300),
+    })
+
+
+def test_handles_are_opened_once_and_shared(client):
+    pool = SheetsPool(client=client)
+
+    manager = pool.manager('contacts')
+    assert pool.manager('contacts') is manager
+    assert pool.worksheet('contacts') is manager.sheet
+    assert pool.worksheet('contacts', 'Equipo') is not manager.sheet
+    assert client.opened['contacts'] == 1
+
+
+def test_manager_uses_the_pool_client(client):
+    manager = SheetsPool(client=client).manager('migraines', columns=SheetsManager.MIGRAINE_COLUMNS)
+
+    assert manager.client is client
+    assert manager.validate_schema() == []
+
+
+def test_forget_keeps_the_spreadsheet_while_another_worksheet_uses_it(client):
+    pool = SheetsPool(client=client)
+    pool.worksheet('contacts')
+    pool.worksheet('contacts', 'Equipo')
+
+    pool.forget('contacts', 'Equipo')
+    pool.worksheet('contacts', 'Equipo')
+    assert client.opened['contacts'] == 1
+
+    pool.forget('contacts')
+    pool.forget('contacts', 'Equipo')
+    pool.worksheet('contacts')
+    assert client.opened['contacts'] == 2
+
+
+def test_last_release_drops_leased_handles(client):
+    pool = SheetsPool(client=client)
+
+    first = pool.lease('contacts', 'Equipo')
+    assert pool.lease('contacts', 'Equipo') is first
+    pool.release('contacts', 'Equipo')
+    assert pool.manager('contacts', 'Equipo') is first
+
+    pool.release('contacts', 'Equipo')
+    # Also used for good through manager(): still there
+    assert pool.manager('contacts', 'Equipo') is first
+
+
+def test_release_without_other_users_forgets(client):
+    pool = SheetsPool(client=client)
+
+    leased = pool.lease('migraines')
+    pool.release('migraines')
+
+    assert pool.lease('migraines') is not leased
+    assert client.opened['migraines'] == 2
+
+
+def test_a_slow_sheet_does_not_block_the_others(client):
+    pool = SheetsPool(client=client)
+    slow = threading.Thread(target=pool.manager, args=('slow',))
+    slow.start()
+    time.sleep(0.05)
+
+    start = time.perf_counter()
+    pool.manager('contacts')
+    elapsed = time.perf_counter() - start
+    slow.join()
+
+    assert elapsed < 0.2
+
+
+def test_concurrent_requests_open_a_sheet_once(client):
+    pool = SheetsPool(client=client)
+    managers = []
+    threads = [threading.Thread(target=lambda: managers.append(pool.manager('slow'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.opened['slow'] == 1
+    assert all(manager is managers[0] for manager in managers)
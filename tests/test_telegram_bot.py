@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from telegram_bot import TelegramBot
+from telegram_outbox import TelegramOutbox
+
+
+class FakeMessage:
+    """Telegram message that records what the bot sends and edits"""
+
+    def __init__(self, chat, text='', sent=None):
+        self.chat = chat
+        self.text = text
+        self.sent = sent if sent is not None else []
+
+    async def reply_text(self, text):
+        message = FakeMessage(self.chat, text, self.sent)
+        self.sent.append(message)
+        return message
+
+    async def edit_text(self, text):
+        self.text = text
+        return self
+
+
+class FakeFile:
+    file_path = 'nota.ogg'
+
+    async def download_to_drive(self, path):
+        with open(path, 'wb') as f:
+            f.write(b'audio')
+
+
+@pytest.fixture
+def bot():
+    bot = TelegramBot('123:ABC', agent=SimpleNamespace(process_query=lambda query, chat_id=None: 'Listo'),
+                      openai_api_key='test')
+    bot.outbox = TelegramOutbox()
+    return bot
+
+
+def voice_update():
+    async def send_action(action):
+        pass
+
+    async def get_file():
+        return FakeFile()
+
+    message = FakeMessage(SimpleNamespace(id=1, type='private', send_action=send_action))
+    message.voice = message.audio = SimpleNamespace(get_file=get_file)
+    return SimpleNamespace(message=message, effective_chat=message.chat)
+
+
+def texts(update):
+    return [message.text for message in update.message.sent]
+
+
+@pytest.mark.parametrize('handler', ['handle_voice', 'handle_audio'])
+def test_answer_replaces_the_status_message(bot, monkeypatch, handler):
+    async def submit(chat_id, path):
+        return ['Busca a Pablo']
+
+    monkeypatch.setattr(bot.transcriber, 'submit', submit)
+    update = voice_update()
+
+    asyncio.run(getattr(bot, handler)(update, None))
+
+    assert texts(update) == ['📝 Transcripción: Busca a Pablo\n\nListo']
+
+
+@pytest.mark.parametrize('handler', ['handle_voice', 'handle_audio'])
+def test_error_replaces_the_status_message(bot, monkeypatch, handler):
+    async def submit(chat_id, path):
+        raise RuntimeError('Whisper caído')
+
+    monkeypatch.setattr(bot.transcriber, 'submit', submit)
+    update = voice_update()
+
+    asyncio.run(getattr(bot, handler)(update, None))
+
+    assert texts(update) == ['❌ Error al procesar el audio: Whisper caído']
@@ -0,0 +1,43 @@
+from telegram_outbox import split_message
+
+
+def utf16_length(text):
+    return len(text.encode('utf-16-le')) // 2
+
+
+def test_short_message_is_one_piece():
+    assert split_message('hola') == ['hola']
+    assert split_message('') == ['']
+
+
+def test_cuts_at_paragraph_then_line_then_space():
+    text = 'a' * 60 + '\n\n' + 'b' * 30 + '\n' + 'c' * 30
+
+    assert split_message(text, limit=100) == ['a' * 60, 'b' * 30 + '\n' + 'c' * 30]
+    assert split_message('palabra ' * 20, limit=50)[0] == ' '.join(['palabra'] * 6)
+
+
+def test_limit_counts_utf16_code_units():
+    # Every emoji outside the BMP is two UTF-16 code units
+    text = '😀' * 60
+
+    pieces = split_message(text, limit=100)
+
+    assert pieces == ['😀' * 50, '😀' * 10]
+    assert all(utf16_length(piece) <= 100 for piece in pieces)
+
+
+def test_never_cuts_a_surrogate_pair():
+    text = 'a' + '😀' * 60
+
+    pieces = split_message(text, limit=100)
+
+    # 'a' + 49 emoji = 99 units; the next emoji would need 101
+    assert pieces[0] == 'a' + '😀' * 49
+    assert ''.join(pieces) == text
+
+
+def test_long_text_without_separators_is_cut_mid_text():
+    pieces = split_message('x' * 250, limit=100)
+
+    assert [len(piece) for piece in pieces] == [100, 100, 50]
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_sheets import FakeClient, FakeSpreadsheet, make_contact_rows
+from sheets_manager import SheetsPool
+from tenancy import TenantRegistry, current_sheets_manager
+
+
+@pytest.fixture
+def client():
+    spreadsheets = {name: FakeSpreadsheet(name, {'Contactos': make_contact_rows(3)}) for name in ('a', 'b', 'c', 'shared')}
+    spreadsheets['slow'] = FakeSpreadsheet('slow', {'Contactos': make_contact_rows(3)}, latency_ms=300)
+    return FakeClient(spreadsheets)
+
+
+@pytest.fixture
+def pool(client):
+    return SheetsPool(client=client)
+
+
+def registry(pool, **kwargs):
+    sheets = {1: 'a', 2: 'b', 3: 'c', 4: 'shared', 5: 'shared/Contactos', 6: 'slow'}
+    return TenantRegistry(pool, default_manager=pool.manager('shared'), sheets=sheets, **kwargs)
+
+
+def test_chats_without_a_sheet_use_the_default(pool):
+    tenants = registry(pool)
+
+    assert tenants.manager_for(None) is tenants.default_manager
+    assert tenants.manager_for(99) is tenants.default_manager
+    assert tenants.manager_for(1) is not tenants.default_manager
+    assert tenants.manager_for(1) is tenants.manager_for(1)
+
+
+def test_least_recently_used_tenant_is_evicted(pool, client):
+    tenants = registry(pool, max_tenants=2)
+    tenants.manager_for(1)
+    tenants.manager_for(2)
+    tenants.manager_for(1)
+    tenants.manager_for(3)
+
+    assert len(tenants) == 2
+    assert tenants.evictions == 1
+    # Chat 2 was the least recently used: its sheet is opened again
+    tenants.manager_for(2)
+    assert client.opened['b'] == 2
+    assert client.opened['a'] == 1
+
+
+def test_idle_tenants_are_evicted(pool):
+    tenants = registry(pool, idle_seconds=0.01)
+    tenants.manager_for(1)
+    time.sleep(0.02)
+    tenants.manager_for(2)
+
+    assert len(tenants) == 1
+    assert tenants.evictions == 1
+
+
+def test_eviction_keeps_handles_still_in_use(pool, client):
+    tenants = registry(pool, max_tenants=1)
+    shared = tenants.manager_for(4)
+    tenants.manager_for(1)
+
+    # The default manager uses the same worksheet: the eviction must not drop it
+    assert pool.manager('shared') is tenants.default_manager
+    assert tenants.manager_for(4) is shared
+    assert client.opened['shared'] == 1
+
+
+def test_activate_sets_the_tools_sheet(pool):
+    tenants = registry(pool)
+
+    with tenants.activate(2) as manager:
+        assert current_sheets_manager.get() is manager
+    assert current_sheets_manager.get() is None
+
+
+def test_a_slow_tenant_does_not_block_other_chats(pool):
+    tenants = registry(pool)
+    tenants.manager_for(1)
+    slow = threading.Thread(target=tenants.manager_for, args=(6,))
+    slow.start()
+    time.sleep(0.05)
+
+    start = time.perf_counter()
+    tenants.manager_for(1)
+    tenants.manager_for(2)
+    elapsed = time.perf_counter() - start
+    slow.join()
+
+    assert elapsed < 0.2
@@ -0,0 +1,130 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from turn_budget import REPEATED_NOTE, TurnPolicy, budgeted, current_turn
+
+
+class Calls:
+    """Tool function that counts its calls"""
+
+    def __init__(self, result='ok'):
+        self.result = result
+        self.inputs = []
+
+    def __call__(self, tool_input):
+        self.inputs.append(tool_input)
+        return self.result
+
+
+@pytest.fixture
+def turn():
+    policy = TurnPolicy(max_iterations=3, max_seconds=30, max_repeats=1)
+    with policy.turn() as turn:
+        turn.begin_run()
+        yield turn
+
+
+def test_repeated_read_is_served_from_the_turn(turn):
+    search = Calls('Pablo Salomón')
+
+    assert turn.call_tool('search_by_name', 'Pablo', search) == 'Pablo Salomón'
+    assert turn.call_tool('search_by_name', ' Pablo ', search) == 'Pablo Salomón' + REPEATED_NOTE
+    assert search.inputs == ['Pablo']
+    assert turn.cached_calls == 1 and turn.repeated_calls == 1
+
+
+def test_write_makes_earlier_reads_stale(turn):
+    search, update = Calls('antes'), Calls('Actualizado')
+
+    turn.call_tool('search_by_name', 'Pablo', search)
+    turn.call_tool('update_phone', 'Pablo|123', update)
+    turn.call_tool('search_by_name', 'Pablo', search)
+
+    assert len(search.inputs) == 2
+    assert turn.last_write == 'Actualizado'
+
+
+def test_errors_are_not_reused(turn):
+    failing = Calls('Error: no encontrado')
+
+    turn.call_tool('search_by_name', 'Nadie', failing)
+    turn.call_tool('search_by_name', 'Nadie', failing)
+
+    assert len(failing.inputs) == 2
+
+
+def test_too_many_repeats_stop_the_run(turn):
+    search = Calls()
+    for _ in range(3):
+        turn.call_tool('search_by_name', 'Pablo', search)
+
+    assert turn.stop_reason == 'llamadas repetidas'
+    assert not turn.should_continue(1)
+
+    # A new run (e.g. escalated to the large model) starts counting again
+    turn.begin_run()
+    assert turn.should_continue(1)
+
+
+def test_iteration_and_time_limits():
+    policy = TurnPolicy(max_iterations=2, max_seconds=0.01)
+    with policy.turn() as turn:
+        turn.begin_run()
+        assert turn.should_continue(1)
+        assert not turn.should_continue(2)
+        assert turn.stop_reason == 'iteraciones'
+
+    with policy.turn() as turn:
+        turn.begin_run()
+        time.sleep(0.02)
+        assert not turn.should_continue(0)
+        assert turn.stop_reason == 'tiempo'
+
+    assert policy.summary()['stopped'] == {'iteraciones': 1, 'tiempo': 1}
+
+
+def test_stop_message_reports_the_last_write(turn):
+    turn.call_tool('add_to_log', 'Pablo|reunión', Calls('Nota agregada'))
+    turn.stop_reason = 'iteraciones'
+
+    assert turn.stop_message().endswith('Resultado del último cambio: Nota agregada')
+
+
+def test_policy_accumulates_turns():
+    policy = TurnPolicy()
+    for _ in range(2):
+        with policy.turn() as turn:
+            turn.begin_run()
+            turn.record_llm(prompt_tokens=100, cached_tokens=50, completion_tokens=10, cost_usd=0.001)
+            turn.call_tool('search_by_name', 'Pablo', Calls())
+
+    summary = policy.summary()
+    assert summary['turns'] == 2
+    assert summary['iterations'] == 2
+    assert summary['tool_calls'] == 2
+    assert summary['prompt_tokens'] == 200
+    assert summary['cost_usd'] == pytest.approx(0.002)
+
+
+def test_budgeted_runs_directly_outside_a_turn():
+    search = Calls()
+    tool = budgeted('search_by_name', search)
+
+    assert current_turn.get() is None
+    tool('Pablo')
+    tool('Pablo')
+    assert len(search.inputs) == 2
+
+
+def test_each_turn_gets_its_own_summary(agent):
+    search = 'Busca a Pablo Salomón'
+    update = 'Actualiza el teléfono de Pablo Salomón a +54 9 11 5555-0000'
+    # Slow models so the turns overlap
+    agent.llm.latency_ms = agent.small_llm.latency_ms = 20
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(agent.process_turn, [search, update, search, update]))
+
+    assert [summary['tool_calls'] for _, summary in results] == [1, 2, 1, 2]
+    assert results[0][0] == agent.process_query(search)
@@ -0,0 +1,69 @@
+from update_dedup import UpdateDeduplicator
+
+
+class FakeStore:
+    """Shared store that remembers claims like the DynamoDB one"""
+
+    def __init__(self):
+        self.claimed = set()
+
+    def claim(self, update_id):
+        if update_id in self.claimed:
+            return False
+        self.claimed.add(update_id)
+        return True
+
+    def release(self, update_id):
+        self.claimed.discard(update_id)
+
+
+def test_second_delivery_is_a_duplicate():
+    dedup = UpdateDeduplicator()
+
+    assert not dedup.is_duplicate(1)
+    assert dedup.is_duplicate(1)
+    assert not dedup.is_duplicate(2)
+
+
+def test_updates_without_id_are_never_duplicates():
+    dedup = UpdateDeduplicator()
+
+    assert not dedup.is_duplicate(None)
+    assert not dedup.is_duplicate(None)
+
+
+def test_release_lets_the_retry_through():
+    dedup = UpdateDeduplicator()
+    dedup.is_duplicate(1)
+    dedup.release(1)
+
+    assert not dedup.is_duplicate(1)
+
+
+def test_window_is_bounded():
+    dedup = UpdateDeduplicator(max_entries=3)
+    for update_id in range(5):
+        dedup.is_duplicate(update_id)
+
+    # The oldest ids were dropped, the newest are still remembered
+    assert not dedup.is_duplicate(0)
+    assert dedup.is_duplicate(4)
+
+
+def test_expired_ids_are_forgotten():
+    dedup = UpdateDeduplicator(window_seconds=0)
+    dedup.is_duplicate(1)
+
+    assert not dedup.is_duplicate(1)
+
+
+def test_shared_store_catches_other_containers():
+    store = FakeStore()
+    first, second = UpdateDeduplicator(shared_store=store), UpdateDeduplicator(shared_store=store)
+
+    assert not first.is_duplicate(7)
+    assert second.is_duplicate(7)
+
+    # A failed attempt releases the id, so the retry is processed wherever it lands
+    first.release(7)
+    assert not UpdateDeduplicator(shared_store=store).is_duplicate(7)
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+import lambda_function
+from update_dedup import UpdateDeduplicator
+from update_queue import LocalUpdateQueue, SQSUpdateQueue, create_update_queue
+
+
+def text_update(update_id, chat_id=1):
+    return {'update_id': update_id,
+            'message': {'message_id': update_id, 'date': update_id, 'chat': {'id': chat_id}, 'text': 'hola'}}
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """lambda_function with a local queue and an update processor that fails the ids in `failing`"""
+    failing, processed = set(), []
+
+    async def process_update(update_data, deduplicate=True):
+        processed.append(update_data['update_id'])
+        status = 500 if update_data['update_id'] in failing else 200
+        return {'statusCode': status, 'body': '{}'}
+
+    monkeypatch.setattr(lambda_function, 'process_update', process_update)
+    monkeypatch.setattr(lambda_function, 'update_queue', LocalUpdateQueue())
+    monkeypatch.setattr(lambda_function, 'update_deduplicator', UpdateDeduplicator())
+    return failing, processed
+
+
+def test_enqueue_acks_unsupported_and_rejects_malformed(worker):
+    queued = lambda_function.enqueue_update(text_update(1))
+    ignored = lambda_function.enqueue_update({'update_id': 2, 'my_chat_member': {}})
+    malformed = lambda_function.enqueue_update({'message': {}})
+    duplicate = lambda_function.enqueue_update(text_update(1))
+
+    assert [r['statusCode'] for r in (queued, ignored, malformed, duplicate)] == [200, 200, 400, 200]
+    assert json.loads(ignored['body']) == {'status': 'ignored'}
+    assert len(lambda_function.update_queue) == 1
+
+
+def test_worker_reports_only_the_failed_records(worker):
+    failing, processed = worker
+    failing.add(2)
+    event = {'Records': [{'messageId': f"m{i}", 'body': json.dumps(text_update(i))} for i in (1, 2, 3)]}
+
+    result = lambda_function.worker_handler(event, None)
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'm2'}]}
+    assert processed == [1, 2, 3]
+
+
+def test_local_drain_deletes_processed_and_requeues_failures(worker):
+    failing, processed = worker
+    failing.add(2)
+    for update_id in (1, 2, 3):
+        lambda_function.update_queue.send(text_update(update_id))
+
+    lambda_function.worker_handler({}, None)
+
+    queue = lambda_function.update_queue
+    assert [update['update_id'] for _, update in queue.receive_batch()] == [2]
+    assert processed == [1, 2, 3]
+
+
+def test_lambda_without_queue_url_is_a_configuration_error(monkeypatch):
+    monkeypatch.delenv('UPDATE_QUEUE_URL', raising=False)
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'leads-webhook')
+
+    with pytest.raises(ValueError):
+        create_update_queue()
+
+
+class FakeSQS:
+    def __init__(self, bodies):
+        self.messages = [{'ReceiptHandle': f"r{i}", 'Body': json.dumps(body)} for i, body in enumerate(bodies)]
+        self.deleted = []
+        self.released = []
+
+    def receive_message(self, **kwargs):
+        return {'Messages': self.messages[:kwargs['MaxNumberOfMessages']]}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self.deleted.extend(entry['ReceiptHandle'] for entry in Entries)
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        self.released.extend(entry['ReceiptHandle'] for entry in Entries)
+
+
+def test_sqs_messages_are_deleted_only_when_asked():
+    queue = SQSUpdateQueue('https://sqs.example/queue')
+    queue._client = FakeSQS([text_update(1), text_update(2)])
+
+    batch = queue.receive_batch()
+    assert [update['update_id'] for _, update in batch] == [1, 2]
+    assert queue.client.deleted == []
+
+    queue.delete([batch[0][0]])
+    queue.release([batch[1][0]])
+    assert queue.client.deleted == ['r0']
+    assert queue.client.released == ['r1']
@@ -0,0 +1,117 @@
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+import lambda_function
+from transcription import format_transcripts, group_voice_updates, merge_transcripts
+
+
+def voice_update(update_id, chat_id=1, date=0):
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': date, 'chat': {'id': chat_id, 'type': 'private'},
+        'voice': {'file_id': f"v{update_id}", 'file_unique_id': f"v{update_id}", 'duration': 3},
+    }}
+
+
+def text_update(update_id, chat_id=1, date=0):
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': date, 'chat': {'id': chat_id, 'type': 'private'}, 'text': 'hola',
+    }}
+
+
+def ids(groups):
+    return [[update['update_id'] for _, update in group] for group in groups]
+
+
+def test_consecutive_notes_of_a_chat_are_grouped():
+    items = [(i, update) for i, update in enumerate([
+        voice_update(1, date=0), voice_update(2, date=30), voice_update(3, chat_id=2, date=31),
+        voice_update(4, date=32), text_update(5, date=33), voice_update(6, date=34), voice_update(7, date=200),
+    ])]
+
+    assert ids(group_voice_updates(items, max_gap_seconds=60)) == [[1, 2], [3], [4], [5], [6], [7]]
+
+
+def test_merged_transcripts():
+    assert merge_transcripts(['  Busca a Pablo ', 'y a María']) == 'Busca a Pablo\ny a María'
+    assert merge_transcripts(['solo una']) == 'solo una'
+    assert format_transcripts(['uno', 'dos']) == '📝 Transcripciones:\n1. uno\n2. dos'
+
+
+class Recorder:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """lambda_function wired to fakes for the download, the transcriber, the agent and the outbox"""
+    agent, outbox = Recorder(), Recorder()
+
+    async def ensure_application():
+        pass
+
+    async def download_audio(message):
+        return tempfile.mkstemp(suffix='.ogg')[1]
+
+    async def transcribe_many(paths):
+        return [f"nota {i}" for i, _ in enumerate(paths, 1)]
+
+    def process_query(query, chat_id=None):
+        agent.calls.append((query, chat_id))
+        return 'Listo'
+
+    async def send(message, text, **kwargs):
+        outbox.calls.append(text)
+        if outbox.fail:
+            raise RuntimeError('Telegram caído')
+
+    monkeypatch.setattr(lambda_function, 'ensure_application', ensure_application)
+    monkeypatch.setattr(lambda_function, 'download_audio', download_audio)
+    monkeypatch.setattr(lambda_function, 'application', SimpleNamespace(bot=None))
+    monkeypatch.setattr(lambda_function, 'transcriber', SimpleNamespace(merge=True, transcribe_many=transcribe_many))
+    monkeypatch.setattr(lambda_function, 'agent', SimpleNamespace(process_query=process_query))
+    monkeypatch.setattr(lambda_function, 'outbox', SimpleNamespace(send=send))
+    return agent, outbox
+
+
+def group(*updates):
+    return [(f"m{update['update_id']}", update) for update in updates]
+
+
+def test_notes_get_one_agent_turn_and_one_reply(worker):
+    agent, outbox = worker
+
+    failures = asyncio.run(lambda_function.process_voice_batch(group(voice_update(1), voice_update(2))))
+
+    assert failures == []
+    assert agent.calls == [('nota 1\nnota 2', 1)]
+    assert outbox.calls == ['📝 Transcripciones:\n1. nota 1\n2. nota 2\n\nListo']
+
+
+def test_failed_reply_after_the_turn_is_acked(worker):
+    agent, outbox = worker
+    outbox.fail = True
+
+    failures = asyncio.run(lambda_function.process_voice_batch(group(voice_update(1), voice_update(2))))
+
+    # Retrying would run the agent (and its writes) again
+    assert failures == []
+    assert len(agent.calls) == 1
+
+
+def test_failure_before_the_turn_retries_the_whole_group(worker, monkeypatch):
+    agent, _ = worker
+
+    async def transcribe_many(paths):
+        raise RuntimeError('Whisper caído')
+
+    monkeypatch.setattr(lambda_function.transcriber, 'transcribe_many', transcribe_many)
+
+    failures = asyncio.run(lambda_function.process_voice_batch(group(voice_update(1), voice_update(2))))
+
+    assert failures == ['m1', 'm2']
+    assert agent.calls == []
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+import lambda_function
+from webhook_server import WebhookServer, update_chat_id
+
+
+def text_update(update_id, chat_id=1):
+    return {'update_id': update_id,
+            'message': {'message_id': update_id, 'date': update_id, 'chat': {'id': chat_id}, 'text': 'hola'}}
+
+
+def post(server, update, headers=None):
+    body = update if isinstance(update, bytes) else json.dumps(update).encode()
+    return server.route('POST', '/webhook', headers or {}, body)
+
+
+@pytest.fixture
+def server():
+    server = WebhookServer(workers=2, queue_size=1, secret_token='s3cr3t')
+    server._queues = [asyncio.Queue(maxsize=server.queue_size) for _ in range(server.workers)]
+    return server
+
+
+SECRET = {'x-telegram-bot-api-secret-token': 's3cr3t'}
+
+
+def test_updates_are_acked_once_queued(server):
+    assert post(server, text_update(1), SECRET) == (200, {'status': 'queued'})
+    assert sum(queue.qsize() for queue in server._queues) == 1
+
+
+def test_unsupported_updates_are_acked_and_dropped(server):
+    status, payload = post(server, {'update_id': 2, 'my_chat_member': {'chat': {'id': 1}}}, SECRET)
+
+    assert (status, payload) == (200, {'status': 'ignored'})
+    assert all(queue.empty() for queue in server._queues)
+
+
+@pytest.mark.parametrize('request_args, status', [
+    (('POST', '/webhook', SECRET, b'{no es json'), 400),
+    (('POST', '/webhook', SECRET, b'{"message": {}}'), 400),
+    (('POST', '/webhook', {}, json.dumps(text_update(1)).encode()), 403),
+    (('POST', '/webhook', {'x-telegram-bot-api-secret-token': 'otro'}, b'{}'), 403),
+    (('POST', '/otra', SECRET, b'{}'), 404),
+    (('PUT', '/webhook', SECRET, b'{}'), 405),
+    (('GET', '/webhook?x=1', {}, b''), 200),
+])
+def test_rejected_requests(server, request_args, status):
+    assert server.route(*request_args)[0] == status
+    assert all(queue.empty() for queue in server._queues)
+
+
+def test_full_worker_queue_answers_busy(server):
+    assert post(server, text_update(1, chat_id=7), SECRET)[0] == 200
+    assert post(server, text_update(2, chat_id=7), SECRET) == (503, {'error': 'busy'})
+
+
+def test_update_chat_id():
+    assert update_chat_id(text_update(1, chat_id=42)) == 42
+    assert update_chat_id({'update_id': 1, 'callback_query': {'message': {'chat': {'id': 5}}}}) == 5
+    assert update_chat_id({'update_id': 1}) is None
+
+
+async def http_post(port, update):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(update).encode()
+    writer.write(f"POST /webhook HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+def test_updates_of_a_chat_are_processed_in_order(monkeypatch):
+    processed = []
+
+    async def ensure_application():
+        pass
+
+    async def process_update(update, deduplicate=True):
+        # Later updates finish sooner, so only the per-chat queue keeps the order
+        await asyncio.sleep(0.01 * (5 - update['update_id']))
+        processed.append(update['update_id'])
+        return {'statusCode': 200}
+
+    monkeypatch.setattr(lambda_function, 'ensure_application', ensure_application)
+    monkeypatch.setattr(lambda_function, 'process_update', process_update)
+
+    async def scenario():
+        server = WebhookServer(host='127.0.0.1', port=0, workers=4)
+        await server.start()
+        try:
+            responses = [await http_post(server.port, text_update(i)) for i in range(1, 5)]
+            await server.join()
+        finally:
+            await server.stop()
+        return server, responses
+
+    server, responses = asyncio.run(scenario())
+
+    assert all(response.startswith(b'HTTP/1.1 200 OK') for response in responses)
+    assert processed == [1, 2, 3, 4]
+    assert (server.processed, server.failed) == (4, 0)
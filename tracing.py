@@ -0,0 +1,270 @@
+"""
+Lightweight request tracing for the bot
+Times each phase of a request (transcription, agent, LLM, tools, Sheets calls)
+and emits the results as structured JSON logs and CloudWatch EMF metrics
+"""
+
+import contextvars
+import json
+import math
+import os
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Deque, Dict, List, Optional
+
+
+# Set TRACING_ENABLED=false to silence the per-request JSON log lines
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() != 'false'
+
+# Namespace used for the CloudWatch Embedded Metric Format documents
+EMF_NAMESPACE = os.getenv('EMF_NAMESPACE', 'CRMAgent')
+
+# Number of recent durations kept per phase for the p50/p95 summary
+STATS_WINDOW = 500
+
+
+class Span:
+    """A single timed phase inside a trace"""
+
+    __slots__ = ('name', 'parent', 'start', 'duration_ms', 'attributes', 'error')
+
+    def __init__(self, name: str, parent: Optional[str], attributes: Dict):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes):
+        """Attach extra attributes to the span (token counts, row counts, ...)"""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        data = {
+            'name': self.name,
+            'parent': self.parent,
+            'duration_ms': round(self.duration_ms, 2),
+        }
+        if self.attributes:
+            data['attributes'] = self.attributes
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class Trace:
+    """All the spans recorded while handling one request"""
+
+    def __init__(self, name: str, attributes: Dict):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.spans: List[Span] = []
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+
+    def phase_durations(self) -> Dict[str, List[float]]:
+        """Group the span durations of this trace by phase name"""
+        durations = defaultdict(list)
+        for s in self.spans:
+            durations[s.name].append(round(s.duration_ms, 2))
+        return dict(durations)
+
+    def to_dict(self) -> Dict:
+        return {
+            'type': 'trace',
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'attributes': self.attributes,
+            'duration_ms': round(self.duration_ms, 2),
+            'spans': [s.to_dict() for s in self.spans],
+        }
+
+
+class PhaseStats:
+    """Rolling window of durations per phase, used for in-process p50/p95"""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.window = window
+        self._durations: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, phase: str, duration_ms: float):
+        self._durations[phase].append(duration_ms)
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], pct: float) -> float:
+        if not sorted_values:
+            return 0.0
+        # Nearest-rank percentile
+        rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+        return sorted_values[rank]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get count, p50 and p95 per phase
+
+        Returns:
+            Dictionary mapping phase name to its statistics
+        """
+        result = {}
+        for phase, values in self._durations.items():
+            ordered = sorted(values)
+            result[phase] = {
+                'count': len(ordered),
+                'p50': round(self._percentile(ordered, 50), 2),
+                'p95': round(self._percentile(ordered, 95), 2),
+            }
+        return result
+
+    def reset(self):
+        self._durations.clear()
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('current_trace', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+stats = PhaseStats()
+
+
+def current_trace() -> Optional[Trace]:
+    """Get the trace of the request being handled, if any"""
+    return _current_trace.get()
+
+
+def _finish_span(s: Span):
+    s.duration_ms = (time.perf_counter() - s.start) * 1000
+    stats.record(s.name, s.duration_ms)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans.append(s)
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """
+    Start a new trace for one request and emit it as a JSON log line when done
+
+    Args:
+        name: Name of the root phase (e.g. 'handle_text', 'lambda.invocation')
+        **attributes: Extra attributes for the trace (chat_id, update_id, ...)
+
+    Yields:
+        The Trace being recorded
+    """
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    root = Span(name, None, {})
+    span_token = _current_span.set(root)
+    try:
+        yield trace
+    except Exception as e:
+        root.error = str(e)
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _finish_span(root)
+        _current_trace.reset(trace_token)
+        trace.duration_ms = root.duration_ms
+        if TRACING_ENABLED:
+            payload = trace.to_dict()
+            # Rolling p50/p95 for the phases this request went through
+            summary = stats.summary()
+            payload['phase_stats'] = {
+                phase: summary[phase] for phase in trace.phase_durations() if phase in summary
+            }
+            print(json.dumps(payload, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a phase of the current request
+
+    Outside of a trace the duration still feeds the p50/p95 statistics,
+    but nothing is logged.
+
+    Args:
+        name: Phase name (e.g. 'transcription', 'tool.search_by_name', 'sheets.get_all_values')
+        **attributes: Extra attributes for the span
+
+    Yields:
+        The Span being recorded
+    """
+    parent = _current_span.get()
+    s = Span(name, parent.name if parent else None, attributes)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.error = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish_span(s)
+
+
+def record_span(name: str, duration_ms: float, **attributes):
+    """
+    Record a phase that was timed elsewhere (e.g. by a LangChain callback)
+
+    Args:
+        name: Phase name
+        duration_ms: Measured duration in milliseconds
+        **attributes: Extra attributes for the span
+    """
+    parent = _current_span.get()
+    s = Span(name, parent.name if parent else None, attributes)
+    s.duration_ms = duration_ms
+    stats.record(name, duration_ms)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans.append(s)
+
+
+def traced(name: str) -> Callable:
+    """Decorator that wraps every call of a function in a span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def to_emf(trace: Trace, namespace: str = EMF_NAMESPACE, **dimensions) -> Dict:
+    """
+    Build a CloudWatch Embedded Metric Format document for a finished trace
+
+    Every phase becomes a millisecond metric; phases that ran several times
+    (e.g. Sheets calls) are reported as a list of values so CloudWatch can
+    compute p50/p95 from the raw samples.
+
+    Args:
+        trace: The finished trace
+        namespace: CloudWatch metrics namespace
+        **dimensions: Dimension name/value pairs (e.g. Function='crm-bot')
+
+    Returns:
+        EMF document, ready to be printed as one JSON line
+    """
+    durations = trace.phase_durations()
+    document = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [list(dimensions.keys())],
+                'Metrics': [{'Name': phase, 'Unit': 'Milliseconds'} for phase in durations],
+            }],
+        },
+        'trace_id': trace.trace_id,
+    }
+    document.update(dimensions)
+    for phase, values in durations.items():
+        document[phase] = values[0] if len(values) == 1 else values
+    return document
@@ -0,0 +1,224 @@
+"""
+Voice note transcription scheduler
+Voice notes are transcribed on a shared thread pool, so at most
+max_concurrency Whisper requests run at once across all chats. Long audio is
+preprocessed first (see audio_preprocessing) and its chunks are transcribed in
+parallel. Notes sent in a row in the same chat are buffered and, when merging
+is on, answered with a single agent turn instead of one per note
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from audio_preprocessing import AudioPreprocessor
+import tracing
+
+
+class _Batch:
+    """Voice notes of one chat waiting to be answered together"""
+
+    def __init__(self):
+        self.tasks: List[asyncio.Future] = []
+        self.last_arrival = time.monotonic()
+        self.closed = False
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class TranscriptionScheduler:
+    """
+    Transcribes voice notes concurrently under a global cap
+
+    submit() buffers the notes of a chat: the first note of a burst waits until
+    every note is transcribed and no new one arrived for window_seconds, then
+    gets all the transcripts; the notes that joined its batch get None.
+    """
+
+    def __init__(self, client, max_concurrency: int = 4, window_seconds: float = 1.5,
+                 merge: bool = True, model: str = 'whisper-1', language: str = 'es',
+                 preprocessor: Optional[AudioPreprocessor] = None, preprocess_workers: int = 2):
+        """
+        Args:
+            client: OpenAI client (only audio.transcriptions is used)
+            max_concurrency: Most transcriptions running at once, across all chats
+            window_seconds: Quiet time after the last note before a batch is answered
+            merge: False answers every note on its own (transcription is still capped)
+            model: Whisper model
+            language: Audio language
+            preprocessor: Audio preprocessing before upload (default: none, files go up unchanged)
+            preprocess_workers: Threads for preprocessing, kept apart from the transcription pool
+        """
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.window_seconds = window_seconds
+        self.merge = merge
+        self.model = model
+        self.language = language
+        self.preprocessor = preprocessor or AudioPreprocessor(enabled=False)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='transcription')
+        self._preprocess_executor = ThreadPoolExecutor(max_workers=preprocess_workers, thread_name_prefix='audio')
+        self._pending: Dict[int, _Batch] = {}
+
+    @classmethod
+    def from_env(cls, client) -> 'TranscriptionScheduler':
+        """
+        Build the scheduler from environment variables
+
+        TRANSCRIPTION_CONCURRENCY: most Whisper requests at once (default 4)
+        VOICE_BATCH_WINDOW: seconds to wait for more notes in the same chat (default 1.5)
+        VOICE_MERGE: 'false' to answer every voice note separately (default true)
+        AUDIO_PREPROCESS_WORKERS: threads for audio preprocessing (default 2)
+        plus the AUDIO_* variables of AudioPreprocessor.from_env
+        """
+        return cls(
+            client,
+            max_concurrency=int(os.getenv('TRANSCRIPTION_CONCURRENCY', '4')),
+            window_seconds=float(os.getenv('VOICE_BATCH_WINDOW', '1.5')),
+            merge=os.getenv('VOICE_MERGE', 'true').lower() != 'false',
+            preprocessor=AudioPreprocessor.from_env(),
+            preprocess_workers=int(os.getenv('AUDIO_PREPROCESS_WORKERS', '2')),
+        )
+
+    def transcribe_file(self, path: str) -> str:
+        """Transcribe one audio file (blocking)"""
+        with tracing.span('transcription'):
+            with open(path, 'rb') as audio:
+                transcript = self.client.audio.transcriptions.create(
+                    model=self.model,
+                    file=audio,
+                    language=self.language
+                )
+        return transcript.text
+
+    def _prepare_file(self, path: str) -> List[str]:
+        with tracing.span('audio.preprocess', bytes=os.path.getsize(path)) as s:
+            paths = self.preprocessor.prepare(path)
+            s.set(chunks=len(paths), output_bytes=sum(os.path.getsize(p) for p in paths))
+        return paths
+
+    async def _run(self, executor: ThreadPoolExecutor, func, *args):
+        # Copy the context so spans land in the caller's trace
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(executor, context.run, func, *args)
+
+    async def transcribe(self, path: str) -> str:
+        """
+        Transcribe one audio file
+
+        The file is preprocessed on the preprocessing pool, then its chunks are
+        transcribed concurrently on the shared transcription pool.
+        """
+        paths = [path]
+        if self.preprocessor.enabled:
+            paths = await self._run(self._preprocess_executor, self._prepare_file, path)
+        try:
+            texts = await asyncio.gather(*(self._run(self._executor, self.transcribe_file, p) for p in paths))
+        finally:
+            self.preprocessor.cleanup(paths, path)
+        return ' '.join(text.strip() for text in texts)
+
+    async def transcribe_many(self, paths: Iterable[str]) -> List[str]:
+        """
+        Transcribe several files concurrently
+
+        Returns:
+            The transcripts, in the order of paths
+        """
+        return list(await asyncio.gather(*(self.transcribe(path) for path in paths)))
+
+    async def submit(self, chat_id: int, path: str) -> Optional[List[str]]:
+        """
+        Transcribe a voice note, batching it with the chat's other recent notes
+
+        Args:
+            chat_id: Telegram chat id
+            path: Downloaded audio file
+
+        Returns:
+            The transcripts of the batch (in arrival order) for the handler that
+            should answer, or None if the note was merged into another handler's batch
+        """
+        if not self.merge:
+            return [await self.transcribe(path)]
+
+        batch = self._pending.get(chat_id)
+        leader = batch is None or batch.closed
+        if leader:
+            batch = self._pending[chat_id] = _Batch()
+        batch.tasks.append(asyncio.ensure_future(self.transcribe(path)))
+        batch.last_arrival = time.monotonic()
+
+        if not leader:
+            await asyncio.shield(batch.done)
+            return None
+
+        try:
+            while True:
+                count = len(batch.tasks)
+                await asyncio.wait(batch.tasks)
+                quiet = time.monotonic() - batch.last_arrival
+                if quiet < self.window_seconds:
+                    await asyncio.sleep(self.window_seconds - quiet)
+                if len(batch.tasks) == count:
+                    break
+        finally:
+            batch.closed = True
+            if self._pending.get(chat_id) is batch:
+                del self._pending[chat_id]
+            if not batch.done.done():
+                batch.done.set_result(None)
+
+        texts, errors = [], []
+        for task in batch.tasks:
+            if task.exception() is not None:
+                errors.append(task.exception())
+            else:
+                texts.append(task.result())
+        for error in errors:
+            print(f"Error transcribing voice note in chat {chat_id}: {error}")
+        if not texts:
+            raise errors[0]
+        return texts
+
+
+def merge_transcripts(texts: List[str]) -> str:
+    """Join the transcripts of several voice notes into one message for the agent"""
+    if len(texts) == 1:
+        return texts[0]
+    return '\n'.join(text.strip() for text in texts)
+
+
+def format_transcripts(texts: List[str]) -> str:
+    """Transcripts as shown to the user"""
+    if len(texts) == 1:
+        return f"📝 Transcripción: {texts[0]}"
+    return "📝 Transcripciones:\n" + '\n'.join(f"{i}. {text}" for i, text in enumerate(texts, 1))
+
+
+def group_voice_updates(items: List, max_gap_seconds: float = 60) -> List[List]:
+    """
+    Group queued updates so consecutive voice notes of a chat are answered together
+
+    Args:
+        items: List of (message_id, update_data) tuples, in arrival order
+        max_gap_seconds: Most time between two notes of the same group (Telegram message dates)
+
+    Returns:
+        List of groups; every group is a list of items, voice/audio groups may have several
+    """
+    groups = []
+    previous = None
+    for item in items:
+        message = item[1].get('message') or {}
+        is_voice = bool(message.get('voice') or message.get('audio'))
+        chat_id = (message.get('chat') or {}).get('id')
+        if (is_voice and previous is not None and previous[0] == chat_id
+                and message.get('date', 0) - previous[1] <= max_gap_seconds):
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+        previous = (chat_id, message.get('date', 0)) if is_voice else None
+    return groups
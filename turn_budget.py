@@ -0,0 +1,248 @@
+"""
+Per-turn execution budget for LeadsAgent
+Caps the model calls and wall-clock time of each process_query, serves
+repeated identical tool calls from the results already obtained in the turn,
+stops a turn whose model keeps repeating the same call, and accounts the
+tokens, cost, tool calls and iterations of every turn
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from model_tiers import WRITE_TOOLS
+import tracing
+
+
+# Note appended to a result served again, so the model stops asking for it
+REPEATED_NOTE = "\n(Resultado repetido: ya llamaste a esta herramienta con la misma entrada en este turno)"
+
+# Why a turn was cut short -> message for the user
+STOP_MESSAGES = {
+    'iteraciones': "Lo siento, no pude completar tu solicitud en los pasos permitidos. Intenta pedirlo de forma más concreta.",
+    'tiempo': "Lo siento, tu solicitud tardó demasiado y la interrumpí antes de terminar.",
+    'llamadas repetidas': "Lo siento, no pude completar tu solicitud: la búsqueda no avanzaba. Revisa el nombre o los datos e intenta de nuevo.",
+}
+
+
+class Turn:
+    """
+    Budget and accounting of one process_query
+
+    A turn may run the agent more than once (a small-model run escalated to
+    the large model); results are shared by every run of the turn, the
+    repeated-call and iteration limits apply to each run.
+    """
+
+    def __init__(self, max_iterations: int, max_seconds: float, max_repeats: int):
+        self.max_iterations = max_iterations
+        self.max_repeats = max_repeats
+        self.start = time.perf_counter()
+        self.deadline = self.start + max_seconds if max_seconds > 0 else None
+        self.stop_reason: Optional[str] = None
+        self.runs = 0
+        self.iterations = 0
+        self.tool_calls = 0
+        self.cached_calls = 0
+        self.repeated_calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        # (tool, input) -> (writes done when the result was produced, result)
+        self._results: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._seen: Dict[Tuple[str, str], int] = {}
+        self._run_repeats = 0
+        self._writes = 0
+        # Answer of the last write that ran, to tell the user if the turn is cut short
+        self.last_write: Optional[str] = None
+
+    def begin_run(self):
+        """Start a run of the agent (repeat counts start over)"""
+        self.runs += 1
+        self._seen.clear()
+        self._run_repeats = 0
+        if self.stop_reason != 'tiempo':
+            self.stop_reason = None
+
+    def expired(self) -> bool:
+        """Whether the turn ran out of wall-clock time"""
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def should_continue(self, iterations: int) -> bool:
+        """
+        Whether the running agent may take another step
+
+        Args:
+            iterations: Steps taken so far in the current run
+        """
+        if self.stop_reason is None:
+            if iterations >= self.max_iterations:
+                self.stop_reason = 'iteraciones'
+            elif self.expired():
+                self.stop_reason = 'tiempo'
+        return self.stop_reason is None
+
+    def record_llm(self, prompt_tokens: int, cached_tokens: int, completion_tokens: int, cost_usd: float):
+        """Add one model call"""
+        self.iterations += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost_usd
+
+    def call_tool(self, name: str, tool_input: str, func: Callable[[str], str]) -> str:
+        """
+        Run a tool call, or serve it from an identical call made earlier in the turn
+
+        A read is served again until a write runs; a write only while it's
+        the last write of the turn (so the same note isn't added twice).
+        Errors aren't reused. A run that repeats calls more than max_repeats
+        times (a model going around in circles) is stopped.
+        """
+        key = (name, tool_input.strip())
+        seen = self._seen[key] = self._seen.get(key, 0) + 1
+        if seen > 1:
+            self.repeated_calls += 1
+            self._run_repeats += 1
+            if self._run_repeats > self.max_repeats:
+                self.stop_reason = 'llamadas repetidas'
+
+        cached = self._results.get(key)
+        if cached is not None and cached[0] == self._writes:
+            self.cached_calls += 1
+            return cached[1] + REPEATED_NOTE if seen > 1 else cached[1]
+
+        self.tool_calls += 1
+        result = func(tool_input)
+        if name in WRITE_TOOLS:
+            self._writes += 1
+            self.last_write = str(result)
+        if not str(result).startswith('Error'):
+            self._results[key] = (self._writes, result)
+        return result
+
+    def stop_message(self) -> str:
+        """Answer for a turn cut short, with the last write so the user knows what was done"""
+        message = STOP_MESSAGES[self.stop_reason]
+        if self.last_write:
+            message += f"\n\nResultado del último cambio: {self.last_write}"
+        return message
+
+    def summary(self) -> Dict:
+        """Metrics of the turn"""
+        return {
+            'duration_ms': round((time.perf_counter() - self.start) * 1000, 2),
+            'runs': self.runs,
+            'iterations': self.iterations,
+            'tool_calls': self.tool_calls,
+            'cached_calls': self.cached_calls,
+            'repeated_calls': self.repeated_calls,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cost_usd': round(self.cost_usd, 6),
+            'stopped': self.stop_reason,
+        }
+
+
+# Turn being processed in this context (None outside process_query)
+current_turn: ContextVar[Optional[Turn]] = ContextVar('current_turn', default=None)
+
+
+class TurnPolicy:
+    """
+    Limits applied to every turn, plus totals over all turns
+
+    Turns cut short by a limit are counted per reason and recorded as an
+    'agent.turn_stopped' span, so they show up in the trace metrics.
+    """
+
+    def __init__(self, max_iterations: int = 5, max_seconds: float = 30.0, max_repeats: int = 1):
+        """
+        Args:
+            max_iterations: Model calls per agent run
+            max_seconds: Wall-clock time per turn (0 = no limit)
+            max_repeats: Repeated identical tool calls allowed in one run before
+                it's stopped (each repeat is answered from the earlier result)
+        """
+        self.max_iterations = max(1, max_iterations)
+        self.max_seconds = max_seconds
+        self.max_repeats = max(0, max_repeats)
+        self.latency = tracing.PhaseStats()
+        self.stats: Dict[str, float] = {
+            'turns': 0, 'iterations': 0, 'tool_calls': 0, 'cached_calls': 0, 'repeated_calls': 0,
+            'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0,
+        }
+        self.stopped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'TurnPolicy':
+        """
+        Build the policy from environment variables
+
+        AGENT_MAX_ITERATIONS: model calls per agent run (default 5)
+        AGENT_MAX_SECONDS: wall-clock seconds per turn, 0 for no limit (default 30)
+        AGENT_MAX_REPEATED_CALLS: repeated identical tool calls allowed per run (default 1)
+        """
+        return cls(
+            max_iterations=int(os.getenv('AGENT_MAX_ITERATIONS', '5')),
+            max_seconds=float(os.getenv('AGENT_MAX_SECONDS', '30')),
+            max_repeats=int(os.getenv('AGENT_MAX_REPEATED_CALLS', '1')),
+        )
+
+    @contextmanager
+    def turn(self) -> Iterator[Turn]:
+        """Run a turn under the policy's limits, recording its metrics when it ends"""
+        turn = Turn(self.max_iterations, self.max_seconds, self.max_repeats)
+        token = current_turn.set(turn)
+        try:
+            yield turn
+        finally:
+            current_turn.reset(token)
+            self.record(turn)
+
+    def record(self, turn: Turn):
+        summary = turn.summary()
+        self.latency.record('turn', summary['duration_ms'])
+        with self._lock:
+            self.stats['turns'] += 1
+            for key in ('iterations', 'tool_calls', 'cached_calls', 'repeated_calls',
+                        'prompt_tokens', 'completion_tokens', 'cost_usd'):
+                self.stats[key] += summary[key]
+            if turn.stop_reason:
+                self.stopped[turn.stop_reason] = self.stopped.get(turn.stop_reason, 0) + 1
+        if turn.stop_reason:
+            tracing.record_span('agent.turn_stopped', summary['duration_ms'], reason=turn.stop_reason,
+                                iterations=turn.iterations, tool_calls=turn.tool_calls)
+
+    def summary(self) -> Dict:
+        """
+        Totals over all turns
+
+        Returns:
+            Dictionary with turn count, iterations, tool calls, tokens, cost,
+            turns stopped per reason and p50/p95 turn latency
+        """
+        latency = self.latency.summary().get('turn', {})
+        with self._lock:
+            return {
+                **{key: (round(value, 6) if key == 'cost_usd' else value) for key, value in self.stats.items()},
+                'stopped': dict(self.stopped),
+                'p50_ms': latency.get('p50', 0.0),
+                'p95_ms': latency.get('p95', 0.0),
+            }
+
+
+def budgeted(name: str, func: Callable[[str], str]) -> Callable[[str], str]:
+    """Wrap a tool function so its calls go through the current turn (if any)"""
+    def wrapper(input_str: str = "") -> str:
+        turn = current_turn.get()
+        if turn is None:
+            return func(input_str)
+        return turn.call_tool(name, input_str, func)
+    return wrapper
@@ -0,0 +1,146 @@
+"""
+Deduplication of Telegram webhook deliveries by update_id
+Telegram redelivers an update when the webhook is slow or fails; this keeps
+the agent from running (and writing to the sheet) twice for the same update
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class DynamoDBUpdateStore:
+    """
+    Shared update_id store backed by a DynamoDB table, so retries that land on
+    a different Lambda container are caught too
+
+    The table needs a string partition key named 'update_id'; enable TTL on the
+    'expires_at' attribute so old entries are cleaned up automatically.
+    """
+
+    def __init__(self, table_name: str, window_seconds: int):
+        """
+        Args:
+            table_name: Name of the DynamoDB table
+            window_seconds: How long an update_id is remembered
+        """
+        self.table_name = table_name
+        self.window_seconds = window_seconds
+        self._client = None
+
+    @property
+    def client(self):
+        # boto3 ships with the Lambda runtime; import lazily so local runs don't need it
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('dynamodb')
+        return self._client
+
+    def claim(self, update_id: int) -> bool:
+        """
+        Atomically record an update_id
+
+        Returns:
+            True if this is the first delivery, False if it was already claimed
+        """
+        now = int(time.time())
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    'update_id': {'S': str(update_id)},
+                    'expires_at': {'N': str(now + self.window_seconds)},
+                },
+                ConditionExpression='attribute_not_exists(update_id) OR expires_at < :now',
+                ExpressionAttributeValues={':now': {'N': str(now)}},
+            )
+            return True
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+
+    def release(self, update_id: int):
+        """Forget an update_id so a redelivery gets processed again"""
+        self.client.delete_item(TableName=self.table_name, Key={'update_id': {'S': str(update_id)}})
+
+
+class UpdateDeduplicator:
+    """Remembers recently processed update_ids, in memory and optionally in a shared store"""
+
+    def __init__(self, window_seconds: int = 86400, max_entries: int = 10000,
+                 shared_store: Optional[DynamoDBUpdateStore] = None):
+        """
+        Args:
+            window_seconds: How long an update_id is remembered (Telegram keeps updates for 24h)
+            max_entries: Upper bound for the in-memory window
+            shared_store: Optional store shared across containers
+        """
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.shared_store = shared_store
+        self._seen: 'OrderedDict[int, float]' = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> 'UpdateDeduplicator':
+        """
+        Build the deduplicator from environment variables
+
+        DEDUP_WINDOW_SECONDS: memory window (default 86400)
+        DEDUP_TABLE: DynamoDB table name to share the window across containers (optional)
+        """
+        window = int(os.getenv('DEDUP_WINDOW_SECONDS', '86400'))
+        table = os.getenv('DEDUP_TABLE')
+        shared_store = DynamoDBUpdateStore(table, window) if table else None
+        return cls(window_seconds=window, shared_store=shared_store)
+
+    def _expire(self, now: float):
+        while self._seen:
+            update_id, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.window_seconds and len(self._seen) <= self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def is_duplicate(self, update_id: Optional[int]) -> bool:
+        """
+        Check an update_id and mark it as seen
+
+        Args:
+            update_id: The update_id of the incoming Telegram update
+
+        Returns:
+            True if the update was already received and must be skipped
+        """
+        if update_id is None:
+            return False
+
+        now = time.time()
+        self._expire(now)
+        if update_id in self._seen:
+            return True
+        self._seen[update_id] = now
+
+        if self.shared_store is not None:
+            try:
+                if not self.shared_store.claim(update_id):
+                    return True
+            except Exception as e:
+                # The shared store is best effort; the in-memory window still applies
+                print(f"Warning: could not check update {update_id} in shared store: {e}")
+
+        return False
+
+    def release(self, update_id: Optional[int]):
+        """
+        Forget an update_id after a failure, so Telegram's retry is processed
+
+        Args:
+            update_id: The update_id to forget
+        """
+        if update_id is None:
+            return
+        self._seen.pop(update_id, None)
+        if self.shared_store is not None:
+            try:
+                self.shared_store.release(update_id)
+            except Exception as e:
+                print(f"Warning: could not release update {update_id} in shared store: {e}")
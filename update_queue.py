@@ -0,0 +1,181 @@
+"""
+Queue between the webhook handler and the update worker
+The webhook validates and enqueues updates, then acks Telegram immediately;
+the worker consumes them in batches with the warm agent
+"""
+
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+# Update types the bot answers; anything else is acknowledged and dropped
+SUPPORTED_UPDATE_TYPES = ('message',)
+
+
+class LocalUpdateQueue:
+    """
+    In-process stand-in queue, for local runs and tests
+
+    Like SQS, a received update stays in flight until it is deleted;
+    released updates go back to the front of the queue.
+    """
+
+    def __init__(self):
+        self._items = deque()
+        self._in_flight: Dict[str, Dict] = {}
+        self._receipts = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def send(self, update: Dict):
+        """Add an update to the queue"""
+        with self._lock:
+            self._items.append(update)
+
+    def receive_batch(self, max_messages: int = 10) -> List[Tuple[str, Dict]]:
+        """
+        Take up to max_messages updates from the queue
+
+        Returns:
+            List of (receipt, update) tuples (empty if the queue is empty)
+        """
+        with self._lock:
+            batch = []
+            while self._items and len(batch) < max_messages:
+                receipt = str(next(self._receipts))
+                self._in_flight[receipt] = self._items.popleft()
+                batch.append((receipt, self._in_flight[receipt]))
+            return batch
+
+    def delete(self, receipts: List[str]):
+        """Remove processed updates for good"""
+        with self._lock:
+            for receipt in receipts:
+                self._in_flight.pop(receipt, None)
+
+    def release(self, receipts: List[str]):
+        """Put updates that failed back at the front of the queue"""
+        with self._lock:
+            for receipt in reversed(receipts):
+                update = self._in_flight.pop(receipt, None)
+                if update is not None:
+                    self._items.appendleft(update)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQSUpdateQueue:
+    """
+    Amazon SQS queue
+
+    In AWS the worker Lambda is triggered by an SQS event source mapping, so only
+    send() is used on the hot path; receive_batch() exists for manual draining.
+    """
+
+    def __init__(self, queue_url: str):
+        """
+        Args:
+            queue_url: URL of the SQS queue
+        """
+        self.queue_url = queue_url
+        self._client = None
+
+    @property
+    def client(self):
+        # boto3 ships with the Lambda runtime; import lazily so local runs don't need it
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('sqs')
+        return self._client
+
+    def send(self, update: Dict):
+        """Add an update to the queue"""
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(update))
+
+    def receive_batch(self, max_messages: int = 10) -> List[Tuple[str, Dict]]:
+        """
+        Receive up to max_messages updates (at most 10, the SQS limit)
+
+        The messages stay in the queue, invisible, until delete() is called
+        for them; those never deleted are delivered again after the
+        visibility timeout.
+
+        Returns:
+            List of (receipt handle, update) tuples
+        """
+        response = self.client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_messages, 10),
+            WaitTimeSeconds=1,
+        )
+        return [(m['ReceiptHandle'], json.loads(m['Body'])) for m in response.get('Messages', [])]
+
+    def delete(self, receipts: List[str]):
+        """Remove processed messages from the queue"""
+        for start in range(0, len(receipts), 10):
+            self.client.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(i), 'ReceiptHandle': receipt}
+                         for i, receipt in enumerate(receipts[start:start + 10])],
+            )
+
+    def release(self, receipts: List[str]):
+        """Make messages that failed visible again right away"""
+        for start in range(0, len(receipts), 10):
+            self.client.change_message_visibility_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(i), 'ReceiptHandle': receipt, 'VisibilityTimeout': 0}
+                         for i, receipt in enumerate(receipts[start:start + 10])],
+            )
+
+
+def create_update_queue():
+    """
+    Build the update queue from the environment
+
+    UPDATE_QUEUE_URL: SQS queue URL; without it a LocalUpdateQueue is used,
+    except on AWS Lambda, where updates in memory would be lost
+
+    Raises:
+        ValueError: On Lambda without UPDATE_QUEUE_URL
+    """
+    queue_url = os.getenv('UPDATE_QUEUE_URL')
+    if queue_url:
+        return SQSUpdateQueue(queue_url)
+    if os.getenv('AWS_LAMBDA_FUNCTION_NAME'):
+        raise ValueError("UPDATE_QUEUE_URL is required for WEBHOOK_MODE=async on AWS Lambda")
+    return LocalUpdateQueue()
+
+
+def validate_update(update: Dict) -> Optional[str]:
+    """
+    Cheap structural validation of a Telegram update before it is queued
+
+    Args:
+        update: Parsed webhook body
+
+    Returns:
+        None if the update looks valid, otherwise the reason it was rejected
+    """
+    if not isinstance(update, dict):
+        return "body is not a JSON object"
+    if not isinstance(update.get('update_id'), int):
+        return "missing or invalid update_id"
+    return None
+
+
+def is_supported_update(update: Dict) -> bool:
+    """
+    Whether the bot answers this kind of update
+
+    Other valid updates (my_chat_member, edited_message...) are acknowledged
+    with 200 and dropped, so Telegram doesn't keep delivering them.
+
+    Args:
+        update: An update that passed validate_update
+    """
+    return any(key in update for key in SUPPORTED_UPDATE_TYPES)
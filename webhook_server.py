@@ -0,0 +1,259 @@
+"""
+Self-hosted webhook server
+A small asyncio HTTP server that receives Telegram updates and answers them
+with the same handlers as the Lambda (lambda_function.setup_handlers).
+Updates are acknowledged as soon as they are queued; a pool of workers
+processes them, several chats at a time, keeping the updates of each chat
+in order. Register the URL with: python setup_webhook.py <url> [max_connections]
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import lambda_function
+import tracing
+from update_queue import is_supported_update, validate_update
+
+
+REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+# Telegram updates are a few KB; anything much bigger isn't one
+MAX_BODY_BYTES = 1_000_000
+
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_SECONDS = 75
+
+
+def update_chat_id(update: Dict) -> Optional[int]:
+    """Chat an update belongs to (None for updates without one)"""
+    for value in update.values():
+        if isinstance(value, dict):
+            chat = value.get('chat') or (value.get('message') or {}).get('chat')
+            if chat:
+                return chat.get('id')
+    return None
+
+
+class WebhookServer:
+    """
+    Receives Telegram webhook requests and processes them with a worker pool
+
+    Each worker owns a queue and chats are assigned to workers by chat id, so
+    updates of one chat are handled one after another while different chats
+    run concurrently (the agent runs in threads, see setup_handlers).
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 8080, path: str = '/webhook',
+                 secret_token: Optional[str] = None, workers: int = 8, queue_size: int = 1000):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+            path: URL path Telegram posts to
+            secret_token: Expected X-Telegram-Bot-Api-Secret-Token header (the
+                secret_token given to setWebhook); None accepts any request
+            workers: Updates processed at the same time
+            queue_size: Pending updates per worker before answering 503
+                (Telegram retries them later)
+        """
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.processed = 0
+        self.failed = 0
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @classmethod
+    def from_env(cls) -> 'WebhookServer':
+        """
+        Build the server from environment variables
+
+        WEBHOOK_HOST / WEBHOOK_PORT / WEBHOOK_PATH: where to listen (default 0.0.0.0:8080/webhook)
+        WEBHOOK_SECRET: secret token Telegram must send (same value for setup_webhook.py)
+        WEBHOOK_WORKERS: updates processed at the same time (default 8)
+        """
+        return cls(
+            host=os.getenv('WEBHOOK_HOST', '0.0.0.0'),
+            port=int(os.getenv('WEBHOOK_PORT', '8080')),
+            path=os.getenv('WEBHOOK_PATH', '/webhook'),
+            secret_token=os.getenv('WEBHOOK_SECRET') or None,
+            workers=int(os.getenv('WEBHOOK_WORKERS', '8')),
+        )
+
+    async def start(self):
+        """Initialize the bot components, start the workers and listen"""
+        await lambda_function.ensure_application()
+        # The handlers run the agent with asyncio.to_thread: one thread per worker
+        # (the default executor has min(32, CPUs + 4) threads)
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.workers))
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(i, queue)) for i, queue in enumerate(self._queues)]
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"🌐 Webhook escuchando en http://{self.host}:{self.port}{self.path} ({self.workers} workers)")
+
+    async def join(self):
+        """Wait until every queued update has been processed"""
+        for queue in self._queues:
+            await queue.join()
+
+    async def stop(self):
+        """Stop listening, finish the queued updates and stop the workers"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def enqueue(self, update: Dict) -> bool:
+        """
+        Queue an update on the worker of its chat
+
+        Returns:
+            False if that worker's queue is full
+        """
+        chat_id = update_chat_id(update)
+        key = chat_id if chat_id is not None else update.get('update_id', 0)
+        try:
+            self._queues[hash(key) % self.workers].put_nowait(update)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _worker(self, index: int, queue: asyncio.Queue):
+        while True:
+            update = await queue.get()
+            try:
+                with tracing.start_trace('webhook.update', worker=index, update_id=update.get('update_id')):
+                    result = await lambda_function.process_update(update)
+                if result.get('statusCode') == 200:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error processing update {update.get('update_id')}: {e}")
+            finally:
+                queue.task_done()
+
+    def route(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        """
+        Answer one HTTP request
+
+        Returns:
+            (status code, JSON response body)
+        """
+        if path.split('?', 1)[0] != self.path:
+            return 404, {'error': 'not found'}
+        if method == 'GET':
+            return 200, {'status': 'Bot is running'}
+        if method != 'POST':
+            return 405, {'error': 'method not allowed'}
+        if self.secret_token and headers.get('x-telegram-bot-api-secret-token') != self.secret_token:
+            return 403, {'error': 'invalid secret token'}
+
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return 400, {'error': 'invalid JSON'}
+        error = validate_update(update)
+        if error:
+            print(f"Rejected update: {error}")
+            return 400, {'error': error}
+        if not is_supported_update(update):
+            # Acknowledged so Telegram doesn't deliver it again
+            print(f"Ignoring unsupported update {update['update_id']}")
+            return 200, {'status': 'ignored'}
+        if not self.enqueue(update):
+            return 503, {'error': 'busy'}
+        return 200, {'status': 'queued'}
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """
+        Read one HTTP/1.1 request
+
+        Returns:
+            (method, path, headers, body), or None when the client closed the connection
+        """
+        request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_SECONDS)
+        if not request_line.strip():
+            return None
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', '0') or 0)
+        if length > MAX_BODY_BYTES:
+            return method, path, headers, None
+        body = await reader.readexactly(length) if length else b''
+        return method, path, headers, body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve the requests of one connection (Telegram keeps them alive)"""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if body is None:
+                    status, payload = 413, {'error': 'payload too large'}
+                else:
+                    status, payload = self.route(method.upper(), path, headers, body)
+
+                data = json.dumps(payload).encode()
+                keep_alive = body is not None and headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(server: Optional[WebhookServer] = None):
+    """Run the webhook server until cancelled"""
+    server = server or WebhookServer.from_env()
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def run():
+    """Blocking entry point (main.py with BOT_MODE=webhook)"""
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    run()